@@ -6,10 +6,12 @@ class Program(ASTNode):
         self.statements = statements
 
 class FunctionDef(ASTNode):
-    def __init__(self, name, params, body):
+    def __init__(self, name, params, body, annotations=None, return_annotation=None):
         self.name = name
         self.params = params
         self.body = body
+        self.annotations = annotations or {}  # параметр -> TypeAnnotation
+        self.return_annotation = return_annotation
 
 class IfStatement(ASTNode):
     def __init__(self, condition, true_body, false_body=None):
@@ -36,20 +38,60 @@ class String(ASTNode):
     def __init__(self, value):
         self.value = value
 
+class FormattedString(ASTNode):
+    # f-строка: части - String (текст) и FormattedValue (подстановки)
+    def __init__(self, values):
+        self.values = values
+
+class FormattedValue(ASTNode):
+    # Подстановка {value!conversion:format_spec} внутри f-строки
+    def __init__(self, value, conversion=None, format_spec=''):
+        self.value = value
+        self.conversion = conversion  # 'r', 's', 'a' или None
+        self.format_spec = format_spec
+
+class Constant(ASTNode):
+    def __init__(self, value):
+        self.value = value  # True, False или None
+
 class Identifier(ASTNode):
     def __init__(self, name):
         self.name = name
 
 class Assignment(ASTNode):
-    def __init__(self, left, right):
+    def __init__(self, left, right, annotation=None):
         self.left = left
         self.right = right
+        self.annotation = annotation  # x: int = 5
+
+class VariableAnnotation(ASTNode):
+    # Объявление без значения: x: int
+    def __init__(self, target, annotation):
+        self.target = target
+        self.annotation = annotation
+
+class TypeAnnotation(ASTNode):
+    # Аннотация типа: имя и параметры, например list[int] или dict[str, float]
+    def __init__(self, name, args=None):
+        self.name = name
+        self.args = args or []
+
+class AugAssignment(ASTNode):
+    def __init__(self, target, op, value):
+        self.target = target
+        self.op = op  # Оператор без '=', например '+'
+        self.value = value
 
 class FunctionCall(ASTNode):
     def __init__(self, name, args):
         self.name = name
         self.args = args
 
+class KeywordArgument(ASTNode):
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
 class ReturnStatement(ASTNode):
     def __init__(self, expr):
         self.expr = expr
@@ -80,6 +122,18 @@ class TryExcept(ASTNode):
         self.else_body = else_body
         self.finally_body = finally_body
 
+class Yield(ASTNode):
+    def __init__(self, value=None):
+        self.value = value
+
+class YieldFrom(ASTNode):
+    def __init__(self, value):
+        self.value = value
+
+class RaiseStatement(ASTNode):
+    def __init__(self, exception=None):
+        self.exception = exception  # None - повторный raise внутри except
+
 class ExceptHandler(ASTNode):
     def __init__(self, exc_type, exc_name, body):
         self.exc_type = exc_type
@@ -121,10 +175,15 @@ class WithStatement(ASTNode):
         self.body = body
 
 class GeneratorExpression(ASTNode):
-    def __init__(self, expression, variables, iterables):
+    def __init__(self, expression, target, iterable, condition=None):
         self.expression = expression
-        self.variables = variables
-        self.iterables = iterables
+        self.target = target
+        self.iterable = iterable
+        self.condition = condition
+
+class TupleNode(ASTNode):
+    def __init__(self, elements):
+        self.elements = elements
 
 class PrintStatement(ASTNode):
     def __init__(self, expressions):
@@ -135,13 +194,18 @@ class LambdaExpression(ASTNode):
         self.params = params
         self.body = body
 
-class MethodCall:
+class MethodCall(ASTNode):
     def __init__(self, obj, method_name, args):
         self.obj = obj
         self.method_name = method_name
         self.args = args
 
-class Attribute:
+class Subscript(ASTNode):
+    def __init__(self, obj, index):
+        self.obj = obj
+        self.index = index
+
+class Attribute(ASTNode):
     def __init__(self, obj, attr_name):
         self.obj = obj
         self.attr_name = attr_name
@@ -170,6 +234,33 @@ class Compare(ASTNode):
         self.ops = ops  # Список операторов, например, ['==']
         self.comparators = comparators  # Список правых операндов
 
+def iter_child_nodes(node):
+    # Перебирает непосредственные дочерние узлы (аналог ast.iter_child_nodes)
+    for value in vars(node).values():
+        if isinstance(value, ASTNode):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                if isinstance(item, ASTNode):
+                    yield item
+                elif isinstance(item, tuple):  # пары ключ-значение DictNode
+                    for sub in item:
+                        if isinstance(sub, ASTNode):
+                            yield sub
+
+def walk(node):
+    # Обходит все узлы поддерева в прямом порядке, включая сам узел
+    yield node
+    for child in iter_child_nodes(node):
+        yield from walk(child)
+
+def scope_nodes(node):
+    # Узлы области видимости: как walk, но без захода во вложенные функции
+    yield node
+    for child in iter_child_nodes(node):
+        if not isinstance(child, FunctionDef):
+            yield from scope_nodes(child)
+
 # class ListComprehensionNode:
 #     def __init__(self, expression, target, iterable, condition=None):
 #         self.expression = expression
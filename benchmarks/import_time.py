@@ -0,0 +1,68 @@
+# Время запуска ядра трансляции: профиль python -X importtime для translator
+# и cli, самые медленные модули и проверка бюджета.
+# Запуск: python benchmarks/import_time.py [бюджет в мс]
+# Код выхода 1, если импорт translator дольше бюджета или загружает PyQt6:
+# короткие запуски на каждый файл в сборочных скриптах упираются в запуск.
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, импорт которых измеряется; бюджет проверяется для первого
+MODULES = ('translator', 'cli')
+
+DEFAULT_BUDGET_MS = 100
+
+# Сколько раз запускать интерпретатор для замера полного времени запуска
+RUNS = 5
+
+# Сколько самых медленных модулей печатать
+TOP = 8
+
+def import_profile(module):
+    # -> ([(собственное время, суммарное время, имя модуля)] в мкс, загруженные модули)
+    code = f'import sys, {module}; print(" ".join(sorted(sys.modules)))'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((int(own), int(cumulative), name.strip()))
+    return entries, set(result.stdout.split())
+
+def startup_time(code):
+    # Наименьшее полное время запуска интерпретатора с кодом, в секундах
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    baseline = startup_time('pass')
+    failed = False
+    for module in MODULES:
+        entries, loaded = import_profile(module)
+        total = next(cumulative for _, cumulative, name in entries if name == module) / 1000
+        startup = startup_time(f'import {module}') - baseline
+        print(f'{module}: импорт {total:.1f} мс (importtime), запуск +{startup * 1000:.1f} мс к пустому интерпретатору')
+        for own, cumulative, name in sorted(entries, reverse=True)[:TOP]:
+            print(f'    {own / 1000:7.2f} мс  {cumulative / 1000:7.2f} мс  {name}')
+        qt = sorted(name for name in loaded if name.split('.')[0] == 'PyQt6')
+        if qt:
+            print(f'    загружен PyQt6: {", ".join(qt)}')
+            failed = True
+        if module == MODULES[0] and total > budget:
+            print(f'    превышен бюджет {budget:.0f} мс')
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
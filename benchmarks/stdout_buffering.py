@@ -0,0 +1,65 @@
+# Сравнение println! и буферизованного вывода на цикле из 10^6 print.
+# Запуск: python benchmarks/stdout_buffering.py [число строк]
+# Нужен rustc в PATH; вывод программ направляется в канал, как при
+# перенаправлении в файл или в другую программу.
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from parser import Parser
+from code_generator import generate_code
+
+PROGRAM = '''
+def report(i):
+    print("line", i)
+
+for i in range(COUNT):
+    report(i)
+'''
+
+def translate(source, buffered_output):
+    ast = Parser(Lexer(source).tokenize()).parse()
+    return generate_code(ast, buffered_output=buffered_output)
+
+def build(rust_code, directory, name):
+    source_path = os.path.join(directory, f'{name}.rs')
+    binary_path = os.path.join(directory, name)
+    with open(source_path, 'w') as f:
+        f.write(rust_code)
+    subprocess.run(['rustc', '-O', '-A', 'warnings', '--edition', '2021', '-o', binary_path, source_path],
+                   check=True)
+    return binary_path
+
+def run(binary_path):
+    # Читаем вывод через канал: для канала stdout Rust сбрасывается после каждой строки
+    start = time.perf_counter()
+    process = subprocess.Popen([binary_path], stdout=subprocess.PIPE)
+    lines = sum(chunk.count(b'\n') for chunk in iter(lambda: process.stdout.read(1 << 16), b''))
+    process.wait()
+    return time.perf_counter() - start, lines
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    if shutil.which('rustc') is None:
+        print('rustc не найден, бенчмарк пропущен')
+        return
+    source = PROGRAM.replace('COUNT', str(count))
+    with tempfile.TemporaryDirectory() as directory:
+        results = {}
+        for name, buffered_output in (('println', False), ('bufwriter', True)):
+            binary_path = build(translate(source, buffered_output), directory, name)
+            elapsed, lines = run(binary_path)
+            if lines != count:
+                raise Exception(f'{name}: ожидалось {count} строк, получено {lines}')
+            results[name] = elapsed
+            print(f'{name:>10}: {elapsed:.3f} с ({count / elapsed:,.0f} строк/с)')
+        print(f'ускорение: {results["println"] / results["bufwriter"]:.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# Пакетная трансляция без графического интерфейса:
+#   python cli.py src/ lib/*.py main.py -o out/ -j 8
+# Файлы раздаются процессам ProcessPoolExecutor кусками по chunksize,
+# каждый результат записывается атомарно: во временный файл рядом с целевым,
+# который затем переименовывается, поэтому прерванный запуск не оставляет
+# наполовину записанных .rs.
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+from translator import translate, PARALLEL_THRESHOLD
+
+# Число кусков на процесс при автоматическом выборе chunksize: мелкие куски
+# выравнивают нагрузку, крупные уменьшают число передач между процессами
+CHUNKS_PER_WORKER = 4
+
+# Символы маски в пути
+GLOB_CHARS = '*?['
+
+def default_workers():
+    # Ядра, доступные процессу: в контейнере их может быть меньше, чем os.cpu_count()
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def glob_root(pattern):
+    # Каталог до первой части с маской: src/**/*.py -> src
+    parts = []
+    for part in pattern.split(os.sep):
+        if any(char in part for char in GLOB_CHARS):
+            break
+        parts.append(part)
+    return os.sep.join(parts)
+
+def collect_sources(paths):
+    # Файлы, маски и каталоги -> пары (исходный файл, каталог, от которого
+    # строится путь результата), без повторов и в порядке перечисления
+    sources = {}
+    for path in paths:
+        if os.path.isdir(path):
+            found = [(name, path) for name in glob.glob(os.path.join(path, '**', '*.py'), recursive=True)]
+        elif any(char in path for char in GLOB_CHARS):
+            found = [(name, glob_root(path)) for name in glob.glob(path, recursive=True) if os.path.isfile(name)]
+        elif os.path.isfile(path):
+            found = [(path, os.path.dirname(path))]
+        else:
+            raise Exception(f'{path}: файл или каталог не найден')
+        for name, root in sorted(found):
+            sources.setdefault(os.path.normpath(name), root)
+    return list(sources.items())
+
+def target_path(source, root, output_dir):
+    # foo/bar.py -> foo/bar.rs рядом с исходным или в output_dir с той же
+    # структурой каталогов относительно корня
+    name = os.path.splitext(source)[0] + '.rs'
+    if output_dir is None:
+        return name
+    return os.path.join(output_dir, os.path.relpath(name, root or os.curdir))
+
+def file_mode(path):
+    # Права для результата: как у заменяемого файла, а для нового - как у
+    # файла, созданного open(), с учётом umask. mkstemp создаёт файл с 0600
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def write_atomic(path, text):
+    directory = os.path.dirname(path) or os.curdir
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.chmod(temporary, file_mode(path))
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+def translate_file(job):
+    # Выполняется в процессе пула: исключения не выпускаются наружу, чтобы
+    # ошибка в одном файле не останавливала остальные
+    source, target, options = job
+    start = time.perf_counter()
+    try:
+        with open(source, encoding='utf-8') as f:
+            python_code = f.read()
+        rust_code, diagnostics = translate(python_code, **options)
+        write_atomic(target, rust_code)
+    except Exception as e:
+        return source, target, 'error', [str(e)], 0, time.perf_counter() - start
+    status = 'warning' if diagnostics else 'ok'
+    return source, target, status, diagnostics, len(python_code), time.perf_counter() - start
+
+def translate_all(jobs, workers, chunksize):
+    if workers == 1:
+        # Без пула: проще отлаживать и нет затрат на запуск процессов
+        yield from map(translate_file, jobs)
+        return
+    # Пул импортируется только здесь: concurrent.futures с multiprocessing
+    # утраивают время запуска, а один файл переводится без него
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        yield from pool.map(translate_file, jobs, chunksize=chunksize)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Трансляция Python в Rust без графического интерфейса')
+    parser.add_argument('paths', nargs='+', help='файлы .py, маски (src/**/*.py) или каталоги')
+    parser.add_argument('-o', '--output-dir', help='каталог для .rs (по умолчанию рядом с исходными)')
+    parser.add_argument('-j', '--workers', type=int, default=default_workers(),
+                        help='число процессов (по умолчанию - число ядер)')
+    parser.add_argument('--chunksize', type=int,
+                        help=f'файлов в одной передаче процессу (по умолчанию - {CHUNKS_PER_WORKER} куска на процесс)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='печатать только ошибки и итог')
+    parser.add_argument('--buffered-output', action='store_true', help='вывод print через BufWriter')
+    parser.add_argument('--fast-maps', action='store_true', help='FxHash для словарей и множеств')
+    parser.add_argument('--soa-layout', action='store_true', help='списки объектов как структуры массивов')
+    parser.add_argument('--parallel-map', action='store_true', help='параллельное отображение больших списков')
+    parser.add_argument('--parallel-threshold', type=int, default=PARALLEL_THRESHOLD,
+                        help='размер входа, начиная с которого отображение параллельно')
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('число процессов должно быть положительным')
+    if args.chunksize is not None and args.chunksize < 1:
+        parser.error('chunksize должен быть положительным')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        sources = collect_sources(args.paths)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        return 2
+    options = {'buffered_output': args.buffered_output, 'fast_maps': args.fast_maps,
+               'soa_layout': args.soa_layout, 'parallel_map': args.parallel_map,
+               'parallel_threshold': args.parallel_threshold}
+    jobs = [(source, target_path(source, root, args.output_dir), options) for source, root in sources]
+    workers = min(args.workers, len(jobs)) or 1
+    chunksize = args.chunksize or max(1, len(jobs) // (workers * CHUNKS_PER_WORKER))
+
+    start = time.perf_counter()
+    counts = {'ok': 0, 'warning': 0, 'error': 0}
+    total_size = 0
+    for source, target, status, messages, size, elapsed in translate_all(jobs, workers, chunksize):
+        counts[status] += 1
+        total_size += size
+        if status == 'error':
+            print(f'ошибка  {source}: {messages[0]}', file=sys.stderr)
+        elif not args.quiet:
+            print(f'{"готово" if status == "ok" else "замечания"}  {source} -> {target} ({elapsed * 1000:.0f} мс)')
+            for message in messages:
+                print(f'    {message}')
+    elapsed = time.perf_counter() - start
+
+    rate = len(jobs) / elapsed if elapsed > 0 else 0.0
+    print(f'{len(jobs)} файлов за {elapsed:.2f} с, процессов: {workers}, chunksize: {chunksize}; '
+          f'успешно: {counts["ok"]}, с замечаниями: {counts["warning"]}, с ошибками: {counts["error"]}; '
+          f'{rate:.1f} файлов/с, {total_size / 1024 / elapsed if elapsed > 0 else 0.0:.1f} КБ/с')
+    return 1 if counts['error'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
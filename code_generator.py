@@ -1,12 +1,471 @@
+import re
+
 from ast_nodes import *
-from type_inference import TypeInference
-from standard_library_mapping import METHOD_MAPPING
+from type_inference import TypeInference, ARRAY_TYPE, MASK_TYPE, ARRAY_OPERAND_TYPES
+from standard_library_mapping import METHOD_MAPPING, DECORATOR_MAPPING, MEMOIZATION_DECORATORS, ITERATOR_BUILTINS
+from ownership_analysis import OwnershipAnalysis, MUTATING_METHODS, attribute_stores, mutates_loop_target
+from loop_analysis import LoopAnalysis
+from loop_lowering import LoopLowering
+from recursion_elimination import RecursionElimination
+from map_lowering import MapLowering
+from exception_analysis import ExceptionAnalysis
+from generator_lowering import GeneratorLowering, is_generator
+from layout_analysis import LayoutAnalysis
+from liveness_analysis import LivenessAnalysis
+from purity_analysis import PurityAnalysis
+from module_registry import MODULE_REGISTRY, module_function, type_methods
+from file_access_analysis import FileAccessAnalysis, FILE_METHOD_TYPES, READER_TYPE, WRITER_TYPE
+
+# Оценка длины фрагмента строки, добавляемого через +=, если она неизвестна
+STRING_PIECE_ESTIMATE = 16
+
+# Спецификация формата Python: [[fill]align][sign][#][0][width][,][.precision][type]
+FORMAT_SPEC = re.compile(r'^(?:(?P<fill>.)?(?P<align>[<>^=]))?(?P<sign>[+\- ])?(?P<alt>#)?(?P<zero>0)?'
+                         r'(?P<width>\d+)?(?P<grouping>[,_])?(?:\.(?P<precision>\d+))?(?P<kind>[bcdeEfFgGnosxX%])?$')
+
+# Типы, которые в f-строке и str() печатаются через Display как в Python
+DISPLAY_TYPES = ('String', '&str', 'char', 'i32', 'i64', 'usize', 'unknown')
+
+# Типы Rust, значения которых копируются, а не перемещаются
+COPY_TYPES = ('i32', 'i64', 'f64', 'usize', 'bool', 'char')
+
+# Разделяемые между потоками объекты: их методы принимают &self
+SHARED_TYPES = ('PyThread', 'PyQueue<', 'Arc<')
+
+# Встроенные функции, которые можно передать как key= в sorted, min и max
+KEY_BUILTINS = ('len', 'abs', 'str')
+
+# Типы параметров и результата, допустимые в const fn
+CONST_TYPES = ('i32', 'i64', 'f64', 'bool', '()')
+
+# Размер входного Vec, начиная с которого параллельное отображение окупает запуск потоков
+PARALLEL_THRESHOLD = 10000
+
+# Параллельное отображение с фильтром на потоках стандартной библиотеки:
+# вход делится на куски по числу ядер, результаты кусков склеиваются по порядку
+PAR_FILTER_MAP_ITEM = '''fn par_filter_map<T: Sync, U: Send>(items: &[T], threshold: usize, f: impl Fn(&T) -> Option<U> + Sync) -> Vec<U> {
+    let threads = std::thread::available_parallelism().map_or(1, |n| n.get());
+    if items.len() < threshold.max(2) || threads < 2 {
+        return items.iter().filter_map(f).collect();
+    }
+    let chunk_size = (items.len() + threads - 1) / threads;
+    let f = &f;
+    std::thread::scope(|scope| {
+        let handles: Vec<_> = items
+            .chunks(chunk_size)
+            .map(|chunk| scope.spawn(move || chunk.iter().filter_map(f).collect::<Vec<U>>()))
+            .collect();
+        let mut result = Vec::with_capacity(items.len());
+        for handle in handles {
+            result.extend(handle.join().unwrap());
+        }
+        result
+    })
+}'''
+
+# Пул потоков для pool.map и executor.map: число потоков задано при создании,
+# куски входа раздаются через канал mpsc, результаты возвращаются по другому
+# каналу и складываются в порядке входа
+WORKER_POOL_ITEM = '''struct WorkerPool {
+    workers: usize,
+}
+
+impl Default for WorkerPool {
+    fn default() -> Self {
+        WorkerPool::new(std::thread::available_parallelism().map_or(1, |n| n.get()))
+    }
+}
+
+impl WorkerPool {
+    fn new(workers: usize) -> Self {
+        WorkerPool { workers: workers.max(1) }
+    }
+
+    fn map<T: Sync, U: Send>(&self, items: &[T], f: impl Fn(&T) -> U + Sync) -> Vec<U> {
+        let workers = self.workers.min(items.len());
+        if workers < 2 {
+            return items.iter().map(f).collect();
+        }
+        // Несколько кусков на поток: освободившийся поток забирает следующий
+        let chunk_size = (items.len() + workers * 4 - 1) / (workers * 4);
+        let chunks: Vec<&[T]> = items.chunks(chunk_size).collect();
+        let (job_sender, job_receiver) = mpsc::channel();
+        for index in 0..chunks.len() {
+            job_sender.send(index).unwrap();
+        }
+        drop(job_sender);
+        let job_receiver = Mutex::new(job_receiver);
+        let (result_sender, result_receiver) = mpsc::channel();
+        let (f, chunks, job_receiver) = (&f, &chunks, &job_receiver);
+        std::thread::scope(|scope| {
+            for _ in 0..workers {
+                let result_sender = result_sender.clone();
+                scope.spawn(move || loop {
+                    let job = job_receiver.lock().unwrap().recv();
+                    let Ok(index) = job else { break };
+                    result_sender.send((index, chunks[index].iter().map(f).collect::<Vec<U>>())).unwrap();
+                });
+            }
+            drop(result_sender);
+            // Результаты кусков приходят в порядке готовности, а складываются по индексу
+            let mut parts: Vec<Vec<U>> = (0..chunks.len()).map(|_| Vec::new()).collect();
+            for (index, part) in result_receiver {
+                parts[index] = part;
+            }
+            parts.into_iter().flatten().collect()
+        })
+    }
+}'''
+
+# queue.Queue: клон разделяет одну очередь, get ждёт элемент на Condvar,
+# join - пока для каждого put не будет вызван task_done
+PY_QUEUE_ITEM = '''struct QueueState<T> {
+    items: VecDeque<T>,
+    unfinished: usize,
+}
+
+struct PyQueue<T> {
+    shared: Arc<(Mutex<QueueState<T>>, Condvar)>,
+}
+
+impl<T> Clone for PyQueue<T> {
+    fn clone(&self) -> Self {
+        PyQueue { shared: Arc::clone(&self.shared) }
+    }
+}
+
+impl<T> PyQueue<T> {
+    fn new() -> Self {
+        PyQueue { shared: Arc::new((Mutex::new(QueueState { items: VecDeque::new(), unfinished: 0 }), Condvar::new())) }
+    }
+
+    fn put(&self, item: T) {
+        let (state, changed) = &*self.shared;
+        let mut state = state.lock().unwrap();
+        state.items.push_back(item);
+        state.unfinished += 1;
+        changed.notify_all();
+    }
+
+    fn get(&self) -> T {
+        let (state, changed) = &*self.shared;
+        let mut state = changed.wait_while(state.lock().unwrap(), |state| state.items.is_empty()).unwrap();
+        state.items.pop_front().unwrap()
+    }
+
+    fn empty(&self) -> bool {
+        self.shared.0.lock().unwrap().items.is_empty()
+    }
+
+    fn qsize(&self) -> i32 {
+        self.shared.0.lock().unwrap().items.len() as i32
+    }
+
+    fn task_done(&self) {
+        let (state, changed) = &*self.shared;
+        let mut state = state.lock().unwrap();
+        state.unfinished = state.unfinished.checked_sub(1).expect("task_done() called too many times");
+        changed.notify_all();
+    }
+
+    fn join(&self) {
+        let (state, changed) = &*self.shared;
+        drop(changed.wait_while(state.lock().unwrap(), |state| state.unfinished > 0).unwrap());
+    }
+}'''
+
+# threading.Thread: задача запускается в start на std::thread::spawn
+# и ожидается в join. Клон ссылается на тот же поток, как ссылка в Python
+PY_THREAD_ITEM = '''enum ThreadState {
+    New(Box<dyn FnOnce() + Send>),
+    Running(std::thread::JoinHandle<()>),
+    Finished,
+}
+
+#[derive(Clone)]
+struct PyThread {
+    state: Arc<Mutex<ThreadState>>,
+}
+
+impl PyThread {
+    fn new(task: impl FnOnce() + Send + 'static) -> Self {
+        PyThread { state: Arc::new(Mutex::new(ThreadState::New(Box::new(task)))) }
+    }
+
+    fn start(&self) {
+        let mut state = self.state.lock().unwrap();
+        match std::mem::replace(&mut *state, ThreadState::Finished) {
+            ThreadState::New(task) => *state = ThreadState::Running(std::thread::spawn(task)),
+            _ => panic!("threads can only be started once"),
+        }
+    }
+
+    fn join(&self) {
+        let state = std::mem::replace(&mut *self.state.lock().unwrap(), ThreadState::Finished);
+        match state {
+            // Как в Python: паника потока уже напечатана и не передаётся в join
+            ThreadState::Running(handle) => drop(handle.join()),
+            ThreadState::New(_) => panic!("cannot join thread before it is started"),
+            ThreadState::Finished => {}
+        }
+    }
+}'''
+
+# НОД для math.gcd: в стандартной библиотеке Rust его нет
+GCD_ITEM = '''fn py_gcd(mut a: i32, mut b: i32) -> i32 {
+    while b != 0 {
+        let rest = a % b;
+        a = b;
+        b = rest;
+    }
+    a.abs()
+}'''
+
+# Сумма свёрток NumPy: LANES независимых аккумуляторов. Сложения в разных
+# дорожках не зависят друг от друга, поэтому rustc векторизует цикл по ним,
+# а f получает индекс, и поэлементное выражение не материализуется в массив
+FUSED_SUM_ITEM = '''const LANES: usize = 8;
+
+fn fused_sum(len: usize, f: impl Fn(usize) -> f64) -> f64 {
+    let mut lanes = [0.0; LANES];
+    let whole = len - len % LANES;
+    let mut start = 0;
+    while start < whole {
+        for lane in 0..LANES {
+            lanes[lane] += f(start + lane);
+        }
+        start += LANES;
+    }
+    let mut rest = 0.0;
+    for index in whole..len {
+        rest += f(index);
+    }
+    lanes.iter().sum::<f64>() + rest
+}'''
+
+# Типы, пустое значение которых ложно в условиях if и while
+SIZED_PREFIXES = ('Vec<', 'HashMap<', 'HashSet<', 'VecDeque<', 'BinaryHeap<')
+
+# Наибольшее число полей структуры, для которой выводится Copy
+COPY_STRUCT_FIELDS = 4
+
+# Типы, которые можно использовать в ключе кэша мемоизации
+HASHABLE_TYPES = ('i32', 'i64', 'usize', 'bool', 'char', 'String', '&str')
+
+# Кэш с вытеснением давно не использованных записей для @lru_cache(maxsize=N)
+LRU_CACHE_ITEM = '''struct LruCache<K, V> {
+    capacity: usize,
+    tick: u64,
+    entries: HashMap<K, (V, u64)>,
+    order: BTreeMap<u64, K>,
+}
+
+impl<K: Hash + Eq + Clone, V: Clone> LruCache<K, V> {
+    fn new(capacity: usize) -> Self {
+        LruCache { capacity, tick: 0, entries: HashMap::with_capacity(capacity), order: BTreeMap::new() }
+    }
+
+    fn get(&mut self, key: &K) -> Option<V> {
+        let (value, last_used) = self.entries.get_mut(key)?;
+        self.tick += 1;
+        self.order.remove(last_used);
+        *last_used = self.tick;
+        self.order.insert(self.tick, key.clone());
+        Some(value.clone())
+    }
+
+    fn insert(&mut self, key: K, value: V) {
+        if self.capacity == 0 {
+            return;
+        }
+        if let Some((_, last_used)) = self.entries.remove(&key) {
+            self.order.remove(&last_used);
+        } else if self.entries.len() >= self.capacity {
+            if let Some((_, oldest)) = self.order.pop_first() {
+                self.entries.remove(&oldest);
+            }
+        }
+        self.tick += 1;
+        self.order.insert(self.tick, key.clone());
+        self.entries.insert(key, (value, self.tick));
+    }
+}'''
+
+# Некриптографический хэш в стиле FxHash (rustc): один поворот, xor и умножение
+# на слово ключа. Быстрее SipHash на целых и коротких строках, но не защищён
+# от подбора коллизий, поэтому используется только в режиме fast_maps.
+FX_HASHER_ITEM = '''#[derive(Default, Clone, Copy)]
+struct FxHasher {
+    hash: u64,
+}
+
+const FX_SEED: u64 = 0x51_7c_c1_b7_27_22_0a_95;
+
+impl FxHasher {
+    #[inline]
+    fn add_to_hash(&mut self, word: u64) {
+        self.hash = (self.hash.rotate_left(5) ^ word).wrapping_mul(FX_SEED);
+    }
+}
+
+impl Hasher for FxHasher {
+    #[inline]
+    fn write(&mut self, bytes: &[u8]) {
+        let mut chunks = bytes.chunks_exact(8);
+        for chunk in &mut chunks {
+            self.add_to_hash(u64::from_le_bytes(chunk.try_into().unwrap()));
+        }
+        let rest = chunks.remainder();
+        if !rest.is_empty() {
+            let mut word = [0u8; 8];
+            word[..rest.len()].copy_from_slice(rest);
+            self.add_to_hash(u64::from_le_bytes(word));
+        }
+    }
+
+    #[inline]
+    fn write_u8(&mut self, i: u8) {
+        self.add_to_hash(i as u64);
+    }
+
+    #[inline]
+    fn write_u32(&mut self, i: u32) {
+        self.add_to_hash(i as u64);
+    }
+
+    #[inline]
+    fn write_u64(&mut self, i: u64) {
+        self.add_to_hash(i);
+    }
+
+    #[inline]
+    fn write_usize(&mut self, i: usize) {
+        self.add_to_hash(i as u64);
+    }
+
+    #[inline]
+    fn finish(&self) -> u64 {
+        self.hash
+    }
+}
+
+type FxBuildHasher = BuildHasherDefault<FxHasher>;'''
+
+FX_COLLECTION_ITEMS = {
+    'HashMap': 'type FxHashMap<K, V> = HashMap<K, V, FxBuildHasher>;',
+    'HashSet': 'type FxHashSet<T> = HashSet<T, FxBuildHasher>;',
+}
 
 class CodeGenerator:
-    def __init__(self):
+    def __init__(self, buffered_output=False, fast_maps=False, soa_layout=False, parallel_map=False,
+                 parallel_threshold=PARALLEL_THRESHOLD):
         self.code = []  # Список для хранения сгенерированного кода
         self.indent_level = 0  # Уровень отступа
         self.type_inference = TypeInference()
+        self.ownership = OwnershipAnalysis(self.type_inference.module_member)
+        self.call_site_types = {}  # имя функции -> типы аргументов в местах вызова
+        self.function_signatures = {}  # имя функции -> [(параметр, тип, способ передачи)]
+        self.inferred_param_types = {}  # имя функции -> {параметр: выведенный (не умолчательный) тип}
+        self.borrowed_params = {}  # заимствованные параметры текущей функции -> ref / mut
+        self.loop_analysis = LoopAnalysis()
+        self.preallocations = {}  # id(присваивания) -> накопитель, заполняемый в цикле
+        self.loop_lowering = LoopLowering()
+        self.index_loop_plans = {}  # id(for) -> план обхода итератором вместо индексов
+        self.subscript_aliases = {}  # (массив, индекс) -> элемент текущего итератора
+        self.recursion = RecursionElimination()
+        self.tail_call_function = None  # функция, чьи хвостовые вызовы заменяются на continue
+        self.tail_call_statements = set()  # id хвостовых вызовов-операторов этой функции
+        self.diagnostics = []  # сообщения о выполненных преобразованиях
+        self.untyped_lists = set()  # списки, созданные пустыми, с ещё неизвестным типом элементов
+        self.uses = set()  # строки use, нужные сгенерированному коду
+        self.support_items = {}  # имя -> вспомогательный тип или функция, выводятся один раз
+        self.function_return_types = {}  # имя функции -> сгенерированный тип результата
+        # Режим буферизованного вывода: print пишет через один BufWriter,
+        # созданный в main и передаваемый в печатающие функции
+        self.buffered_output = buffered_output
+        self.output_name = 'out'
+        self.printing_functions = set()  # функции, которым нужен буфер вывода
+        self.output_borrowed = False  # буфер внутри функции - параметр &mut
+        # Режим быстрых отображений: FxHasher вместо SipHash и Vec для словарей
+        # с ключами 0..n-1
+        self.fast_maps = fast_maps
+        self.map_lowering = MapLowering()
+        # Исключения: функции, из которых они могут выйти, возвращают Result<T, PyError>
+        self.exceptions = ExceptionAnalysis()
+        self.error_variants = set()  # варианты перечисления PyError
+        self.raising_functions = set()
+        self.returns_result = False  # текущая функция возвращает Result
+        self.error_targets = []  # куда передаётся ошибка: 'return', метка блока try или None
+        self.handler_errors = []  # ошибка текущего обработчика для повторного raise
+        self.try_count = 0
+        # Генераторы: структура с полями-переменными и impl Iterator с конечным автоматом
+        self.generators = GeneratorLowering()
+        self.generator_plans = {}  # имя функции -> {'struct', 'fields', 'item'}
+        self.generator_function = None  # генератор, тело которого сейчас понижается
+        self.generator_fields = set()  # переменные, хранящиеся в полях self
+        self.generator_states = []  # строки кода каждого состояния
+        # (заголовок, состояние после цикла) циклов генератора, разбитых на состояния:
+        # break и continue в них - переходы, а не выход из loop вокруг match
+        self.generator_loops = []
+        self.generator_extra_fields = {}  # служебные поля циклов -> (тип, начальное значение)
+        # Классы: структура с полями из self.f = ... и impl с конструктором new и методами
+        self.class_plans = {}  # имя класса -> {'fields', 'params', 'copy'}
+        self.current_class = None  # класс, методы которого сейчас генерируются
+        self.self_alias = None  # имя, заменяющее self в сложном __init__
+        # Режим раскладки "структура массивов": списки простых записей хранятся
+        # по полям, а циклы по ним читают только нужные поля
+        self.soa_layout = soa_layout
+        self.layout = LayoutAnalysis()
+        self.soa_declarations = {}  # id(присваивания) -> класс элементов списка
+        self.soa_loops = {}  # id(for) -> (класс, читаемые поля)
+        self.attribute_aliases = {}  # (переменная цикла, поле) -> элемент итератора поля
+        # Мономорфизация: функция, вызываемая с разными наборами типов аргументов,
+        # генерируется отдельной копией f__i32, f__f64 на каждый набор
+        self.specializations = {}  # имя функции -> {типы аргументов: (имя копии, сигнатура)}
+        self.specialized_defs = {}  # имя функции -> FunctionDef
+        self.current_specialization = None  # (имя копии, типы) генерируемой копии
+        self.emitted_specializations = set()
+        self.variant_codes = {}  # имя копии или исходной функции -> её код
+        self.called_variants = set()  # имена, к которым обращается хотя бы один вызов
+        self.on_demand_specialized = set()  # функции, получившие копии уже при генерации вызовов
+        self.declared_types = {}  # переменные, объявленные аннотацией без значения -> тип
+        self.expected_return = 'unknown'  # тип результата текущей функции из аннотации
+        # Метки блоков try с finally вокруг текущего оператора: return внутри них
+        # выходит из блока через break и выполняется после finally
+        self.return_targets = []
+        # Циклы и блоки try вокруг текущего оператора, от внешних к внутренним:
+        # break и continue из блока try выходят по метке цикла, а из блока
+        # с finally - через его конец, чтобы finally выполнился
+        self.jump_scopes = []
+        self.loop_count = 0
+        # Анализ живости: let или let mut, поднятые объявления, перемещение
+        # значения при последнем использовании и ранний drop коллекций
+        self.liveness = LivenessAnalysis(self.argument_mode, self.method_mutates)
+        self.bindings = {}  # id(присваивания) -> let / let mut / assign
+        self.hoisted_declarations = {}  # id(оператора) -> [(имя, mut, значение по умолчанию)]
+        self.mutable_params = {}  # id(тела функции) -> параметры, которые переприсваиваются
+        self.tracked_uses = set()  # id(чтений) переменных, для которых известны последние использования
+        self.last_uses = set()
+        self.shared_aliases = set()  # id(чтений) a в b = a, где a или b затем изменяются на месте
+        self.drops = {}  # id(оператора) -> переменные, освобождаемые после него
+        self.mutating_methods = set()  # методы классов, принимающие &mut self
+        # Чистые функции: маленькие листовые получают #[inline], числовые - const fn,
+        # а их вызовы с литеральными аргументами вычисляются при компиляции
+        self.purity = PurityAnalysis()
+        self.const_functions = set()
+        self.precomputed_calls = set()  # функции, вызовы которых уже вычислены при компиляции
+        # Режим параллельного отображения: чистые списковые включения и map
+        # по Vec длиннее порога выполняются на всех ядрах
+        self.parallel_map = parallel_map
+        self.parallel_threshold = parallel_threshold
+        # Модули из реестра: списки, с которыми работает heapq, объявляются как
+        # BinaryHeap, а Counter и defaultdict дополняются через entry
+        self.heap_names = set()
+        self.default_maps = {}  # имя -> фабрика значения по умолчанию
+        # Файлы из with open(...): способ чтения или записи выбирается по использованию
+        self.file_access = FileAccessAnalysis()
+        self.file_plans = {}  # имя файловой переменной -> план
+        self.type_inference.method_types.update(FILE_METHOD_TYPES)
 
     def generate(self, node):
         # Динамически вызывает соответствующий метод генерации для каждого типа узла
@@ -22,41 +481,644 @@ class CodeGenerator:
         # Возвращае строку с текущим уровнем отступа
         return '    ' * self.indent_level
 
+    def generate_statement(self, node):
+        if id(node) in self.tail_call_statements:
+            # Хвостовой рекурсивный вызов в функции без возвращаемого значения
+            update = self.generate_parameter_update(self.tail_call_function, node.args)
+            return f"{update}\n{self.indent()}continue 'tail;"
+        if self.generator_loops and isinstance(node, (ForStatement, WhileStatement)):
+            # break и continue вложенного обычного цикла относятся к нему самому
+            outer_loops = self.generator_loops
+            self.generator_loops = []
+            code = self.generate_statement(node)
+            self.generator_loops = outer_loops
+            return code
+        if self.generator_loops and isinstance(node, Identifier) and node.name in ('break', 'continue'):
+            header, after = self.generator_loops[-1]
+            return f'{self.indent()}self.state = {after if node.name == "break" else header};\n{self.indent()}continue;'
+        if isinstance(node, Identifier) and node.name in ('break', 'continue') and self.jump_scopes:
+            code = self.generate_jump(node.name)
+        elif isinstance(node, (ForStatement, WhileStatement)):
+            code = self.generate_loop(node)
+        else:
+            # Выражения, используемые как операторы, завершаем точкой с запятой
+            code = self.generate(node)
+            if code and isinstance(node, (FunctionCall, MethodCall, BinaryOp, UnaryOp, Identifier)):
+                code = f'{self.indent()}{code};'
+        lines = []
+        for name, mutable, default in self.hoisted_declarations.get(id(node), []):
+            # Переменная нужна вне блока, где ей впервые присваивается значение
+            keyword = 'let mut' if mutable else 'let'
+            lines.append(f'{self.indent()}{keyword} {name} = Default::default();' if default
+                         else f'{self.indent()}{keyword} {name};')
+        if code:
+            lines.append(code)
+        for name in self.drops.get(id(node), []):
+            # Коллекция больше не нужна, а дальше идёт долгий код: освобождаем память сразу
+            type_ = self.type_inference.infer_type(Identifier(name))
+            if type_.startswith(SIZED_PREFIXES) or type_ in self.type_inference.soa_types:
+                lines.append(f'{self.indent()}drop({name});')
+        return '\n'.join(lines)
+
+    def generate_loop(self, node):
+        # Метка ставится перед заголовком цикла, только если к нему выходят
+        # break или continue из блока try
+        self.loop_count += 1
+        scope = {'kind': 'loop', 'label': f'loop_{self.loop_count}', 'used': False}
+        self.jump_scopes.append(scope)
+        code = self.generate(node)
+        self.jump_scopes.pop()
+        if not scope['used']:
+            return code
+        lines = code.split('\n')
+        for i, line in enumerate(lines):
+            stripped = line.lstrip()
+            if stripped.startswith(('for ', 'while ', 'loop {')):
+                lines[i] = f"{line[:len(line) - len(stripped)]}'{scope['label']}: {stripped}"
+                break
+        return '\n'.join(lines)
+
+    def generate_jump(self, kind):
+        crossed = False
+        for scope in reversed(self.jump_scopes):
+            if scope['kind'] == 'loop':
+                if crossed:
+                    scope['used'] = True
+                    return f"{self.indent()}{kind} '{scope['label']};"
+                return f'{self.indent()}{kind};'
+            if scope['kind'] == 'finally':
+                # Переход откладывается до конца finally, как отложенный return
+                scope['jumps'].add(kind)
+                return (f"{self.indent()}{scope['label']}_{kind} = true;\n"
+                        f"{self.indent()}break '{scope['label']} {scope['value']};")
+            crossed = True
+        return f'{self.indent()}{kind};'
+
+    def generate_statements(self, statements):
+        return [code for code in map(self.generate_statement, statements) if code]
+
     def generate_Program(self, node):
         imports = []
         functions = []
         main_statements = []
+
+        # Понижение циклов переписывает AST, поэтому выполняется до остальных анализов
+        self.index_loop_plans = self.loop_lowering.lower_program(node)
+        if self.fast_maps:
+            self.diagnostics.extend(self.map_lowering.lower_program(node))
+
+        # Предварительный анализ: типы аргументов в местах вызова и владение параметрами
+        function_defs = [s for s in node.statements if isinstance(s, FunctionDef)]
+        function_defs += [s.definition for s in node.statements
+                          if isinstance(s, DecoratedDef) and isinstance(s.definition, FunctionDef)]
+        class_defs = [s for s in node.statements if isinstance(s, ClassDef)]
+        for class_def in class_defs:
+            # Вызов класса возвращает его экземпляр ещё до вывода типов полей
+            self.type_inference.class_fields[class_def.name] = {}
+        for statement in node.statements:
+            if isinstance(statement, ImportStatement):
+                self.type_inference.register_import(statement)
+        self.plan_module_objects(node, function_defs)
+        self.report_module_shared_objects(node, function_defs)
+        self.ownership.analyze_program(function_defs)
+        self.call_site_types = self.type_inference.collect_call_site_types(node)
+        for function_def in function_defs:
+            self.plan_function_signature(function_def)
+        self.plan_classes(node, class_defs)
+        # Тип элементов генераторов нужен, чтобы вывести типы передаваемых им итераторов
+        generator_defs = [f for f in function_defs if is_generator(f)]
+        for function_def in generator_defs:
+            self.plan_generator(function_def)
+        # Второй проход учитывает типы параметров, выведенные на первом,
+        # для вызовов, которые передают параметры дальше
+        self.call_site_types = self.type_inference.collect_call_site_types(node, self.inferred_param_types)
+        for function_def in function_defs:
+            self.plan_function_signature(function_def)
+        for function_def in generator_defs:
+            self.plan_generator(function_def)
+        self.plan_classes(node, class_defs)
+        self.plan_specializations([s for s in node.statements if isinstance(s, FunctionDef)])
+        self.plan_purity([s for s in node.statements if isinstance(s, FunctionDef)])
+        if self.soa_layout:
+            self.plan_soa_layout(node)
+        self.preallocations = self.loop_analysis.find_preallocations(node)
+        top_level = [s for s in node.statements
+                     if not isinstance(s, (ImportStatement, FunctionDef, DecoratedDef, ClassDef))]
+        self.plan_liveness(node, function_defs, class_defs)
+        self.exceptions.analyze_program(function_defs)
+        self.raising_functions = {name for name, escapes in self.exceptions.escapes.items() if escapes}
+        self.error_variants = self.exceptions.exception_types(node)
+        if self.error_variants or any(isinstance(n, TryExcept) for n in walk(node)):
+            self.uses.add('std::borrow::Cow')
+            self.support_items['PyError'] = self.error_enum_item()
+        main_raises = bool(self.exceptions.block_escapes(top_level))
+        self.returns_result = main_raises
+        self.error_targets = ['return' if main_raises else None]
+        if self.buffered_output:
+            self.plan_buffered_output(node, function_defs)
         
         for statement in node.statements:
             if isinstance(statement, ImportStatement):
                 imports.append(self.generate(statement))
-            elif isinstance(statement, FunctionDef):
+            elif isinstance(statement, (FunctionDef, DecoratedDef, ClassDef)):
                 functions.append(self.generate(statement))
+                if isinstance(statement, FunctionDef):
+                    self.variant_codes.setdefault(statement.name, functions[-1])
             elif isinstance(statement, MainBlock):
                 # Если это MainBlock, добавляем его содержимое в main_statements
                 main_statements.extend(self.generate_statements(statement.body))
             else:
-                stmt = self.generate(statement)
+                stmt = self.generate_statement(statement)
                 if stmt:
                     main_statements.append(stmt)
+        # Копии, понадобившиеся уже после генерации своей функции
+        pending = self.generate_pending_specializations()
+        while pending:
+            functions.extend(pending)
+            pending = self.generate_pending_specializations()
+        # Исходная сигнатура функции, скопированной по месту вызова, не выводится,
+        # если её не вызывают и не передают по имени
+        referenced = {n.name for n in walk(node) if isinstance(n, Identifier)}
+        for name in self.on_demand_specialized - self.called_variants - referenced:
+            functions = [code.replace(self.variant_codes[name], '').strip('\n') for code in functions]
         
         code = []
+        if self.uses:
+            code.extend(f'use {path};' for path in sorted(self.uses))
+            code.append('')
+        
         if imports:
             code.extend(imports)
             code.append('')
         
+        if self.support_items:
+            code.extend(self.support_items.values())
+            code.append('')
+        
         if functions:
             code.extend(functions)
             code.append('')
         
-        if main_statements:
+        if self.buffered_output and self.uses_output(Program(top_level)):
+            # Один заблокированный буфер на всю программу вместо блокировки
+            # и сброса stdout в каждом println!
+            main_statements.insert(0, f'let mut {self.output_name} = BufWriter::new(std::io::stdout().lock());')
+            main_statements.append(f'{self.output_name}.flush().unwrap();')
+        
+        if main_raises:
+            # Необработанное исключение завершает программу с ненулевым кодом, как в Python
+            main_statements.append('Ok(())')
+            code.append('fn main() -> Result<(), PyError> {')
+            code.extend(self.main_lines(main_statements))
+            code.append('}')
+        elif main_statements:
             code.append('fn main() {')
-            for stmt in main_statements:
-                code.append(f'    {stmt}')
+            code.extend(self.main_lines(main_statements))
             code.append('}')
         
         return '\n'.join(filter(None, code))
 
+    def main_lines(self, statements):
+        # Операторы верхнего уровня генерируются без отступа: сдвигаем каждую строку
+        return ['    ' + line for statement in statements for line in statement.split('\n')]
+
+    def plan_liveness(self, program, function_defs, class_defs):
+        scopes = []
+        for function_def in function_defs:
+            scopes.append((function_def, self.signature_key(function_def)))
+        for class_def in class_defs:
+            for method in class_def.body:
+                if isinstance(method, FunctionDef) and method.name != '__init__':
+                    key = f'{class_def.name}.{method.name}' if 'self' in method.params else method.name
+                    scopes.append((method, key))
+        self.mutating_methods = {method.name for method, key in scopes if '.' in key
+                                 and any(self.is_self_attribute(n) and self.is_attribute_store(n, method)
+                                         for n in walk(method))}
+        plans = []
+        for function_def, key in scopes:
+            if is_generator(function_def):
+                # Переменные генератора хранятся в полях его структуры
+                continue
+            signature = self.function_signatures.get(key, [])
+            owned = [param for param, _, mode in signature if mode == 'owned']
+            excluded = [param for param in function_def.params if param not in owned]
+            plan = self.liveness.analyze_scope(function_def.body, owned, excluded)
+            self.mutable_params[id(function_def.body)] = plan['mutable_params']
+            plans.append(plan)
+        # Тело if __name__ == '__main__' выполняется в той же функции main
+        top_level = []
+        for statement in program.statements:
+            top_level.extend(statement.body if isinstance(statement, MainBlock) else [statement])
+        plans.append(self.liveness.analyze_scope(top_level))
+        for plan in plans:
+            self.bindings.update(plan['bindings'])
+            self.hoisted_declarations.update(plan['hoisted'])
+            self.tracked_uses |= plan['tracked_uses']
+            self.last_uses |= plan['last_uses']
+            self.drops.update(plan['drops'])
+            self.shared_aliases |= plan['shared_aliases']
+
+    def argument_mode(self, call, index):
+        # Способ передачи аргумента в пользовательскую функцию или метод.
+        # Типы переменных ещё не выведены, поэтому метод ищется по имени во всех классах
+        member = self.type_inference.module_member(call)
+        if member:
+            # Изменяющие функции модулей (heappush, insort) забирают добавляемое значение
+            if member[1] not in MODULE_REGISTRY[member[0]]['mutating']:
+                return 'ref'
+            return 'mut' if index == 0 else 'owned'
+        if isinstance(call, MethodCall):
+            keys = [key for key in self.function_signatures if key.endswith(f'.{call.method_name}')]
+        else:
+            keys = [call.name]
+        modes = {self.function_signatures[key][index][2] for key in keys
+                 if key in self.function_signatures and index < len(self.function_signatures[key])}
+        if 'mut' in modes:
+            return 'mut'
+        return 'ref' if modes == {'ref'} else 'owned'
+
+    def method_mutates(self, call):
+        # Метод пользовательского класса, изменяющий поля self
+        return call.method_name in self.mutating_methods
+
+    def let_keyword(self, node):
+        return 'let' if self.bindings.get(id(node)) == 'let' else 'let mut'
+
+    def moved_value(self, node, code):
+        # Значение переменной, не Copy, забирается без копии только при последнем
+        # использовании; до него передаётся копия
+        if isinstance(node, Identifier) and self.borrowed_params.get(node.name) == 'mut':
+            # Из параметра &mut значение не забрать: сохраняется его копия
+            return f'{code}.clone()'
+        if not isinstance(node, Identifier) or id(node) in self.last_uses:
+            return code
+        type_ = self.type_inference.infer_type(node)
+        if id(node) not in self.tracked_uses:
+            # Клон потока или очереди дёшев и ссылается на тот же объект,
+            # поэтому он нужен даже там, где последнее использование неизвестно
+            return f'{code}.clone()' if type_.startswith(SHARED_TYPES) else code
+        if type_ == 'unknown' or type_ in COPY_TYPES or self.class_plans.get(type_, {}).get('copy'):
+            return code
+        if id(node) in self.shared_aliases:
+            # Копия разделила бы объект, общий в Python: изменения через одно имя
+            # не были бы видны через другое. Значение перемещается, и rustc
+            # сообщит о дальнейшем использовании исходной переменной
+            self.diagnostics.append(f'{node.name}: присваивание другой переменной с последующим изменением на месте '
+                                    f'создаёт в Python общий объект; такие псевдонимы не поддерживаются')
+            return code
+        return f'{code}.clone()'
+
+    def plan_buffered_output(self, program, function_defs):
+        # Функция печатает, если содержит print или вызывает печатающую функцию
+        names = {n.name for n in walk(program) if isinstance(n, Identifier)}
+        names |= {param for function_def in function_defs for param in function_def.params}
+        while self.output_name in names:
+            self.output_name += '_'
+        changed = True
+        while changed:
+            changed = False
+            for function_def in function_defs:
+                # Генератор не может хранить заимствованный буфер, он печатает через println!
+                if is_generator(function_def):
+                    continue
+                if function_def.name not in self.printing_functions and self.uses_output(function_def):
+                    self.printing_functions.add(function_def.name)
+                    changed = True
+        # Генераторы и методы классов печатают через println! мимо буфера: их
+        # вывод опередил бы всё, что накоплено в буфере, поэтому буфер отключается
+        unbuffered = [f for f in function_defs if is_generator(f)]
+        unbuffered += [s for c in program.statements if isinstance(c, ClassDef) for s in c.body if isinstance(s, FunctionDef)]
+        printing = [f.name for f in unbuffered if self.uses_output(f)]
+        if printing:
+            self.diagnostics.append(f'буферизованный вывод отключён: {", ".join(printing)} печатает без доступа '
+                                    f'к буферу, и порядок вывода нарушился бы')
+            self.buffered_output = False
+            self.printing_functions.clear()
+            return
+        if self.printing_functions or any(isinstance(n, PrintStatement) for n in walk(program)):
+            self.uses.update({'std::io::BufWriter', 'std::io::Write'})
+
+    def uses_output(self, node):
+        return any(isinstance(n, PrintStatement)
+                   or (isinstance(n, FunctionCall) and n.name in self.printing_functions)
+                   for n in scope_nodes(node))
+
+    def output_param(self, name):
+        return [f'{self.output_name}: &mut impl Write'] if name in self.printing_functions else []
+
+    def output_argument(self, name):
+        if name not in self.printing_functions:
+            return []
+        return [self.output_name if self.output_borrowed else f'&mut {self.output_name}']
+
+    def plan_classes(self, program, class_defs):
+        # Поля класса - атрибуты, присваиваемые через self (сначала в __init__),
+        # типы параметров конструктора - по местам вызова класса
+        inits = [s for class_def in class_defs for s in class_def.body
+                 if isinstance(s, FunctionDef) and s.name == '__init__']
+        initialized = {id(attribute) for init in inits for attribute in attribute_stores(init)
+                       if self.is_self_attribute(attribute)}
+        # Поля, которые меняются после создания объекта - в методах, через
+        # другие переменные или переменную цикла. Тип объекта здесь ещё не
+        # известен, поэтому учитываются записи в поле с тем же именем у любого объекта
+        stored = {attribute.attr_name for attribute in attribute_stores(program) if id(attribute) not in initialized}
+        for class_def in class_defs:
+            methods = [s for s in class_def.body if isinstance(s, FunctionDef)]
+            methods.sort(key=lambda method: method.name != '__init__')
+            init = methods[0] if methods and methods[0].name == '__init__' else None
+            call_sites = self.call_site_types.get(class_def.name, [])
+            params = []
+            annotated = self.type_inference.annotated_params(init) if init else {}
+            for index, param in enumerate(p for p in (init.params if init else []) if p != 'self'):
+                param_type = annotated.get(param, 'unknown')
+                if param_type == 'unknown':
+                    param_type = self.type_inference.param_type_from_call_sites(call_sites, index)
+                if param_type == 'unknown':
+                    param_type = self.type_inference.infer_param_type_from_usage(init, param)
+                if param_type == 'unknown':
+                    self.report_default_type(f'{class_def.name}: тип параметра конструктора {param} не выведен')
+                params.append((param, 'i32' if param_type == 'unknown' else param_type))
+            fields = {}
+            for method in methods:
+                self.type_inference.enter_scope()
+                if method is init:
+                    for param, param_type in params:
+                        self.type_inference.update_type(param, param_type)
+                for n in scope_nodes(method):
+                    if not isinstance(n, Assignment):
+                        continue
+                    value_type = self.type_inference.assigned_type(n)
+                    if isinstance(n.left, Identifier) and value_type != 'unknown':
+                        self.type_inference.update_type(n.left.name, value_type)
+                    elif self.is_self_attribute(n.left) and n.left.attr_name not in fields:
+                        if value_type == 'unknown':
+                            self.report_default_type(f'{class_def.name}: тип поля {n.left.attr_name} не выведен')
+                        fields[n.left.attr_name] = 'i32' if value_type == 'unknown' else value_type
+                self.type_inference.exit_scope()
+            self.type_inference.class_fields[class_def.name] = fields
+            # Copy - только для небольших неизменяемых записей из примитивов:
+            # иначе копия разошлась бы с оригиналом, на который ссылается Python
+            copy = (len(fields) <= COPY_STRUCT_FIELDS and all(t in COPY_TYPES for t in fields.values())
+                    and not stored & set(fields))
+            self.class_plans[class_def.name] = {'fields': fields, 'params': params, 'copy': copy}
+
+    def report_default_type(self, message):
+        # Классы планируются в два прохода: сообщение о типе по умолчанию - одно
+        message = f'{message}, используется i32; нужна аннотация'
+        if message not in self.diagnostics:
+            self.diagnostics.append(message)
+
+    def is_self_attribute(self, node):
+        return isinstance(node, Attribute) and isinstance(node.obj, Identifier) and node.obj.name == 'self'
+
+    def is_attribute_store(self, node, root):
+        return any((isinstance(n, Assignment) and n.left is node)
+                   or (isinstance(n, AugAssignment) and n.target is node)
+                   or (isinstance(n, MethodCall) and n.obj is node and n.method_name in MUTATING_METHODS)
+                   for n in walk(root))
+
+    def plan_specializations(self, function_defs):
+        # Вместо одной сигнатуры с i32 по умолчанию - статически вызываемая
+        # копия на каждый набор конкретных типов аргументов в местах вызова
+        for function_def in function_defs:
+            if is_generator(function_def) or function_def.annotations:
+                # Аннотированные параметры задают единственную сигнатуру
+                continue
+            self.specialized_defs[function_def.name] = function_def
+            variants = []
+            for types in self.call_site_types.get(function_def.name, []):
+                if (len(types) == len(function_def.params) and all(map(self.is_concrete_type, types))
+                        and types not in variants):
+                    variants.append(types)
+            if len(variants) < 2:
+                continue
+            self.specializations[function_def.name] = {}
+            for types in variants:
+                self.add_specialization(function_def, types)
+            described = ', '.join(f'({", ".join(types)})' for types in variants)
+            self.diagnostics.append(f'{function_def.name}: {len(variants)} специализации по типам аргументов {described}')
+
+    def plan_purity(self, function_defs):
+        self.purity.analyze_program(function_defs, self.ownership.usages)
+        # const fn нужны числовые сигнатуры у всех вариантов функции; рекурсия,
+        # заменённая циклом со стеком, в const fn невозможна
+        candidates = set()
+        for name in self.purity.const_functions:
+            signatures = [self.function_signatures.get(name, [])]
+            signatures += [signature for _, signature in self.specializations.get(name, {}).values()]
+            if all(map(self.is_const_signature, signatures)) and self.recursion.plan(self.purity.functions[name]) is None:
+                candidates.add(name)
+        self.const_functions = self.purity.closure(candidates)
+
+    def is_const_signature(self, signature):
+        return all(param_type in CONST_TYPES and mode == 'owned' for _, param_type, mode in signature)
+
+    def is_literal(self, node):
+        if isinstance(node, UnaryOp) and node.op == '-':
+            return isinstance(node.expr, Num)
+        return isinstance(node, Num) or (isinstance(node, Constant) and isinstance(node.value, bool))
+
+    def precomputed_call(self, node, name, signature, code):
+        # Вызов const fn с литеральными аргументами вычисляется компилятором
+        if (node.name not in self.purity.precomputable or node.name not in self.const_functions
+                or not self.is_const_signature(signature) or not all(map(self.is_literal, node.args))):
+            return code
+        return_type = self.function_return_types.get(name) or self.type_inference.infer_type(node)
+        if return_type not in CONST_TYPES or return_type == '()':
+            return code
+        if node.name not in self.precomputed_calls:
+            self.precomputed_calls.add(node.name)
+            self.diagnostics.append(f'{node.name}: вызовы с литеральными аргументами вычисляются при компиляции')
+        return f'{{ const VALUE: {return_type} = {code}; VALUE }}'
+
+    def is_concrete_type(self, type_):
+        return ('unknown' not in type_ and not self.type_inference.is_placeholder(type_)
+                and not type_.startswith('impl '))
+
+    def add_specialization(self, function_def, types):
+        mangled = '_'.join(''.join(c if c.isalnum() else '_' for c in t.lower()).strip('_') for t in types)
+        while '__' in mangled:
+            mangled = mangled.replace('__', '_')
+        name = f'{function_def.name}__{mangled}'
+        signature = [(param, param_type, self.ownership.passing_mode(function_def.name, param, param_type))
+                     for param, param_type in zip(function_def.params, types)]
+        self.specializations[function_def.name][types] = (name, signature)
+        # Предварительная оценка типа результата; уточняется после генерации копии
+        self.type_inference.enter_scope()
+        for param, param_type in zip(function_def.params, types):
+            self.type_inference.update_type(param, param_type)
+        return_type = self.type_inference.analyze_function_body(function_def)
+        self.type_inference.exit_scope()
+        self.type_inference.specializations.setdefault(function_def.name, {})[types] = return_type
+
+    def specialization_for(self, node):
+        # Копия функции для типов аргументов данного вызова. Функция с одной
+        # сигнатурой получает копию, если её вызывают с другими типами
+        # (например, из тела другой специализированной функции)
+        function_def = self.specialized_defs.get(node.name)
+        types = tuple(self.type_inference.infer_type(arg) for arg in node.args)
+        concrete = (function_def is not None and len(types) == len(function_def.params)
+                    and all(map(self.is_concrete_type, types)))
+        if node.name not in self.specializations:
+            signature = self.function_signatures[node.name]
+            if not concrete or types == tuple(param_type for _, param_type, _ in signature):
+                return node.name, signature
+            # Исходная сигнатура остаётся под исходным именем
+            self.specializations[node.name] = {
+                tuple(param_type for _, param_type, _ in signature): (node.name, signature)
+            }
+            self.type_inference.specializations[node.name] = {}
+            self.on_demand_specialized.add(node.name)
+            self.add_specialization(function_def, types)
+            self.diagnostics.append(f'{node.name}: специализация для типов аргументов ({", ".join(types)})')
+        variants = self.specializations[node.name]
+        if types not in variants:
+            if not concrete:
+                return next(iter(variants.values()))
+            self.add_specialization(function_def, types)
+        return variants[types]
+
+    def generate_specializations(self, node):
+        codes = []
+        for types, (name, signature) in list(self.specializations[node.name].items()):
+            if name in self.emitted_specializations:
+                continue
+            self.emitted_specializations.add(name)
+            outer_specialization = self.current_specialization
+            self.current_specialization = (name, types)
+            self.function_signatures[node.name] = signature
+            self.variant_codes[name] = self.generate_FunctionDef(node)
+            codes.append(self.variant_codes[name])
+            self.current_specialization = outer_specialization
+        return '\n'.join(codes)
+
+    def generate_pending_specializations(self):
+        return [self.generate_specializations(self.specialized_defs[name])
+                for name, variants in list(self.specializations.items())
+                if any(variant not in self.emitted_specializations for variant, _ in variants.values())]
+
+    def plan_soa_layout(self, program):
+        # Списки записей, которые хранятся по полям (см. LayoutAnalysis)
+        records = self.layout.record_classes(program, self.type_inference.class_fields)
+        self.soa_declarations, self.soa_loops = self.layout.find_soa_lists(program, records)
+        soa_names = set()
+        for statement in walk(program):
+            class_name = self.soa_declarations.get(id(statement))
+            if class_name is None:
+                continue
+            soa_names.add(statement.left.name)
+            container = f'{class_name}Soa'
+            if container not in self.support_items:
+                self.support_items[container] = self.soa_item(class_name)
+                self.type_inference.soa_types[container] = class_name
+                self.diagnostics.append(f'{class_name}: списки экземпляров хранятся по полям в {container}')
+        # Индексный обход таких списков выполняется через поля, а не итератором по элементам
+        self.index_loop_plans = {key: plan for key, plan in self.index_loop_plans.items()
+                                 if not any(array in soa_names for array, _ in plan['arrays'])}
+
+    def soa_item(self, class_name):
+        # Контейнер с отдельным Vec на каждое поле: цикл по одному полю читает
+        # непрерывную память без соседних полей, что позволяет векторизацию
+        container = f'{class_name}Soa'
+        fields = self.type_inference.class_fields[class_name]
+        lines = ['#[derive(Debug, Default, Clone)]', f'struct {container} {{']
+        lines.extend(f'    {field}: Vec<{self.render_type(field_type)}>,' for field, field_type in fields.items())
+        lines.append('}')
+        lines.append('')
+        lines.append(f'impl {container} {{')
+        lines.append('    fn with_capacity(capacity: usize) -> Self {')
+        inits = ', '.join(f'{field}: Vec::with_capacity(capacity)' for field in fields)
+        lines.append(f'        {container} {{ {inits} }}')
+        lines.append('    }')
+        lines.append('')
+        lines.append(f'    fn push(&mut self, item: {class_name}) {{')
+        lines.extend(f'        self.{field}.push(item.{field});' for field in fields)
+        lines.append('    }')
+        lines.append('')
+        lines.append('    fn len(&self) -> usize {')
+        lines.append(f'        self.{next(iter(fields))}.len()')
+        lines.append('    }')
+        lines.append('}')
+        lines.append('')
+        lines.append(f'impl FromIterator<{class_name}> for {container} {{')
+        lines.append(f'    fn from_iter<I: IntoIterator<Item = {class_name}>>(iter: I) -> Self {{')
+        lines.append('        let iter = iter.into_iter();')
+        lines.append(f'        let mut soa = {container}::with_capacity(iter.size_hint().0);')
+        lines.append('        for item in iter {')
+        lines.append('            soa.push(item);')
+        lines.append('        }')
+        lines.append('        soa')
+        lines.append('    }')
+        lines.append('}')
+        return '\n'.join(lines)
+
+    def collection_type(self, kind):
+        # Имя типа HashMap / HashSet в генерируемом коде
+        self.uses.add(f'std::collections::{kind}')
+        if not self.fast_maps:
+            return kind
+        self.uses.update({'std::hash::BuildHasherDefault', 'std::hash::Hasher'})
+        self.support_items['FxHasher'] = FX_HASHER_ITEM
+        self.support_items[f'Fx{kind}'] = FX_COLLECTION_ITEMS[kind]
+        return f'Fx{kind}'
+
+    def new_collection(self, kind, capacity=None):
+        name = self.collection_type(kind)
+        if self.fast_maps:
+            if capacity is None:
+                return f'{name}::default()'
+            return f'{name}::with_capacity_and_hasher({capacity}, Default::default())'
+        if capacity is None:
+            return f'{name}::new()'
+        return f'{name}::with_capacity({capacity})'
+
+    def render_type(self, type_):
+        # Тип для сигнатуры; в режиме fast_maps HashMap и HashSet заменяются псевдонимами
+        for kind in ('HashMap', 'HashSet'):
+            if f'{kind}<' in type_:
+                type_ = type_.replace(f'{kind}<', f'{self.collection_type(kind)}<')
+        return type_
+
+    def error_enum_item(self):
+        # Одно перечисление на программу: вариант на каждый тип исключения.
+        # Сообщение - Cow, поэтому raise со строковым литералом не выделяет память
+        variants = sorted(self.error_variants)
+        lines = ['#[derive(Clone)]', 'enum PyError {']
+        lines.extend(f"    {variant}(Cow<'static, str>)," for variant in variants)
+        lines.append('}')
+        lines.append('')
+        lines.append('impl std::fmt::Display for PyError {')
+        lines.append('    fn fmt(&self, f: &mut std::fmt::Formatter) -> std::fmt::Result {')
+        lines.append('        match *self {')
+        for variant in variants:
+            lines.append(f'            PyError::{variant}(ref message) if message.is_empty() => f.write_str("{variant}"),')
+            lines.append(f'            PyError::{variant}(ref message) => write!(f, "{variant}: {{}}", message),')
+        lines.append('        }')
+        lines.append('    }')
+        lines.append('}')
+        lines.append('')
+        lines.append('impl std::fmt::Debug for PyError {')
+        lines.append('    fn fmt(&self, f: &mut std::fmt::Formatter) -> std::fmt::Result {')
+        lines.append('        std::fmt::Display::fmt(self, f)')
+        lines.append('    }')
+        lines.append('}')
+        return '\n'.join(lines)
+
+    def propagate_error(self, error):
+        # Передаёт ошибку ближайшему обработчику: выход из помеченного блока try
+        # значением Err или возврат Err из функции
+        target = self.error_targets[-1] if self.error_targets else None
+        if target == 'return':
+            return f'return Err({error})'
+        if target is None:
+            return f'panic!("{{}}", {error})'
+        return f"break '{target} Err({error})"
+
+    def propagate_call(self, code):
+        if self.error_targets and self.error_targets[-1] == 'return':
+            return f'{code}?'
+        return f'match {code} {{ Ok(value) => value, Err(error) => {self.propagate_error("error")} }}'
+
     def is_main_block(self, if_statement):
         if isinstance(if_statement.condition, BinaryOp):
             left = if_statement.condition.left
@@ -67,58 +1129,522 @@ class CodeGenerator:
                     right.value == '__main__')
         return False
 
+    def signature_key(self, node):
+        # Методы хранятся отдельно от функций с тем же именем
+        if self.current_class and 'self' in node.params:
+            return f'{self.current_class}.{node.name}'
+        return node.name
+
+    def plan_function_signature(self, node):
+        # Определяет тип каждого параметра и способ его передачи:
+        # owned - по значению, ref - неизменяемое заимствование, mut - изменяемое
+        key = self.signature_key(node)
+        call_sites = self.call_site_types.get(key, [])
+        signature = []
+        self.inferred_param_types[key] = {}
+        annotated = self.type_inference.annotated_params(node)
+        for index, param in enumerate(p for p in node.params if p != 'self'):
+            # Аннотация - точный тип, вывод нужен только для параметров без неё
+            param_type = annotated.get(param, 'unknown')
+            if param_type == 'unknown':
+                param_type = self.type_inference.param_type_from_call_sites(call_sites, index)
+            if param_type == 'unknown':
+                param_type = self.type_inference.infer_param_type_from_usage(node, param)
+            if param_type != 'unknown':
+                self.inferred_param_types[key][param] = param_type
+            else:
+                param_type = 'i32'  # Предполагаем тип по умолчанию
+            # Генератор хранит параметры в своей структуре, поэтому получает их во владение
+            mode = 'owned' if is_generator(node) else self.ownership.passing_mode(key, param, param_type)
+            signature.append((param, param_type, mode))
+        self.function_signatures[key] = signature
+        return signature
+
     def generate_FunctionDef(self, node):
+        if node.name in self.generator_plans:
+            return self.generate_generator_function(node)
+        if node.name in self.specializations and self.current_specialization is None:
+            return self.generate_specializations(node)
+        if self.current_specialization is None and self.current_class is None:
+            self.emitted_specializations.add(node.name)
         self.type_inference.enter_scope()
         
         # Регистрируем функцию для анализа рекурсивных вызовов
         self.type_inference.register_function(node.name, node)
         
-        for param in node.params:
-            self.type_inference.update_type(param, 'unknown')
+        raises = node.name in self.raising_functions
+        # Функции с Result не переписываются циклом: возвраты оборачиваются в Ok
+        recursion_plan = None if raises else self.recursion.plan(node)
+        signature = self.function_signatures.get(self.signature_key(node)) or self.plan_function_signature(node)
+        if recursion_plan and recursion_plan['kind'] == 'accumulate':
+            # Аккумулятор меняет порядок операндов, что верно только для чисел:
+            # rep(n - 1) + str(n) для строк остаётся рекурсией
+            for param, param_type, _ in signature:
+                self.type_inference.update_type(param, param_type)
+            if self.type_inference.infer_type(recursion_plan['term']) not in ('i32', 'i64', 'f64'):
+                recursion_plan = None
+        # Параметры переприсваиваются в цикле, если рекурсия заменяется на него
+        param_prefix = 'mut ' if recursion_plan and recursion_plan['kind'] != 'pairwise' else ''
         
         params = []
-        for param in node.params:
-            param_type = self.type_inference.infer_type(Identifier(param))
-            if param == 'self':
-                params.append('&self')
-            elif self.type_inference.is_reference(param_type):
-                params.append(f'{param}: {param_type}')
-            elif param_type == 'unknown':
-                param_type = 'i32'  # Предполагаем тип по умолчанию
-                params.append(f'{param}: {param_type}')
-                self.type_inference.update_type(param, param_type)
-            else:
-                params.append(f'{param}: {param_type}')
+        if 'self' in node.params:
+            self.type_inference.update_type('self', self.current_class or 'Self')
+            mutates = any(self.is_self_attribute(n) and self.is_attribute_store(n, node) for n in walk(node))
+            params.append('&mut self' if mutates else '&self')
+        params += self.output_param(node.name)
+        outer_borrowed_params = self.borrowed_params
+        self.borrowed_params = {}
+        outer_output_borrowed = self.output_borrowed
+        self.output_borrowed = node.name in self.printing_functions
+        outer_returns_result = self.returns_result
+        self.returns_result = raises
+        self.error_targets.append('return' if raises else None)
+        mutable_params = self.mutable_params.get(id(node.body), set())
+        for param, param_type, mode in signature:
+            self.type_inference.update_type(param, param_type)
+            prefix = param_prefix or ('mut ' if param in mutable_params else '')
+            params.append(f'{prefix}{param}: {self.render_type(self.ownership.borrowed_type(param_type, mode))}')
+            if mode != 'owned':
+                self.borrowed_params[param] = mode
+            if mode == 'mut' and self.ownership.mutated_and_consumed(self.signature_key(node), param):
+                self.diagnostics.append(f'{node.name}: параметр {param} изменяется на месте и возвращается или '
+                                        f'сохраняется; изменения видны вызывающему коду, но сохранённое значение - копия')
         
         params_str = ', '.join(params)
+        outer_expected_return = self.expected_return
+        self.expected_return = self.type_inference.annotation_type(node.return_annotation)
+        outer_return_targets = self.return_targets
+        self.return_targets = []
+        outer_jump_scopes = self.jump_scopes
+        self.jump_scopes = []
+        
+        self.indent_level += 1
+        if recursion_plan:
+            self.diagnostics.append(self.recursion.describe(node.name, recursion_plan))
+            body = self.generate_recursion_free_body(node, recursion_plan)
+        else:
+            body = self.generate_statements(node.body)
+        self.indent_level -= 1
         
         # Анализируем тело функции для определения возвращаемого типа
+        # (после генерации тела, когда известны типы локальных переменных)
         return_type = 'i32'  # Для рекурсивных функций предполагаем i32
+        if not any(isinstance(n, ReturnStatement) for n in walk(node)):
+            return_type = '()'
         for statement in node.body:
             if isinstance(statement, ReturnStatement):
                 expr_type = self.type_inference.infer_type(statement.expr)
                 if expr_type != 'unknown':
                     return_type = expr_type
                 break
+        annotated_return = self.type_inference.annotation_type(node.return_annotation)
+        if annotated_return != 'unknown':
+            return_type = annotated_return
         
-        function_code = f'{self.indent()}fn {node.name}({params_str}) -> {return_type} {{\n'
-        self.indent_level += 1
-        for statement in node.body:
-            stmt_code = self.generate(statement)
+        if 'self' in node.params and self.current_class:
+            self.type_inference.method_types[(self.current_class, node.name)] = return_type
+        name = node.name
+        if self.current_specialization:
+            name, types = self.current_specialization
+            self.type_inference.specializations[node.name][types] = return_type
+        elif self.current_class is None:
+            self.type_inference.return_types[node.name] = return_type
+        if raises:
+            if return_type == '()' and not self.always_returns(node.body):
+                body.append(f'{self.indent()}    Ok(())')
+            return_type = f'Result<{return_type}, PyError>'
+        
+        function_code = ''
+        if recursion_plan:
+            function_code += f'{self.indent()}// {self.recursion.describe(node.name, recursion_plan)}\n'
+        self.function_return_types[name] = return_type
+        qualifier = ''
+        if self.current_class is None and node.name in self.purity.functions:
+            if node.name in self.purity.inline:
+                function_code += f'{self.indent()}#[inline]\n'
+            if node.name in self.const_functions and self.is_const_signature(signature) and return_type in CONST_TYPES:
+                qualifier = 'const '
+        function_code += f'{self.indent()}{qualifier}fn {name}({params_str}) -> {self.render_type(return_type)} {{\n'
+        for stmt_code in body:
             function_code += f'{stmt_code}\n'
-        self.indent_level -= 1
         function_code += f'{self.indent()}}}'
         
+        self.borrowed_params = outer_borrowed_params
+        self.output_borrowed = outer_output_borrowed
+        self.returns_result = outer_returns_result
+        self.expected_return = outer_expected_return
+        self.return_targets = outer_return_targets
+        self.jump_scopes = outer_jump_scopes
+        self.error_targets.pop()
         self.type_inference.exit_scope()
         
         return function_code
 
+    def generate_recursion_free_body(self, node, plan):
+        # Тело функции, в котором рекурсия заменена циклом (см. RecursionElimination)
+        lines = []
+        if plan['kind'] == 'tail':
+            outer_tail_call = (self.tail_call_function, self.tail_call_statements)
+            self.tail_call_function = node
+            self.tail_call_statements = plan['tail_statements']
+            lines.append(f"{self.indent()}'tail: loop {{")
+            self.indent_level += 1
+            lines.extend(self.generate_statements(node.body))
+            if not self.always_returns(node.body):
+                lines.append(f'{self.indent()}break;')
+            self.indent_level -= 1
+            lines.append(f'{self.indent()}}}')
+            self.tail_call_function, self.tail_call_statements = outer_tail_call
+        elif plan['kind'] == 'accumulate':
+            acc = self.fresh_name('acc', node)
+            identity = plan['identity']
+            if any(self.type_inference.infer_type(base) == 'f64' for _, _, base in plan['guards']):
+                identity = f'{identity}.0'
+            lines.append(f'{self.indent()}let mut {acc} = {identity};')
+            lines.append(f'{self.indent()}loop {{')
+            self.indent_level += 1
+            for condition, negate, base in plan['guards']:
+                condition_code = self.generate(condition)
+                if negate:
+                    condition_code = f'!{condition_code}'
+                lines.append(f'{self.indent()}if {condition_code} {{')
+                lines.append(f'{self.indent()}    return {acc} {plan["op"]} {self.generate(base)};')
+                lines.append(f'{self.indent()}}}')
+            lines.append(f'{self.indent()}{acc} = {acc} {plan["op"]} {self.generate(plan["term"])};')
+            lines.append(self.generate_parameter_update(node, plan['args']))
+            self.indent_level -= 1
+            lines.append(f'{self.indent()}}}')
+        elif plan['kind'] == 'pairwise':
+            param = plan['param']
+            base = plan['base']
+            previous = self.fresh_name('previous', node)
+            current = self.fresh_name('current', node)
+            lines.append(f'{self.indent()}if {self.generate(plan["condition"])} {{')
+            lines.append(f'{self.indent()}    return {self.generate(base)};')
+            lines.append(f'{self.indent()}}}')
+            lines.append(f'{self.indent()}let mut {previous} = {self.generate_base_value(base, param, 0)};')
+            lines.append(f'{self.indent()}let mut {current} = {self.generate_base_value(base, param, 1)};')
+            lines.append(f'{self.indent()}for _ in 2..={param} {{')
+            if plan['order'] == 'current_previous':
+                operands = (current, previous)
+            else:
+                operands = (previous, current)
+            lines.append(f'{self.indent()}    let next = {operands[0]} {plan["op"]} {operands[1]};')
+            lines.append(f'{self.indent()}    {previous} = {current};')
+            lines.append(f'{self.indent()}    {current} = next;')
+            lines.append(f'{self.indent()}}}')
+            lines.append(f'{self.indent()}return {current};')
+        return lines
+
+    def generate_parameter_update(self, function_def, args):
+        # Одновременное переприсваивание параметров вместо рекурсивного вызова
+        signature = self.function_signatures.get(function_def.name, [])
+        modes = [mode for _, _, mode in signature] or ['owned'] * len(args)
+        values = [self.generate_argument(arg, mode) for arg, mode in zip(args, modes)]
+        params = [p for p in function_def.params if p != 'self']
+        if len(params) == 1:
+            return f'{self.indent()}{params[0]} = {values[0]};'
+        return f'{self.indent()}({", ".join(params)}) = ({", ".join(values)});'
+
+    def generate_base_value(self, base, param, value):
+        # Значение базового случая при param = value
+        if isinstance(base, Identifier) and base.name == param:
+            return str(value)
+        if not any(isinstance(n, Identifier) and n.name == param for n in walk(base)):
+            return self.generate(base)
+        return f'{{ let {param} = {value}; {self.generate(base)} }}'
+
+    def always_returns(self, statements):
+        if not statements:
+            return False
+        last = statements[-1]
+        if isinstance(last, (ReturnStatement, RaiseStatement)):
+            return True
+        if isinstance(last, TryExcept):
+            return (self.always_returns(last.finally_body)
+                    or ((self.always_returns(last.try_body) or self.always_returns(last.else_body))
+                        and all(self.always_returns(handler.body) for handler in last.except_handlers)))
+        return (isinstance(last, IfStatement) and bool(last.false_body)
+                and self.always_returns(last.true_body) and self.always_returns(last.false_body))
+
+    def fresh_name(self, base, node):
+        # Имя служебной переменной, не совпадающее с именами внутри узла
+        names = {n.name for n in walk(node) if isinstance(n, Identifier)} | set(getattr(node, 'params', ()))
+        name = base
+        while name in names:
+            name += '_'
+        return name
+
+    def plan_generator(self, node):
+        # Поля структуры генератора и тип выдаваемых элементов
+        signature = self.function_signatures.get(node.name) or self.plan_function_signature(node)
+        fields = {param: param_type for param, param_type, _ in signature}
+        locals_ = self.generators.local_names(node)
+        self.type_inference.enter_scope()
+        for param, param_type in fields.items():
+            self.type_inference.update_type(param, param_type)
+        item_types = []
+        for n in scope_nodes(node):
+            if isinstance(n, Assignment) and isinstance(n.left, Identifier):
+                value_type = self.type_inference.assigned_type(n)
+                if value_type != 'unknown' and not self.type_inference.is_placeholder(value_type):
+                    self.type_inference.update_type(n.left.name, value_type)
+            elif isinstance(n, ForStatement) and isinstance(n.target, Identifier):
+                item_type = self.type_inference.iteration_item_type(n.iterable)
+                if item_type != 'unknown':
+                    self.type_inference.update_type(n.target.name, item_type)
+            elif isinstance(n, Yield):
+                item_types.append(self.type_inference.infer_type(n.value) if n.value else '()')
+            elif isinstance(n, YieldFrom):
+                item_types.append(self.type_inference.iteration_item_type(n.value))
+        for name in locals_:
+            local_type = self.type_inference.infer_type(Identifier(name))
+            fields[name] = 'i32' if local_type == 'unknown' else local_type
+        self.type_inference.exit_scope()
+        item = next((t for t in item_types if t != 'unknown'), 'i32')
+        annotated = self.type_inference.annotation_type(node.return_annotation)
+        if annotated.startswith('impl Iterator<Item = '):
+            item = annotated[len('impl Iterator<Item = '):-1]
+        self.generator_plans[node.name] = {
+            'struct': self.generators.struct_name(node.name),
+            'fields': fields,
+            'item': item,
+        }
+        self.type_inference.generator_items[node.name] = item
+
+    def generator_field_type(self, field_type):
+        # Итератор-параметр хранится в поле как Box<dyn Iterator>
+        if field_type.startswith('impl Iterator'):
+            return f'Box<dyn {field_type[5:]}>'
+        return self.render_type(field_type)
+
+    def generate_generator_function(self, node):
+        # Генератор -> структура с состоянием, impl Iterator, в котором next()
+        # продолжает выполнение с места последнего yield, и функция-конструктор
+        # с исходным именем. Элементы вычисляются по одному, без сбора в Vec.
+        plan = self.generator_plans[node.name]
+        struct = plan['struct']
+        fields = plan['fields']
+        indent = self.indent()
+
+        outer_state = (self.generator_function, self.generator_fields, self.generator_states,
+                       self.generator_extra_fields, self.borrowed_params, self.buffered_output,
+                       self.indent_level)
+        self.generator_function = node
+        self.generator_fields = set(fields)
+        self.generator_states = [[], []]
+        self.generator_extra_fields = {}
+        self.borrowed_params = {}
+        self.buffered_output = False
+        self.error_targets.append(None)
+        self.type_inference.enter_scope()
+        for name, field_type in fields.items():
+            self.type_inference.update_type(name, field_type)
+
+        # Код состояний находится внутри impl -> fn next -> loop -> match -> ветвь
+        self.indent_level += 5
+        end = self.compile_generator_block(node.body, 0)
+        self.generator_states[end].append(f'{self.indent()}self.state = 1;')
+        self.generator_states[end].append(f'{self.indent()}return None;')
+        states = self.generator_states
+        extra_fields = self.generator_extra_fields
+
+        self.type_inference.exit_scope()
+        self.error_targets.pop()
+        (self.generator_function, self.generator_fields, self.generator_states,
+         self.generator_extra_fields, self.borrowed_params, self.buffered_output,
+         self.indent_level) = outer_state
+
+        item = self.render_type(plan['item'])
+        lines = [f'{indent}struct {struct} {{', f'{indent}    state: u32,']
+        lines.extend(f'{indent}    {name}: {self.generator_field_type(field_type)},'
+                     for name, field_type in fields.items())
+        lines.extend(f'{indent}    {name}: {field_type},' for name, (field_type, _) in extra_fields.items())
+        lines.append(f'{indent}}}')
+        lines.append('')
+        lines.append(f'{indent}impl Iterator for {struct} {{')
+        lines.append(f'{indent}    type Item = {item};')
+        lines.append('')
+        lines.append(f'{indent}    fn next(&mut self) -> Option<{item}> {{')
+        lines.append(f'{indent}        loop {{')
+        lines.append(f'{indent}            match self.state {{')
+        for number, state_lines in enumerate(states):
+            if number == 1:
+                lines.append(f'{indent}                1 => return None,')
+                continue
+            lines.append(f'{indent}                {number} => {{')
+            lines.extend(state_lines)
+            lines.append(f'{indent}                }}')
+        lines.append(f'{indent}                _ => unreachable!(),')
+        lines.append(f'{indent}            }}')
+        lines.append(f'{indent}        }}')
+        lines.append(f'{indent}    }}')
+        lines.append(f'{indent}}}')
+        lines.append('')
+
+        params = []
+        inits = ['state: 0']
+        signature = self.function_signatures[node.name]
+        for param, param_type, _ in signature:
+            if param_type.startswith('impl Iterator'):
+                params.append(f"{param}: {param_type} + 'static")
+                inits.append(f'{param}: Box::new({param})')
+            else:
+                params.append(f'{param}: {self.render_type(param_type)}')
+                inits.append(param)
+        inits.extend(f'{name}: Default::default()' for name in fields if name not in node.params)
+        inits.extend(f'{name}: {init}' for name, (_, init) in extra_fields.items())
+        lines.append(f'{indent}fn {node.name}({", ".join(params)}) -> {struct} {{')
+        lines.append(f'{indent}    {struct} {{ {", ".join(inits)} }}')
+        lines.append(f'{indent}}}')
+        self.diagnostics.append(f'{node.name}: генератор понижен в {struct} с {len(states)} состояниями')
+        return '\n'.join(lines)
+
+    def new_generator_state(self):
+        self.generator_states.append([])
+        return len(self.generator_states) - 1
+
+    def generator_jump(self, state, target):
+        self.generator_states[state].append(f'{self.indent()}self.state = {target};')
+        self.generator_states[state].append(f'{self.indent()}continue;')
+
+    def compile_generator_block(self, statements, state):
+        # Добавляет операторы к состоянию state; возвращает состояние,
+        # в котором продолжается выполнение после них
+        for statement in statements or []:
+            state = self.compile_generator_statement(statement, state)
+        return state
+
+    def compile_generator_statement(self, node, state):
+        lines = self.generator_states[state]
+        if isinstance(node, Yield):
+            resume = self.new_generator_state()
+            value = self.generate_element(node.value) if node.value else '()'
+            if (isinstance(node.value, Identifier) and node.value.name in self.generator_fields
+                    and self.type_inference.infer_type(node.value) not in COPY_TYPES):
+                # Поле остаётся в структуре, наружу отдаётся копия
+                value += '.clone()'
+            lines.append(f'{self.indent()}self.state = {resume};')
+            lines.append(f'{self.indent()}return Some({value});')
+            return resume
+        if isinstance(node, YieldFrom):
+            return self.compile_generator_loop(None, node.value, [], state)
+        if isinstance(node, ReturnStatement):
+            lines.append(f'{self.indent()}self.state = 1;')
+            lines.append(f'{self.indent()}return None;')
+            return self.new_generator_state()
+        if isinstance(node, ForStatement) and self.generators.needs_states(node, self.generator_function):
+            return self.compile_generator_loop(node.target, node.iterable, node.body, state)
+        if isinstance(node, IfStatement) and self.generators.needs_states(node, self.generator_function):
+            true_state = self.new_generator_state()
+            false_state = self.new_generator_state() if node.false_body else None
+            after = self.new_generator_state()
+            condition = self.generate(node.condition)
+            lines.append(f'{self.indent()}self.state = if {condition} {{ {true_state} }} else {{ {false_state or after} }};')
+            lines.append(f'{self.indent()}continue;')
+            self.generator_jump(self.compile_generator_block(node.true_body, true_state), after)
+            if false_state is not None:
+                self.generator_jump(self.compile_generator_block(node.false_body, false_state), after)
+            return after
+        if isinstance(node, WhileStatement) and self.generators.needs_states(node, self.generator_function):
+            header = self.new_generator_state()
+            after = self.new_generator_state()
+            self.generator_jump(state, header)
+            condition = self.generate(node.condition)
+            if not condition.startswith('('):
+                condition = f'({condition})'
+            self.generator_states[header].append(f'{self.indent()}if !{condition} {{ self.state = {after}; continue; }}')
+            self.generator_loops.append((header, after))
+            self.generator_jump(self.compile_generator_block(node.body, header), header)
+            self.generator_loops.pop()
+            return after
+        code = self.generate_statement(node)
+        if code:
+            lines.append(code)
+        return state
+
+    def compile_generator_loop(self, target, iterable, body, state):
+        # Цикл for (или yield from, если target is None) в виде состояний:
+        # заголовок получает следующий элемент либо переходит за цикл
+        number = len(self.generator_extra_fields) + 1
+        header = self.new_generator_state()
+        after = self.new_generator_state()
+        lines = self.generator_states[state]
+        header_lines = self.generator_states[header]
+        indent = self.indent()
+        exit_code = f'{{ self.state = {after}; continue; }}'
+        iterable_type = self.type_inference.infer_type(iterable)
+        if (isinstance(iterable, FunctionCall) and iterable.name == 'range' and 1 <= len(iterable.args) <= 3
+                and (len(iterable.args) < 3 or self.negative_step(iterable.args[2]) is not None
+                     or isinstance(iterable.args[2], Num))):
+            args = iterable.args
+            start = self.generate(args[0]) if len(args) > 1 else '0'
+            end = self.generate(args[1] if len(args) > 1 else args[0])
+            step = self.negative_step(args[2]) if len(args) == 3 else None
+            step_code = f'-= {step}' if step is not None else f'+= {args[2].value if len(args) == 3 else 1}'
+            counter, bound = f'index_{number}', f'end_{number}'
+            self.generator_extra_fields[counter] = ('i32', '0')
+            self.generator_extra_fields[bound] = ('i32', '0')
+            lines.append(f'{indent}self.{counter} = {start};')
+            lines.append(f'{indent}self.{bound} = {end};')
+            compare = '<=' if step is not None else '>='
+            header_lines.append(f'{indent}if self.{counter} {compare} self.{bound} {exit_code}')
+            header_lines.append(f'{indent}let item = self.{counter};')
+            header_lines.append(f'{indent}self.{counter} {step_code};')
+        elif isinstance(iterable, Identifier) and iterable.name in self.generator_fields and iterable_type.startswith('Vec<'):
+            # Обход списка-поля по индексу: без копии списка и без заимствования self
+            position = f'position_{number}'
+            self.generator_extra_fields[position] = ('usize', '0')
+            element = f'self.{iterable.name}[self.{position}]'
+            if iterable_type[4:-1] not in COPY_TYPES:
+                element += '.clone()'
+            lines.append(f'{indent}self.{position} = 0;')
+            header_lines.append(f'{indent}if self.{position} >= self.{iterable.name}.len() {exit_code}')
+            header_lines.append(f'{indent}let item = {element};')
+            header_lines.append(f'{indent}self.{position} += 1;')
+        elif isinstance(iterable, Identifier) and iterable.name in self.generator_fields and iterable_type.startswith('impl Iterator'):
+            header_lines.append(f'{indent}let item = match self.{iterable.name}.next() {{')
+            header_lines.append(f'{indent}    Some(item) => item,')
+            header_lines.append(f'{indent}    None => {exit_code}')
+            header_lines.append(f'{indent}}};')
+        else:
+            iterator = f'iterator_{number}'
+            code = self.generate(iterable)
+            if isinstance(iterable, FunctionCall) and iterable.name in self.generator_plans:
+                iterator_type = self.generator_plans[iterable.name]['struct']
+            else:
+                item_type = self.type_inference.iteration_item_type(iterable)
+                item_type = 'i32' if item_type == 'unknown' else self.render_type(item_type)
+                iterator_type = f'Box<dyn Iterator<Item = {item_type}>>'
+                code = f'Box::new({code}.into_iter())'
+            self.generator_extra_fields[iterator] = (f'Option<{iterator_type}>', 'None')
+            lines.append(f'{indent}self.{iterator} = Some({code});')
+            header_lines.append(f'{indent}let item = match self.{iterator}.as_mut().and_then(|iterator| iterator.next()) {{')
+            header_lines.append(f'{indent}    Some(item) => item,')
+            header_lines.append(f'{indent}    None => {{ self.{iterator} = None; self.state = {after}; continue; }}')
+            header_lines.append(f'{indent}}};')
+        self.generator_jump(state, header)
+
+        if target is None:
+            # yield from: состояние остаётся заголовком цикла
+            header_lines.append(f'{indent}return Some(item);')
+            return after
+        if isinstance(target, Identifier):
+            item_type = self.type_inference.iteration_item_type(iterable)
+            if item_type != 'unknown':
+                self.type_inference.update_type(target.name, item_type)
+        header_lines.append(f'{indent}self.{target.name} = item;')
+        self.generator_loops.append((header, after))
+        self.generator_jump(self.compile_generator_block(body, header), header)
+        self.generator_loops.pop()
+        return after
+
     def generate_IfStatement(self, node):
-        condition = self.generate(node.condition)
+        condition = self.generate_condition(node.condition)
         code = f'{self.indent()}if {condition} {{\n'
         self.indent_level += 1
         for statement in node.true_body:
-            stmt_code = self.generate(statement)
+            stmt_code = self.generate_statement(statement)
             code += f'{stmt_code}\n'
         self.indent_level -= 1
         code += f'{self.indent()}}}'
@@ -127,7 +1653,7 @@ class CodeGenerator:
             code += ' else {\n'
             self.indent_level += 1
             for statement in node.false_body:
-                stmt_code = self.generate(statement)
+                stmt_code = self.generate_statement(statement)
                 code += f'{stmt_code}\n'
             self.indent_level -= 1
             code += f'{self.indent()}}}'
@@ -135,18 +1661,99 @@ class CodeGenerator:
         return code
 
     def generate_BinaryOp(self, node):
-        left = self.generate(node.left)
-        right = self.generate(node.right)
+        if self.is_elementwise(node):
+            return self.array_expression(node)
+        if node.op == '**':
+            return self.generate_power(node)
+        pieces = self.string_pieces(node)
+        if pieces is not None:
+            # a + "..." + str(n): одна строка через format! вместо цепочки временных String
+            return self.generate_FormattedString(FormattedString(pieces))
+        left = self.generate_operand(node.left, node.right)
+        right = self.generate_operand(node.right, node.left)
         
         # Для строковых сравнений не добавляем .to_string()
         if node.op == '==' and (isinstance(node.left, String) or isinstance(node.right, String)):
             return f'({left} == {right})'
         return f'({left} {node.op} {right})'
 
+    def string_pieces(self, node):
+        # Части конкатенации строк как части f-строки или None, если это не конкатенация
+        if not (isinstance(node, BinaryOp) and node.op == '+'):
+            return None
+        operands = []
+        while isinstance(node, BinaryOp) and node.op == '+':
+            operands.insert(0, node.right)
+            node = node.left
+        operands.insert(0, node)
+        if any(self.type_inference.infer_type(operand) != 'String' for operand in operands):
+            return None
+        pieces = []
+        for operand in operands:
+            if isinstance(operand, String):
+                pieces.append(operand)
+            elif isinstance(operand, FormattedString):
+                pieces.extend(operand.values)
+            elif isinstance(operand, FunctionCall) and operand.name == 'str' and len(operand.args) == 1 \
+                    and operand.name not in self.function_signatures:
+                pieces.append(FormattedValue(operand.args[0]))
+            else:
+                pieces.append(FormattedValue(operand, 's'))
+        # Соседние литералы склеиваем: format! без подстановок даёт String::from
+        merged = []
+        for piece in pieces:
+            if merged and isinstance(piece, String) and isinstance(merged[-1], String):
+                merged[-1] = String(merged[-1].value + piece.value)
+            else:
+                merged.append(piece)
+        return merged
+
+    def generate_operand(self, node, other):
+        # Целое в паре с f64 приводится явно: в Rust нет неявного приведения.
+        # Литерал сразу записывается дробным
+        if self.type_inference.infer_type(other) == 'f64':
+            if self.type_inference.is_int_literal(node):
+                return f'{node.value}.0'
+            if self.type_inference.infer_type(node) == 'i32':
+                return f'({self.generate(node)} as f64)'
+        return self.generate(node)
+
+    def generate_power(self, node):
+        # x ** n: для f64 - powi с целым показателем или powf, для целых - pow.
+        # Вызов через тип: у переменной без аннотации числовой тип ещё не выбран
+        base_type = self.type_inference.infer_type(node.left)
+        exponent_type = self.type_inference.infer_type(node.right)
+        base = self.generate(node.left)
+        exponent = self.generate(node.right)
+        if 'f64' in (base_type, exponent_type):
+            base = self.float_operand(node.left, base)
+            if exponent_type == 'i32':
+                return f'f64::powi({base}, {exponent})'
+            return f'f64::powf({base}, {self.float_operand(node.right, exponent)})'
+        if not self.type_inference.is_int_literal(node.right):
+            exponent = f'{exponent} as u32'
+        return f'i32::pow({base}, {exponent})'
+
     def generate_UnaryOp(self, node):
         # Генерирует код для унарных операий
+        if self.is_elementwise(node):
+            return self.array_expression(node)
         expr = self.generate(node.expr)
-        return f'({node.op}{expr})'
+        return f'({"!" if node.op == "not" else node.op}{expr})'
+
+    def generate_condition(self, condition):
+        # Коллекция или строка в условии истинна, если она не пуста
+        if isinstance(condition, UnaryOp) and condition.op == 'not' and self.is_sized(condition.expr):
+            return f'{self.generate(condition.expr)}.is_empty()'
+        if self.is_sized(condition):
+            return f'!{self.generate(condition)}.is_empty()'
+        return self.generate(condition)
+
+    def is_sized(self, node):
+        if not isinstance(node, (Identifier, Attribute)):
+            return False
+        type_ = self.type_inference.infer_type(node)
+        return type_ == 'String' or type_.startswith(SIZED_PREFIXES)
 
     def generate_Num(self, node):
         # Генерирует код для числовых литералов
@@ -155,43 +1762,462 @@ class CodeGenerator:
     def generate_String(self, node):
         return f'"{node.value}"'
 
+    def generate_FormattedString(self, node):
+        template, args = self.format_arguments(node.values)
+        if not args:
+            return f'String::from("{self.rust_literal(node.values[0].value if node.values else "")}")'
+        return f'format!("{template}", {", ".join(args)})'
+
+    def rust_literal(self, text):
+        # Содержимое строкового литерала Rust
+        return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\t', '\\t')
+
+    def format_arguments(self, values):
+        # Части f-строки -> шаблон format! и его аргументы
+        template, args = '', []
+        for value in values:
+            if isinstance(value, String):
+                template += self.rust_literal(value.value).replace('{', '{{').replace('}', '}}')
+                continue
+            field, code, suffix = self.format_field(value)
+            template += field + suffix
+            args.append(code)
+        return template, args
+
+    def format_field(self, value):
+        # Подстановка {value!conversion:spec} -> (поле шаблона Rust, аргумент, текст после поля)
+        code = self.generate(value.value)
+        type_ = self.type_inference.infer_type(value.value)
+        match = FORMAT_SPEC.match(value.format_spec)
+        if match is None:
+            self.diagnostics.append(f'f-строка: формат "{value.format_spec}" не поддерживается и пропущен')
+            match = FORMAT_SPEC.match('')
+        spec = match.groupdict()
+        kind, precision, suffix = spec['kind'], spec['precision'], ''
+        rust = ''
+        if spec['align'] == '=':
+            self.diagnostics.append('f-строка: выравнивание "=" не поддерживается, используется ">"')
+            rust += (spec['fill'] or '') + '>'
+        elif spec['align']:
+            rust += (spec['fill'] or '') + spec['align']
+        if spec['sign'] == '+':
+            rust += '+'
+        elif spec['sign'] == ' ':
+            self.diagnostics.append('f-строка: знак " " не поддерживается и пропущен')
+        if spec['alt']:
+            rust += '#'
+        if spec['zero']:
+            rust += '0'
+        rust += spec['width'] or ''
+        if spec['grouping']:
+            self.diagnostics.append(f'f-строка: разделитель разрядов "{spec["grouping"]}" не поддерживается и пропущен')
+        if kind in ('e', 'E', 'f', 'F', 'g', 'G', '%'):
+            if type_ in ('i32', 'i64', 'usize'):
+                code, type_ = f'({code} as f64)', 'f64'
+            if precision is None and kind != 'g' and kind != 'G':
+                precision = '6'
+        if kind == '%':
+            code, suffix = f'({code} * 100.0)', '%'
+        if precision is not None:
+            rust += f'.{precision}'
+        if kind in ('b', 'o', 'x', 'X', 'e', 'E'):
+            if kind in ('e', 'E'):
+                self.diagnostics.append('f-строка: экспонента печатается в формате Rust (1.5e3 вместо 1.5e+03)')
+            return '{:' + rust + kind + '}', code, suffix
+        if kind in ('c', 'n', 'g', 'G'):
+            self.diagnostics.append(f'f-строка: тип формата "{kind}" не поддерживается и пропущен')
+        if value.conversion in ('r', 'a'):
+            debug = True
+        elif value.conversion is None and type_ == 'bool':
+            code, debug = f'if {code} {{ "True" }} else {{ "False" }}', False
+        elif value.conversion is None and type_ == 'f64':
+            # Debug печатает 2.0 как Python, Display - 2
+            debug = precision is None
+        else:
+            debug = type_ not in DISPLAY_TYPES and value.conversion != 's'
+        if debug:
+            rust += '?'
+        return ('{:' + rust + '}' if rust else '{}'), code, suffix
+
+    def generate_str_call(self, node):
+        # str(x) -> строковое представление как у Python
+        if not node.args:
+            return 'String::new()'
+        field, code, _ = self.format_field(FormattedValue(node.args[0]))
+        if self.type_inference.infer_type(node.args[0]) in ('String', '&str'):
+            return f'{code}.to_string()'
+        if field == '{}':
+            return f'{code}.to_string()' if isinstance(node.args[0], (Identifier, Attribute)) else f'({code}).to_string()'
+        return f'format!("{field}", {code})'
+
+    def string_append(self, buffer, value):
+        # Дописывание фрагмента в строку-буфер: push_str, push или write!
+        # (форматирование сразу в буфер, без временной String)
+        if isinstance(value, String):
+            return f'{buffer}.push_str("{self.rust_literal(value.value)}")'
+        if isinstance(value, FormattedString):
+            template, args = self.format_arguments(value.values)
+            if not args:
+                return f'{buffer}.push_str("{self.rust_literal(value.values[0].value if value.values else "")}")'
+            self.uses.add('std::fmt::Write as _')
+            return f'write!({buffer}, "{template}", {", ".join(args)}).unwrap()'
+        if isinstance(value, FunctionCall) and value.name == 'str' and len(value.args) == 1 \
+                and value.name not in self.function_signatures:
+            field, code, _ = self.format_field(FormattedValue(value.args[0]))
+            self.uses.add('std::fmt::Write as _')
+            return f'write!({buffer}, "{field}", {code}).unwrap()'
+        type_ = self.type_inference.infer_type(value)
+        if type_ == 'char':
+            return f'{buffer}.push({self.generate(value)})'
+        return f'{buffer}.push_str(&{self.generate(value)})'
+
+    def generate_join(self, node, separator):
+        # sep.join(...): Vec строк соединяется через join, остальное - потоком
+        # в одну заранее выделенную String без промежуточного Vec<String>
+        iterable = node.args[0]
+        if isinstance(iterable, FunctionCall) and iterable.name == 'map' and len(iterable.args) == 2 \
+                and isinstance(iterable.args[0], Identifier) and iterable.args[0].name == 'str':
+            item = Identifier(self.fresh_name('item', iterable))
+            iterable = GeneratorExpression(FunctionCall('str', [item]), item, iterable.args[1])
+        if isinstance(iterable, (ListComprehension, GeneratorExpression)):
+            source, target, expression, condition = iterable.iterable, iterable.target, iterable.expression, iterable.condition
+        elif self.type_inference.infer_type(iterable) in ('Vec<String>', 'Vec<&str>'):
+            return f'{self.generate(iterable)}.join({separator})'
+        else:
+            source, condition = iterable, None
+            target = expression = Identifier(self.fresh_name('item', node))
+        chain = self.iterator_chain(source)
+        if chain is None:
+            return None
+        code, item_type, _ = chain
+        buffer, first, items = (self.fresh_name(base, node) for base in ('joined', 'first', 'items'))
+        self.type_inference.enter_scope()
+        self.type_inference.bind_target(target, item_type)
+        pattern = self.generate(target)
+        body = f'if !{first} {{ {buffer}.push_str({separator}); }} {first} = false; {self.string_append(buffer, expression)};'
+        if condition is not None:
+            body = f'if {self.generate(condition)} {{ {body} }}'
+        self.type_inference.exit_scope()
+        capacity = f'{items}.size_hint().0 * ({separator}.len() + {STRING_PIECE_ESTIMATE})'
+        # match продлевает жизнь временных значений цепочки (например, vec![...]) до конца обхода
+        return (f'match {code} {{ {items} => {{ let mut {buffer} = String::with_capacity({capacity}); '
+                f'let mut {first} = true; for {pattern} in {items} {{ {body} }} {buffer} }} }}')
+
+    def generate_Constant(self, node):
+        if node.value is None:
+            return 'None'
+        return 'true' if node.value else 'false'
+
     def generate_Identifier(self, node):
         # Генериует код для идентификаторов
+        member = self.type_inference.module_member(node)
+        if member:
+            return self.module_constant(*member)
+        if node.name in self.generator_fields:
+            return f'self.{node.name}'
+        if node.name == 'self' and self.self_alias:
+            return self.self_alias
         return node.name
 
     def generate_Assignment(self, node):
+        if isinstance(node.left, Identifier) and node.left.name in self.generator_fields:
+            # Переменная генератора - поле структуры, объявлять её не нужно
+            return f'{self.indent()}self.{node.left.name} = {self.generate_element(node.right)};'
+        if isinstance(node.left, Subscript) and self.type_inference.infer_type(node.left.obj).startswith('HashMap<'):
+            return self.generate_map_insert(node)
+        if id(node) in self.soa_declarations:
+            return self.generate_soa_declaration(node, self.soa_declarations[id(node)])
+        if isinstance(node.left, Identifier) and node.left.name in self.heap_names:
+            declaration = self.generate_heap_declaration(node)
+            if declaration:
+                return declaration
+        if isinstance(node.left, TupleNode):
+            return self.generate_tuple_assignment(node)
+        if isinstance(node.left, Identifier) and self.bindings.get(id(node)) == 'assign' \
+                and self.type_inference.infer_type(node.left) == 'String':
+            appended = self.appended_pieces(node.left.name, node.right)
+            if appended:
+                # s = s + a + b -> дописывание в тот же буфер
+                return '\n'.join(f'{self.indent()}{self.string_append(node.left.name, piece)};' for piece in appended)
+        if isinstance(node.left, Identifier):
+            annotated = self.type_inference.annotation_type(node.annotation)
+            if annotated == 'unknown':
+                annotated = self.declared_types.pop(node.left.name, 'unknown')
+            if annotated != 'unknown':
+                return self.generate_annotated_assignment(node, annotated)
         left = self.generate(node.left)
-        right = self.generate(node.right)
+        right = self.moved_value(node.right, self.generate(node.right))
         inferred_type = self.type_inference.infer_type(node.right)
         
         # Если это первое присваивание (инициализация)
         if isinstance(node.left, Identifier):
+            if inferred_type != 'unknown':
+                self.type_inference.update_type(node.left.name, inferred_type)
+            if self.bindings.get(id(node)) == 'assign':
+                # Переменная уже объявлена: обычное переприсваивание
+                return f'{self.indent()}{left} = {right};'
+            if isinstance(node.right, ListNode) and not node.right.elements:
+                self.untyped_lists.add(node.left.name)
+            keyword = self.let_keyword(node)
+            preallocated = self.generate_preallocation(node)
+            if preallocated:
+                return f'{self.indent()}let mut {left}{preallocated};'
             if isinstance(node.right, ListNode) and not isinstance(node.right, ListComprehension):
                 # Обработка обычных списков
                 if node.right.elements:
                     elem_type = self.type_inference.infer_type(node.right.elements[0])
-                    return f'{self.indent()}let mut {left}: Vec<{elem_type}> = {right};'
+                    return f'{self.indent()}{keyword} {left}: Vec<{elem_type}> = {right};'
                 else:
-                    return f'{self.indent()}let mut {left}: Vec<String> = Vec::new();'
+                    return f'{self.indent()}{keyword} {left}: Vec<String> = Vec::new();'
             elif isinstance(node.right, ListComprehension):
-                # Обработка списковых включений
-                elem_type = self.type_inference.infer_type(node.right)
-                return f'{self.indent()}let mut {left}: Vec<{elem_type}> = {right};'
+                # Обработка списковых включений; тип элементов, зависящий
+                # от переменной включения, выводит компилятор
+                list_type = inferred_type if 'unknown' not in inferred_type else 'Vec<_>'
+                return f'{self.indent()}{keyword} {left}: {list_type} = {right};'
             else:
                 # Обработка остальных случаев
-                return f'{self.indent()}let mut {left} = {right};'
+                return f'{self.indent()}{keyword} {left} = {right};'
         else:
             return f'{self.indent()}{left} = {right};'
 
+    def appended_pieces(self, name, value):
+        # Слагаемые после name в value = name + a + b или None
+        operands = []
+        while isinstance(value, BinaryOp) and value.op == '+':
+            operands.insert(0, value.right)
+            value = value.left
+        if not (operands and isinstance(value, Identifier) and value.name == name):
+            return None
+        if any(self.type_inference.infer_type(operand) != 'String' for operand in operands):
+            return None
+        if any(isinstance(n, Identifier) and n.name == name for operand in operands for n in walk(operand)):
+            return None
+        return operands
+
+    def generate_tuple_assignment(self, node):
+        # a, b = value -> let (a, mut b) = value; уже объявленные переменные
+        # получают значения деструктурирующим присваиванием
+        self.type_inference.bind_target(node.left, self.type_inference.infer_type(node.right))
+        right = self.generate(node.right)
+        elements = node.left.elements
+        if not all(isinstance(element, Identifier) for element in elements):
+            return f'{self.indent()}{self.generate(node.left)} = {right};'
+        bindings = [self.bindings.get(id(element)) for element in elements]
+        if all(binding == 'assign' for binding in bindings):
+            return f'{self.indent()}{self.tuple_code([element.name for element in elements])} = {right};'
+        patterns, assigns = [], []
+        for element, binding in zip(elements, bindings):
+            if binding == 'assign':
+                # Смешанный случай: новое значение через временную переменную
+                temporary = self.fresh_name(f'{element.name}_value', node)
+                patterns.append(temporary)
+                assigns.append(f'{self.indent()}{element.name} = {temporary};')
+            else:
+                patterns.append(element.name if binding == 'let' else f'mut {element.name}')
+        return '\n'.join([f'{self.indent()}let {self.tuple_code(patterns)} = {right};'] + assigns)
+
+    def generate_annotated_assignment(self, node, annotated):
+        # x: T = value - тип из аннотации, без вывода по значению
+        name = node.left.name
+        self.type_inference.update_type(name, annotated)
+        if self.type_inference.is_int_literal(node.right) and annotated == 'f64':
+            value = f'{node.right.value}.0'
+        elif isinstance(node.right, ListNode) and not isinstance(node.right, ListComprehension) and not node.right.elements:
+            value = 'Vec::new()'
+            preallocated = self.generate_preallocation(node)
+            if preallocated and preallocated.startswith(': Vec<_> = '):
+                value = preallocated[len(': Vec<_> = '):]
+        elif isinstance(node.right, DictNode) and not node.right.pairs:
+            kind = 'HashMap' if annotated.startswith('HashMap<') else 'HashSet'
+            preallocated = self.generate_preallocation(node)
+            value = preallocated[len(' = '):] if preallocated else self.new_collection(kind)
+        else:
+            value = self.moved_value(node.right, self.generate_element(node.right))
+            if annotated.startswith('Option<') and not (isinstance(node.right, Constant) and node.right.value is None):
+                value = f'Some({value})'
+        if self.bindings.get(id(node)) == 'assign':
+            return f'{self.indent()}{name} = {value};'
+        return f'{self.indent()}{self.let_keyword(node)} {name}: {self.render_type(annotated)} = {value};'
+
+    def generate_VariableAnnotation(self, node):
+        # Объявление x: int без значения: тип запоминается до первого присваивания
+        annotated = self.type_inference.annotation_type(node.annotation)
+        if isinstance(node.target, Identifier) and annotated != 'unknown':
+            self.declared_types[node.target.name] = annotated
+            self.type_inference.update_type(node.target.name, annotated)
+        return ''
+
+    def generate_soa_declaration(self, node, class_name):
+        # Список записей -> контейнер с Vec на каждое поле
+        container = f'{class_name}Soa'
+        name = node.left.name
+        self.type_inference.update_type(name, container)
+        if isinstance(node.right, ListNode) and not isinstance(node.right, ListComprehension) and not node.right.elements:
+            value = f'{container}::default()'
+            if id(node) in self.preallocations:
+                capacity = self.generate_capacity(self.preallocations[id(node)][1])
+                if capacity is not None:
+                    value = f'{container}::with_capacity({capacity})'
+        else:
+            value = self.generate(node.right)
+            if value.endswith('.collect::<Vec<_>>()'):
+                value = value[:-len('Vec<_>>()')] + f'{container}>()'
+            else:
+                value = f'{value}.into_iter().collect::<{container}>()'
+        if self.bindings.get(id(node)) == 'assign':
+            return f'{self.indent()}{name} = {value};'
+        return f'{self.indent()}{self.let_keyword(node)} {name} = {value};'
+
+    def generate_map_insert(self, node):
+        # d[k] = v: у HashMap нет IndexMut, запись идёт через insert
+        obj = self.generate(node.left.obj)
+        key = self.generate_element(node.left.index)
+        if isinstance(node.left.index, Identifier) and node.left.index.name in self.borrowed_params:
+            # Параметр &str: словарь хранит собственную строку
+            key = f'{key}.to_string()'
+        value = self.generate_element(node.right)
+        obj_type = self.type_inference.infer_type(node.left.obj)
+        if isinstance(node.left.obj, Identifier) and self.type_inference.is_placeholder(obj_type):
+            # Типы словаря, созданного пустым, уточняем по первой записи
+            key_type = self.type_inference.infer_type(node.left.index)
+            value_type = self.type_inference.infer_type(node.right)
+            if 'unknown' not in (key_type, value_type):
+                self.type_inference.update_type(node.left.obj.name, f'HashMap<{key_type}, {value_type}>')
+        return f'{self.indent()}{obj}.insert({key}, {value});'
+
+    def generate_key(self, key):
+        # Ключ для поиска в HashMap: строковый литерал и заимствованный
+        # параметр уже являются ссылками
+        code = self.generate(key)
+        if isinstance(key, String) or (isinstance(key, Identifier) and key.name in self.borrowed_params):
+            return code
+        return f'&{code}'
+
+    def generate_preallocation(self, node):
+        # Объявление накопителя с заранее выделенной памятью, если число итераций
+        # заполняющего его цикла известно; иначе None и обычная генерация
+        if id(node) not in self.preallocations:
+            return None
+        kind, terms = self.preallocations[id(node)]
+        capacity = self.generate_capacity(terms)
+        if capacity is None:
+            return None
+        if kind == 'string':
+            return f' = String::with_capacity({capacity})'
+        if kind in ('dict', 'set'):
+            return f' = {self.new_collection("HashMap" if kind == "dict" else "HashSet", capacity)}'
+        return f': Vec<_> = Vec::with_capacity({capacity})'
+
+    def generate_capacity(self, terms):
+        products = []
+        for term in terms:
+            factors = [self.generate_capacity_factor(factor) for factor in term]
+            if None in factors:
+                return None
+            products.append(' * '.join(factors) or '1')
+        return ' + '.join(products)
+
+    def generate_capacity_factor(self, factor):
+        kind = factor[0]
+        if kind == 'const':
+            return str(factor[1])
+        if kind == 'bytes':
+            if isinstance(factor[1], String):
+                return str(len(factor[1].value.encode()))
+            if isinstance(factor[1], FormattedString):
+                # Текст f-строки плюс оценка длины каждой подстановки
+                return str(sum(len(value.value.encode()) if isinstance(value, String) else STRING_PIECE_ESTIMATE
+                               for value in factor[1].values))
+            return str(STRING_PIECE_ESTIMATE)
+        if kind == 'len':
+            iterable_type = self.type_inference.infer_type(factor[1])
+            if factor[1].name in self.borrowed_params or iterable_type.startswith(('Vec<', 'HashMap<', 'HashSet<')):
+                return f'{factor[1].name}.len()'
+            return None
+        _, start, end, step = factor
+        if start is None and isinstance(end, Num):
+            count = max(end.value, 0)
+        elif isinstance(start, Num) and isinstance(end, Num):
+            count = max(end.value - start.value, 0)
+        else:
+            count = None
+        if count is not None:
+            return str(-(-count // step) if step else count)
+        if start is None and isinstance(end, FunctionCall) and end.name == 'len':
+            count = f'{self.generate(end.args[0])}.len()'
+        elif start is None:
+            end_code = self.generate(end)
+            if not isinstance(end, Identifier):
+                end_code = f'({end_code})'
+            count = f'{end_code}.max(0) as usize'
+        else:
+            count = f'({self.generate(end)} - {self.generate(start)}).max(0) as usize'
+        if step:
+            return f'(({count} + {step - 1}) / {step})'
+        return count
+
+    def generate_AugAssignment(self, node):
+        if isinstance(node.target, Identifier) and node.op in ('+', '-', '*', '/') \
+                and self.type_inference.uses_numpy() and self.type_inference.infer_type(node.target) == ARRAY_TYPE \
+                and self.type_inference.infer_type(node.value) in ARRAY_OPERAND_TYPES:
+            # a += b * c для массива: запись на месте за один проход, без временного массива
+            index = self.fresh_name('i', node)
+            prelude, length, element = self.fused_loop(node.value, index, node, node.target.name)
+            return (f'{self.indent()}{{ {prelude} for {index} in 0..{length} '
+                    f'{{ {node.target.name}[{index}] {node.op}= {element}; }} }}')
+        if isinstance(node.target, Subscript) and self.default_map(node.target.obj):
+            # c[k] += 1 для Counter и defaultdict: одно хэширование через entry
+            self.refine_map_type(node.target.obj, node.target.index, node.value)
+            value = self.generate_operand(node.value, node.target)
+            if node.op == '+' and self.type_inference.infer_type(node.value) == 'String' and not isinstance(node.value, String):
+                value = f'&{value}'
+            return f'{self.indent()}*{self.generate_default_entry(node.target)} {node.op}= {value};'
+        if isinstance(node.target, Subscript) and self.type_inference.infer_type(node.target.obj).startswith('HashMap<'):
+            # d[k] += v: как и в Python, отсутствующий ключ - ошибка
+            target = f'*{self.generate(node.target.obj)}.get_mut({self.generate_key(node.target.index)}).unwrap()'
+            return f'{self.indent()}{target} {node.op}= {self.generate(node.value)};'
+        if node.op == '+' and isinstance(node.target, (Identifier, Attribute)) \
+                and self.type_inference.infer_type(node.target) == 'String':
+            # s += piece дописывает в буфер строки без временных String
+            return f'{self.indent()}{self.string_append(self.generate(node.target), node.value)};'
+        target = self.generate(node.target)
+        value = self.generate_operand(node.value, node.target)
+        if node.op == '+' and not isinstance(node.value, String):
+            if self.type_inference.infer_type(node.target) == 'String':
+                value = f'&{value}'
+        return f'{self.indent()}{target} {node.op}= {value};'
+
     def generate_FunctionCall(self, node):
         from standard_library_mapping import STANDARD_LIBRARY_MAPPING
 
+        member = self.type_inference.module_member(node)
+        if member:
+            return self.generate_module_call(node, *member)
+        if node.name in ('dict', 'set') and not node.args:
+            return self.new_collection('HashMap' if node.name == 'dict' else 'HashSet')
+        if node.name == 'str' and len(node.args) <= 1 and node.name not in self.function_signatures:
+            return self.generate_str_call(node)
+        if node.name in ITERATOR_BUILTINS and node.name not in self.function_signatures and node.name not in self.class_plans:
+            code = self.generate_builtin_call(node)
+            if code is not None:
+                return code
+        if node.name == 'abs' and len(node.args) == 1 and node.name not in self.function_signatures \
+                and self.type_inference.infer_type(node.args[0]) in ('i32', 'i64', 'f64'):
+            return f'{self.type_inference.infer_type(node.args[0])}::abs({self.generate(node.args[0])})'
         if node.name in STANDARD_LIBRARY_MAPPING:
             rust_func = STANDARD_LIBRARY_MAPPING[node.name]
             
             if rust_func == 'println!':
                 return self.generate_PrintStatement(node)
             
+            elif rust_func == 'len' and len(node.args) == 1:
+                arg = node.args[0]
+                if isinstance(arg, Subscript) and self.default_map(arg.obj):
+                    # Значение defaultdict измеряем по ссылке, без копии; отсутствующего ключа - 0
+                    return f'{self.generate(arg.obj)}.get({self.generate_key(arg.index)}).map_or(0, |v| v.len() as i32)'
+                # Целые Python генерируются как i32, поэтому приводим usize
+                return f'({self.generate(arg)}.len() as i32)'
+            
             elif rust_func == 'map':
                 if len(node.args) == 2:
                     lambda_expr = self.generate(node.args[0])
@@ -201,151 +2227,776 @@ class CodeGenerator:
             else:
                 args = ', '.join(self.generate(arg) for arg in node.args)
                 return f'{rust_func}({args})'
+        elif node.name in self.class_plans:
+            args = [self.generate_element(arg) if isinstance(arg, String) else self.generate_argument(arg, 'owned')
+                    for arg in node.args]
+            return f'{node.name}::new({", ".join(args)})'
+        elif node.name in self.function_signatures:
+            name, signature = self.specialization_for(node)
+            self.called_variants.add(name)
+            args = self.output_argument(node.name)
+            for index, arg in enumerate(node.args):
+                mode = signature[index][2] if index < len(signature) else 'owned'
+                code = self.generate_argument(arg, mode, self.ownership.argument_mutated(node.name, index))
+                args.append(self.optional_argument(arg, code, signature[index][1] if index < len(signature) else 'unknown'))
+            code = f'{name}({", ".join(args)})'
+            if node.name in self.raising_functions:
+                return self.propagate_call(code)
+            return self.precomputed_call(node, name, signature, code)
         else:
             args = ', '.join(self.generate(arg) for arg in node.args)
             return f'{node.name}({args})'
 
+    def generate_argument(self, arg, mode, mutated=False):
+        # Генерирует аргумент вызова пользовательской функции с учётом того,
+        # как функция принимает параметр, и того, чем аргумент является здесь
+        code = self.generate(arg)
+        current = self.borrowed_params.get(arg.name) if isinstance(arg, Identifier) else None
+        if mode == 'owned':
+            if isinstance(arg, String):
+                return self.generate_element(arg)
+            value = f'{code}.to_owned()' if current else self.moved_value(arg, code)
+            if mutated and value != code:
+                # Функция изменяет переданный объект, а копия скрыла бы это
+                # изменение от вызывающего кода: значение перемещается
+                self.diagnostics.append(f'{arg.name}: функция изменяет аргумент на месте, а передать его '
+                                        f'по ссылке нельзя; последующие использования не поддерживаются')
+                return code
+            return value
+        if mode == 'ref':
+            if current == 'ref' or isinstance(arg, String):
+                return code
+            if current == 'mut':
+                return f'&*{code}'
+            return f'&{code}'
+        if current == 'mut':
+            return code
+        return f'&mut {code}'
+
+    def optional_argument(self, arg, code, param_type):
+        # Значение для параметра Optional[T] передаётся как Some(значение)
+        if (param_type.startswith('Option<') and not (isinstance(arg, Constant) and arg.value is None)
+                and not self.type_inference.infer_type(arg).startswith('Option<')):
+            return f'Some({code})'
+        return code
+
     def generate_WhileStatement(self, node):
         # Генерирует код для цикла while
-        condition = self.generate(node.condition)
-        self.code.append(f'{self.indent()}while {condition} {{')
+        condition = self.generate_condition(node.condition)
         self.indent_level += 1
-        for statement in node.body:
-            self.code.append(self.generate(statement))
+        body = '\n'.join(self.generate_statements(node.body))
         self.indent_level -= 1
-        self.code.append(f'{self.indent()}}}')
-        return ''
+        return f'{self.indent()}while {condition} {{\n{body}\n{self.indent()}}}'
 
     def generate_ForStatement(self, node):
+        source = self.file_loop_source(node)
+        if source is not None:
+            return self.generate_file_loop(node, *source)
+        if id(node) in self.index_loop_plans:
+            return self.generate_index_loop(node, self.index_loop_plans[id(node)])
+        if id(node) in self.soa_loops:
+            return self.generate_soa_loop(node, *self.soa_loops[id(node)])
         target = self.generate(node.target)
-        if isinstance(node.iterable, FunctionCall) and node.iterable.name == 'range':
-            # Специальная обработка для range()
-            if len(node.iterable.args) == 1:
-                end = self.generate(node.iterable.args[0])
-                for_header = f'for {target} in 0..{end} {{'
-            elif len(node.iterable.args) == 2:
-                start = self.generate(node.iterable.args[0])
-                end = self.generate(node.iterable.args[1])
-                for_header = f'for {target} in {start}..{end} {{'
-            elif len(node.iterable.args) == 3:
-                start, end, step = node.iterable.args
-                for_header = f'for {target} in ({self.generate(start)}..{self.generate(end)}).step_by({self.generate(step)}) {{'
+        self.type_inference.bind_target(node.target, self.type_inference.iteration_item_type(node.iterable))
+        if isinstance(node.iterable, FunctionCall) and node.iterable.name == 'range' and 1 <= len(node.iterable.args) <= 3:
+            for_header = f'for {target} in {self.generate_range(node.iterable)} {{'
+        elif isinstance(node.iterable, Identifier) and mutates_loop_target(node) \
+                and self.type_inference.infer_type(node.iterable).startswith('Vec<'):
+            # Поля элементов изменяются на месте, как у объектов списка в Python
+            for_header = f'for {target} in {self.generate(node.iterable)}.iter_mut() {{'
+        elif isinstance(node.iterable, Identifier) and node.iterable.name in self.borrowed_params \
+                and self.copy_loop_target(node):
+            # Заимствованный срез отдаёт ссылки; элементы Copy-типов разыменовываем в шаблоне
+            for_header = f'for &{target} in {node.iterable.name}.iter() {{'
+        elif isinstance(node.iterable, Identifier) and node.iterable.name in self.generator_fields:
+            # Поле генератора нельзя переместить: обходим его на месте
+            iterable = self.generate(node.iterable)
+            if self.type_inference.infer_type(node.iterable).startswith('impl Iterator'):
+                for_header = f'for {target} in {iterable}.by_ref() {{'
+            else:
+                for_header = f'for {target} in {iterable}.iter().cloned() {{'
+        elif isinstance(node.iterable, Identifier) and id(node.iterable) in self.tracked_uses \
+                and id(node.iterable) not in self.last_uses \
+                and self.type_inference.infer_type(node.iterable).startswith(('Vec<', 'HashSet<')):
+            # Коллекция нужна и после цикла: обходим её по ссылкам вместо перемещения
+            iterable = self.generate(node.iterable)
+            item_type = self.type_inference.iteration_item_type(node.iterable)
+            if isinstance(node.target, Identifier) and item_type in COPY_TYPES:
+                for_header = f'for &{target} in {iterable}.iter() {{'
+            elif item_type.startswith(SHARED_TYPES):
+                # Методы потоков и очередей принимают &self: копии не нужны
+                for_header = f'for {target} in {iterable}.iter() {{'
+            else:
+                for_header = f'for {target} in {iterable}.iter().cloned() {{'
+        elif isinstance(node.iterable, Subscript) and self.default_map(node.iterable.obj) \
+                and self.reads_map_only(node.iterable.obj.name, node.body):
+            # Значение defaultdict обходим по ссылке, без копии всей коллекции;
+            # отсутствующий ключ - пустой обход
+            lookup = (f'{self.generate(node.iterable.obj)}.get({self.generate_key(node.iterable.index)})'
+                      f'.into_iter().flatten()')
+            if self.copy_loop_target(node):
+                for_header = f'for &{target} in {lookup} {{'
+            else:
+                for_header = f'for {target} in {lookup}.cloned() {{'
         else:
             iterable = self.generate(node.iterable)
             for_header = f'for {target} in {iterable} {{'
         
         # Генерация тела цикла
         self.indent_level += 1
-        body = '\n'.join(self.generate(statement) for statement in node.body)
+        body = '\n'.join(self.generate_statements(node.body))
         self.indent_level -= 1
         for_footer = f'{self.indent()}}}'
         
         return f'{self.indent()}{for_header}\n{body}\n{for_footer}'
 
+    def reads_map_only(self, name, statements):
+        # Словарь в операторах только читается по ключу: d[k] вне записи и изменяющих методов
+        root = Program(statements)
+        written = set()
+        for n in walk(root):
+            if isinstance(n, Assignment):
+                written.add(id(n.left))
+            elif isinstance(n, AugAssignment):
+                written.add(id(n.target))
+            elif isinstance(n, MethodCall) and n.method_name in MUTATING_METHODS:
+                written.add(id(n.obj))
+        reads = {id(n.obj) for n in walk(root) if isinstance(n, Subscript) and id(n) not in written}
+        return all(id(n) in reads for n in walk(root) if isinstance(n, Identifier) and n.name == name)
+
+    def copy_loop_target(self, node):
+        # Переменная цикла или кортеж из переменных, чьи значения - Copy-типы
+        item_type = self.type_inference.iteration_item_type(node.iterable)
+        if isinstance(node.target, Identifier):
+            return item_type in ('i32', 'f64', 'bool')
+        if isinstance(node.target, TupleNode):
+            types = self.type_inference.tuple_types(item_type)
+            return (len(types) == len(node.target.elements)
+                    and all(isinstance(element, Identifier) for element in node.target.elements)
+                    and all(type_ in COPY_TYPES for type_ in types))
+        return False
+
+    def generate_WithStatement(self, node):
+        plan = self.file_access.plan_with(node) if 'open' not in self.function_signatures else None
+        if plan is None and self.type_inference.infer_type(node.context_expr) == 'Arc<Mutex<()>>':
+            return self.generate_locked_with(node)
+        if plan is None:
+            return self.generate_scoped_with(node)
+        name = plan['name']
+        path = self.path_code(plan['path'])
+        lines = [f'{self.indent()}{{']
+        self.indent_level += 1
+        if plan['access'] == 'reader':
+            self.uses.update({'std::fs::File', 'std::io::BufRead', 'std::io::BufReader'})
+            lines.append(f'{self.indent()}let mut {name} = BufReader::new(File::open({path}).unwrap());')
+        elif plan['access'] == 'writer':
+            self.uses.update({'std::fs::File', 'std::io::BufWriter', 'std::io::Write'})
+            lines.append(f'{self.indent()}let mut {name} = BufWriter::new({self.open_for_writing(path, plan["kind"])});')
+        self.type_inference.update_type(name, WRITER_TYPE if plan['access'] == 'writer' else READER_TYPE)
+        outer_plan = self.file_plans.get(name)
+        self.file_plans[name] = plan
+        lines.extend(self.generate_statements(node.body))
+        if plan['access'] == 'writer' and not self.always_returns(node.body):
+            # Как close() в Python: ошибка записи остатка буфера не теряется при drop
+            lines.append(f'{self.indent()}{name}.flush().unwrap();')
+        self.file_plans.pop(name)
+        if outer_plan is not None:
+            self.file_plans[name] = outer_plan
+        self.indent_level -= 1
+        lines.append(f'{self.indent()}}}')
+        return '\n'.join(lines)
+
+    def generate_scoped_with(self, node):
+        # Прочие контекстные менеджеры: значение живёт до конца блока, а его
+        # Drop выполняет работу __exit__. Пулу потоков __exit__ не нужен:
+        # его потоки завершаются внутри каждого map
+        context_type = self.type_inference.infer_type(node.context_expr)
+        if context_type != 'WorkerPool':
+            self.diagnostics.append('with: контекстный менеджер понижен в область видимости блока')
+        name = self.generate(node.optional_vars) if isinstance(node.optional_vars, Identifier) else '_context'
+        lines = [f'{self.indent()}{{']
+        self.indent_level += 1
+        lines.append(f'{self.indent()}let {name} = {self.generate(node.context_expr)};')
+        if context_type != 'unknown':
+            self.type_inference.update_type(name, context_type)
+        lines.extend(self.generate_statements(node.body))
+        self.indent_level -= 1
+        lines.append(f'{self.indent()}}}')
+        return '\n'.join(lines)
+
+    def generate_locked_with(self, node):
+        # with lock: -> захват Mutex; блокировка освобождается, когда guard
+        # выходит из области видимости, в том числе при return и break
+        guard = self.fresh_name('_guard', node)
+        lines = [f'{self.indent()}{{']
+        self.indent_level += 1
+        lines.append(f'{self.indent()}let {guard} = {self.generate(node.context_expr)}.lock().unwrap();')
+        lines.extend(self.generate_statements(node.body))
+        self.indent_level -= 1
+        lines.append(f'{self.indent()}}}')
+        return '\n'.join(lines)
+
+    def path_code(self, path):
+        # Путь для File::open и std::fs: строковый литерал или ссылка
+        code = self.generate(path)
+        return code if isinstance(path, String) else f'&{code}'
+
+    def open_for_writing(self, path, kind):
+        if kind == 'write':
+            return f'File::create({path}).unwrap()'
+        option = 'append(true).create(true)' if kind == 'append' else 'write(true).create_new(true)'
+        return f'std::fs::OpenOptions::new().{option}.open({path}).unwrap()'
+
+    def read_whole_file(self, path, binary, method):
+        # Файл целиком одним вызовом: без BufReader и построчного копирования
+        if binary:
+            return f'std::fs::read({path}).unwrap()'
+        if method == 'readlines':
+            return f"std::fs::read_to_string({path}).unwrap().split_inclusive('\\n').map(String::from).collect::<Vec<String>>()"
+        return f'std::fs::read_to_string({path}).unwrap()'
+
+    def generate_file_method(self, node, plan):
+        name, method = plan['name'], node.method_name
+        if plan['access'] == 'whole' and method in ('read', 'readlines') and not node.args:
+            return self.read_whole_file(self.path_code(plan['path']), plan['binary'], method)
+        if plan['access'] == 'reader' and not node.args:
+            if method == 'read':
+                self.uses.add('std::io::Read')
+                if plan['binary']:
+                    data = self.fresh_name('data', node)
+                    return f'{{ let mut {data} = Vec::new(); {name}.read_to_end(&mut {data}).unwrap(); {data} }}'
+                text = self.fresh_name('text', node)
+                return f'{{ let mut {text} = String::new(); {name}.read_to_string(&mut {text}).unwrap(); {text} }}'
+            if method == 'readline':
+                line = self.fresh_name('line', node)
+                return f'{{ let mut {line} = String::new(); {name}.read_line(&mut {line}).unwrap(); {line} }}'
+            if method == 'readlines':
+                self.uses.add('std::io::Read')
+                text = self.fresh_name('text', node)
+                return (f"{{ let mut {text} = String::new(); {name}.read_to_string(&mut {text}).unwrap(); "
+                        f"{text}.split_inclusive('\\n').map(String::from).collect::<Vec<String>>() }}")
+            if method == 'close':
+                return '()'
+        if plan['access'] == 'writer':
+            if method == 'write' and len(node.args) == 1:
+                return self.file_write(name, node.args[0], plan['binary'])
+            if method == 'writelines' and len(node.args) == 1:
+                line = self.fresh_name('line', node)
+                return f'{self.generate(node.args[0])}.iter().try_for_each(|{line}| {name}.write_all({line}.as_bytes())).unwrap()'
+            if method in ('flush', 'close') and not node.args:
+                return f'{name}.flush().unwrap()'
+        self.diagnostics.append(f'{name}.{method}: нет отображения в Rust для такого обращения к файлу')
+        return f'{name}.{method}({", ".join(self.generate(arg) for arg in node.args)})'
+
+    def file_write(self, name, value, binary):
+        # f.write(x): форматирование сразу в BufWriter, без временной String
+        if binary:
+            return f'{name}.write_all(&{self.generate(value)}).unwrap()'
+        if isinstance(value, String):
+            return f'{name}.write_all("{self.rust_literal(value.value)}".as_bytes()).unwrap()'
+        if isinstance(value, FormattedString):
+            template, args = self.format_arguments(value.values)
+            if args:
+                return f'write!({name}, "{template}", {", ".join(args)}).unwrap()'
+        if isinstance(value, FunctionCall) and value.name == 'str' and len(value.args) == 1 \
+                and value.name not in self.function_signatures:
+            field, code, _ = self.format_field(FormattedValue(value.args[0]))
+            return f'write!({name}, "{field}", {code}).unwrap()'
+        pieces = self.string_pieces(value)
+        if pieces is not None:
+            template, args = self.format_arguments(pieces)
+            return f'write!({name}, "{template}", {", ".join(args)}).unwrap()' if args else \
+                f'{name}.write_all("{template}".as_bytes()).unwrap()'
+        return f'{name}.write_all({self.generate(value)}.as_bytes()).unwrap()'
+
+    def file_loop_source(self, node):
+        # for line in f / enumerate(f) / open(p) -> (читатель, имя читателя для объявления, начало счёта)
+        iterable, start = node.iterable, None
+        if isinstance(iterable, FunctionCall) and iterable.name == 'enumerate' and 1 <= len(iterable.args) <= 2 \
+                and 'enumerate' not in self.function_signatures and isinstance(node.target, TupleNode) \
+                and len(node.target.elements) == 2:
+            start = self.generate(iterable.args[1].value if isinstance(iterable.args[1], KeywordArgument)
+                                  else iterable.args[1]) if len(iterable.args) == 2 else '0'
+            iterable = iterable.args[0]
+        if isinstance(iterable, Identifier) and iterable.name in self.file_plans:
+            plan = self.file_plans[iterable.name]
+            if plan['access'] != 'reader' or plan['binary']:
+                return None
+            reader, declared = iterable.name, None
+        elif isinstance(iterable, FunctionCall) and 'open' not in self.function_signatures \
+                and self.file_access.open_mode(iterable) == ('read', False):
+            self.uses.update({'std::fs::File', 'std::io::BufRead', 'std::io::BufReader'})
+            reader = self.fresh_name('reader', node)
+            declared = f'BufReader::new(File::open({self.path_code(iterable.args[0])}).unwrap())'
+        else:
+            return None
+        line = node.target.elements[1] if start is not None else node.target
+        if not isinstance(line, Identifier) or (start is not None and not isinstance(node.target.elements[0], Identifier)):
+            return None
+        return reader, declared, start
+
+    def generate_file_loop(self, node, reader, declared, start):
+        # Построчное чтение с выбором стратегии по тому, покидает ли строка итерацию
+        line = node.target.elements[1].name if start is not None else node.target.name
+        index = node.target.elements[0].name if start is not None else None
+        strategy = self.file_access.line_strategy(node.body, line)
+        self.type_inference.update_type(line, 'String')
+        if index is not None:
+            self.type_inference.update_type(index, 'i32')
+        counter = self.fresh_name(f'{index}_next', node) if index is not None else None
+        lines = [f'{self.indent()}{{'] if declared or strategy == 'buffer' or counter else []
+        self.indent_level += 1 if lines else 0
+        if declared:
+            lines.append(f'{self.indent()}let mut {reader} = {declared};')
+        if strategy == 'lines':
+            source = f'(&mut {reader}).lines()'
+            header = f'for ({index}, {line}) in ({start}..).zip({source}) {{' if index is not None else f'for {line} in {source} {{'
+            lines.append(f'{self.indent()}{header}')
+            self.indent_level += 1
+            targets = [n.left if isinstance(n, Assignment) else n.target
+                       for n in walk(node) if isinstance(n, (Assignment, AugAssignment))]
+            mutable = 'mut ' if any(isinstance(t, Identifier) and t.name == line for t in targets) else ''
+            lines.append(f'{self.indent()}let {mutable}{line} = {line}.unwrap();')
+        else:
+            if strategy == 'buffer':
+                # Один буфер на все строки: read_line дописывает, поэтому очищаем перед чтением
+                lines.append(f'{self.indent()}let mut {line} = String::new();')
+            if counter:
+                lines.append(f'{self.indent()}let mut {counter} = {start};')
+            lines.append(f'{self.indent()}loop {{')
+            self.indent_level += 1
+            if strategy == 'buffer':
+                lines.append(f'{self.indent()}{line}.clear();')
+            else:
+                lines.append(f'{self.indent()}let mut {line} = String::new();')
+            lines.append(f'{self.indent()}if {reader}.read_line(&mut {line}).unwrap() == 0 {{')
+            lines.append(f'{self.indent()}    break;')
+            lines.append(f'{self.indent()}}}')
+            if counter:
+                lines.append(f'{self.indent()}let {index} = {counter};')
+                lines.append(f'{self.indent()}{counter} += 1;')
+        lines.extend(self.generate_statements(node.body))
+        self.indent_level -= 1
+        lines.append(f'{self.indent()}}}')
+        if lines[0].strip() == '{':
+            self.indent_level -= 1
+            lines.append(f'{self.indent()}}}')
+        return '\n'.join(lines)
+
+    def generate_range(self, call):
+        if len(call.args) == 3 and self.negative_step(call.args[2]) is not None:
+            # Убывающий range(a, b, -k): a, a - k, ... > b
+            start, end, _ = call.args
+            step = self.negative_step(call.args[2])
+            step_part = f'.step_by({step})' if step != 1 else ''
+            low = str(end.value + 1) if isinstance(end, Num) else f'({self.generate(end)} + 1)'
+            return f'({low}..={self.generate(start)}).rev(){step_part}'
+        if len(call.args) == 1:
+            return f'0..{self.generate(call.args[0])}'
+        if len(call.args) == 2:
+            return f'{self.generate(call.args[0])}..{self.generate(call.args[1])}'
+        start, end, step = call.args
+        return f'({self.generate(start)}..{self.generate(end)}).step_by({self.generate(step)})'
+
+    def negative_step(self, step):
+        # Модуль отрицательного литерального шага range или None
+        if isinstance(step, Num) and step.value < 0:
+            return -step.value
+        if isinstance(step, UnaryOp) and step.op == '-' and isinstance(step.expr, Num):
+            return step.expr.value
+        return None
+
+    def generate_index_loop(self, node, plan):
+        # for i in range(len(xs)) с обращениями xs[i] -> обход итератором:
+        # элементы берутся без проверки границ, что позволяет векторизацию
+        index = plan['index']
+        loop_names = {n.name for n in walk(node) if isinstance(n, Identifier)}
+        primary = plan['arrays'][0][0]
+        patterns = []
+        iterators = []
+        # zip остановился бы на самом коротком массиве: остальные срезаются
+        # по длине первого, и более короткий вызовет панику, как IndexError в Python.
+        # Первый массив идёт в zip последним, чтобы его длина вычислялась до
+        # изменяемого заимствования
+        for array, mode in plan['arrays'][1:] + plan['arrays'][:1]:
+            element = f'{array}_{index}'
+            while element in loop_names:
+                element += '_'
+            self.subscript_aliases[(array, index)] = f'(*{element})'
+            patterns.append(element)
+            iterators.append(f'{array}.{mode}()' if array == primary else f'{array}[..{primary}.len()].{mode}()')
+
+        pattern, iterator = patterns[0], iterators[0]
+        for other_pattern, other_iterator in zip(patterns[1:], iterators[1:]):
+            pattern = f'({pattern}, {other_pattern})'
+            iterator = f'{iterator}.zip({other_iterator})'
+        if plan['enumerate']:
+            pattern = f'({index}, {pattern})'
+            iterator = f'{iterator}.enumerate()'
+
+        self.indent_level += 1
+        body = self.generate_statements(node.body)
+        if plan['enumerate']:
+            # enumerate даёт usize, а целые Python генерируются как i32
+            body.insert(0, f'{self.indent()}let {index} = {index} as i32;')
+        body = '\n'.join(body)
+        self.indent_level -= 1
+        for array, _ in plan['arrays']:
+            del self.subscript_aliases[(array, index)]
+        return f'{self.indent()}for {pattern} in {iterator} {{\n{body}\n{self.indent()}}}'
+
+    def generate_soa_loop(self, node, class_name, fields):
+        # for p in points с чтением p.x, p.y -> совместный обход только нужных
+        # полей-векторов; поля, не используемые в теле, не читаются вовсе
+        target = node.target.name
+        iterable = self.generate(node.iterable)
+        loop_names = {n.name for n in walk(node) if isinstance(n, Identifier)}
+        self.type_inference.update_type(target, class_name)
+        patterns = []
+        iterators = []
+        for field in fields:
+            element = f'{target}_{field}'
+            while element in loop_names:
+                element += '_'
+            self.attribute_aliases[(target, field)] = element
+            patterns.append(f'&{element}')
+            iterators.append(f'{iterable}.{field}.iter()')
+        if patterns:
+            pattern, iterator = patterns[0], iterators[0]
+            for other_pattern, other_iterator in zip(patterns[1:], iterators[1:]):
+                pattern = f'({pattern}, {other_pattern})'
+                iterator = f'{iterator}.zip({other_iterator})'
+        else:
+            pattern, iterator = '_', f'0..{iterable}.len()'
+
+        self.indent_level += 1
+        body = '\n'.join(self.generate_statements(node.body))
+        self.indent_level -= 1
+        for field in fields:
+            del self.attribute_aliases[(target, field)]
+        return f'{self.indent()}for {pattern} in {iterator} {{\n{body}\n{self.indent()}}}'
+
+    def generate_Subscript(self, node):
+        if isinstance(node.obj, Identifier) and isinstance(node.index, Identifier):
+            alias = self.subscript_aliases.get((node.obj.name, node.index.name))
+            if alias:
+                return alias
+        obj = self.generate(node.obj)
+        obj_type = self.type_inference.infer_type(node.obj)
+        if self.default_map(node.obj):
+            # Чтение отсутствующего ключа Counter или defaultdict даёт значение по умолчанию
+            default = self.default_value(node.obj)
+            fallback = f'unwrap_or({default})' if default in ('0', '0.0', 'false') else f'unwrap_or_else(|| {default})'
+            return f'{obj}.get({self.generate_key(node.index)}).cloned().{fallback}'
+        if obj_type.startswith('HashMap<'):
+            return f'{obj}[{self.generate_key(node.index)}]'
+        if obj_type.startswith('(') and isinstance(node.index, Num):
+            # Элемент кортежа - поле с номером, индексировать кортеж в Rust нельзя
+            return f'{obj}.{node.index.value}'
+        if obj_type.startswith('(') and isinstance(node.index, UnaryOp) and node.index.op == '-' \
+                and isinstance(node.index.expr, Num):
+            return f'{obj}.{len(self.type_inference.tuple_types(obj_type)) - node.index.expr.value}'
+        if obj_type.startswith('BinaryHeap<') and isinstance(node.index, Num) and node.index.value == 0:
+            # h[0] - наименьший элемент кучи
+            return f'{obj}.peek().unwrap().0'
+        if isinstance(node.index, UnaryOp) and node.index.op == '-' and isinstance(node.index.expr, Num):
+            # Отрицательный индекс отсчитывается от конца
+            return f'{obj}[{obj}.len() - {node.index.expr.value}]'
+        index = self.generate(node.index)
+        if isinstance(node.index, Num) or self.type_inference.infer_type(node.index) == 'usize':
+            return f'{obj}[{index}]'
+        return f'{obj}[{index} as usize]'
+
     def generate_ReturnStatement(self, node):
         # Генерирует код для операора return
-        expr = self.generate(node.expr)
-        return f'{self.indent()}return {expr};'
+        if self.tail_call_function and self.recursion.is_self_call(node.expr, self.tail_call_function):
+            # Хвостовой вызов: новые значения параметров и переход к началу цикла
+            update = self.generate_parameter_update(self.tail_call_function, node.expr.args)
+            return f"{update}\n{self.indent()}continue 'tail;"
+        # Строковый литерал возвращается как String, тип результата таких функций
+        expr = self.generate_element(node.expr)
+        if isinstance(node.expr, Subscript) and self.type_inference.infer_type(node.expr) == 'String':
+            # Из коллекции нельзя переместить элемент, возвращаем копию
+            expr = f'{expr}.clone()'
+        elif isinstance(node.expr, Attribute) and self.type_inference.infer_type(node.expr) not in COPY_TYPES:
+            # Поле остаётся в объекте, возвращаем копию
+            expr = f'{expr}.clone()'
+        elif isinstance(node.expr, Identifier) and self.borrowed_params.get(node.expr.name) == 'mut':
+            # Изменённый параметр &mut: вызывающий код видит изменения, а результат - копия
+            expr = f'{expr}.clone()'
+        if self.type_inference.is_int_literal(node.expr) and self.expected_return == 'f64':
+            expr = f'{node.expr.value}.0'
+        elif self.expected_return.startswith('Option<') and not (isinstance(node.expr, Constant) and node.expr.value is None):
+            expr = f'Some({expr})'
+        if self.returns_result:
+            expr = f'Ok({expr})'
+        return f'{self.indent()}{self.return_value(expr)};'
+
+    def return_value(self, expr):
+        # Внутри try с finally значение выносится из блока, а возврат
+        # выполняется после finally
+        if self.return_targets:
+            return f"break '{self.return_targets[-1]} Ok(Some({expr}))"
+        return f'return {expr}'
 
     def generate_ListNode(self, node):
         if not node.elements:
             return 'Vec::new()'
         
-        elements = []
-        for elem in node.elements:
-            if isinstance(elem, String):
-                elements.append(f'"{elem.value}".to_string()')
-            else:
-                elements.append(self.generate(elem))
-        
-        elements_str = ', '.join(elements)
+        elements_str = ', '.join(self.moved_value(elem, self.generate_element(elem)) for elem in node.elements)
         return f'vec![{elements_str}]'
 
+    def generate_element(self, elem):
+        # Элемент коллекции: строковые литералы и срезы strip() хранятся как String
+        if isinstance(elem, String):
+            return f'"{elem.value}".to_string()'
+        if isinstance(elem, MethodCall) and elem.method_name in ('strip', 'lstrip', 'rstrip'):
+            return f'{self.generate(elem)}.to_string()'
+        return self.generate(elem)
+
     def generate_DictNode(self, node):
-        pairs = [f'{self.generate(k)}: {self.generate(v)}' for k, v in node.pairs]
-        return f'HashMap::from([{", ".join(pairs)}])'
+        if not node.pairs:
+            return self.new_collection('HashMap')
+        pairs = [f'({self.generate_element(k)}, {self.generate_element(v)})' for k, v in node.pairs]
+        # from_iter резервирует место сразу под все пары (FromIterator
+        # не привязан к RandomState, в отличие от HashMap::from)
+        constructor = 'from_iter' if self.fast_maps else 'from'
+        return f'{self.collection_type("HashMap")}::{constructor}([{", ".join(pairs)}])'
 
     def generate_TryExcept(self, node):
-        self.code.append(f'{self.indent()}match (|| -> Result<(), Box<dyn std::error::Error>> {{')
+        # Тело try - помеченный блок: raise и ошибки вызовов выходят из него
+        # через break со значением Err, обработчики - ветви match по вариантам
+        # PyError. Без замыканий, Box<dyn Error> и приведения типов ошибок.
+        self.try_count += 1
+        label = f'try_{self.try_count}'
+        indent = self.indent()
+        lines = []
+        finally_label = f'{label}_finally' if node.finally_body else None
+        # return внутри try, обработчиков или else: значение сохраняется в outcome
+        guarded = node.try_body + [s for handler in node.except_handlers for s in handler.body] + (node.else_body or [])
+        returns = bool(finally_label) and any(isinstance(n, ReturnStatement) for n in walk(Program(guarded)))
+        if finally_label:
+            # Ошибки обработчиков и else сначала попадают в outcome,
+            # чтобы finally выполнился до их передачи дальше
+            outcome_type = 'Result<Option<_>, PyError>' if returns else 'Result<(), PyError>'
+            lines.append(f"{indent}let outcome: {outcome_type} = '{finally_label}: {{")
+            self.indent_level += 1
+            self.error_targets.append(finally_label)
+            if returns:
+                self.return_targets.append(finally_label)
+            finally_scope = {'kind': 'finally', 'label': finally_label,
+                             'value': 'Ok(None)' if returns else 'Ok(())', 'jumps': set()}
+            self.jump_scopes.append(finally_scope)
+
+        inner = self.indent()
+        lines.append(f"{inner}let result: Result<(), PyError> = '{label}: {{")
         self.indent_level += 1
-        for statement in node.try_body:
-            self.code.append(self.generate(statement))
+        self.error_targets.append(label)
+        self.jump_scopes.append({'kind': 'try'})
+        lines.extend(self.generate_statements(node.try_body))
+        self.jump_scopes.pop()
+        lines.append(f'{self.indent()}Ok(())')
+        self.error_targets.pop()
         self.indent_level -= 1
-        self.code.append(f'{self.indent()}}})() {{')
+        lines.append(f'{inner}}};')
+
+        lines.append(f'{inner}match result {{')
         self.indent_level += 1
-        self.code.append(f'{self.indent()}Ok(_) => {{')
-        if node.else_body:
-            self.indent_level += 1
-            for statement in node.else_body:
-                self.code.append(self.generate(statement))
-            self.indent_level -= 1
-        self.code.append(f'{self.indent()}}},')
+        if self.always_returns(node.try_body):
+            lines.append(f'{self.indent()}Ok(()) => unreachable!(),')
+        else:
+            lines.append(self.generate_match_arm('Ok(())', node.else_body or []))
+        remaining = self.exceptions.block_escapes(node.try_body)
+        catches_all = False
         for handler in node.except_handlers:
-            if handler.exc_type:
-                exc_type = self.generate(handler.exc_type)
-                self.code.append(f'{self.indent()}Err(e) if e.is::<{exc_type}>() => {{')
+            caught = self.exceptions.handler_catches(handler, remaining)
+            remaining -= caught
+            arm = self.generate_handler_arm(handler)
+            if arm is None:
+                continue
+            lines.append(arm)
+            if self.exceptions.handler_types(handler, self.error_variants) is None:
+                catches_all = True
+                break
+        if not catches_all:
+            if remaining:
+                lines.append(f'{self.indent()}Err(error) => {self.propagate_error("error")},')
             else:
-                self.code.append(f'{self.indent()}Err(e) => {{')
-            self.indent_level += 1
-            if handler.exc_name:
-                self.code.append(f'{self.indent()}let {handler.exc_name} = e.downcast::<{exc_type}>().unwrap();')
-            for statement in handler.body:
-                self.code.append(self.generate(statement))
+                lines.append(f'{self.indent()}Err(_) => unreachable!(),')
+        self.indent_level -= 1
+        lines.append(f'{inner}}}')
+
+        if finally_label:
+            lines.append(f'{inner}{"Ok(None)" if returns else "Ok(())"}')
+            self.error_targets.pop()
+            if returns:
+                self.return_targets.pop()
+            self.jump_scopes.pop()
             self.indent_level -= 1
-            self.code.append(f'{self.indent()}}},')
+            lines.append(f'{indent}}};')
+            lines.extend(self.generate_statements(node.finally_body))
+            for kind in sorted(finally_scope['jumps'], reverse=True):
+                lines.insert(0, f'{indent}let mut {finally_label}_{kind} = false;')
+                lines.append(f'{indent}if {finally_label}_{kind} {{')
+                self.indent_level += 1
+                lines.append(self.generate_jump(kind))
+                self.indent_level -= 1
+                lines.append(f'{indent}}}')
+            escapes = set(remaining)
+            for handler in node.except_handlers:
+                escapes |= self.exceptions.block_escapes(handler.body, frozenset(self.error_variants))
+            escapes |= self.exceptions.block_escapes(node.else_body)
+            if returns:
+                # Отложенный return после finally; если try всегда возвращает,
+                # match без хвоста завершает функцию
+                lines.append(f'{indent}match outcome {{')
+                lines.append(f'{indent}    Ok(Some(value)) => {self.return_value("value")},')
+                if escapes:
+                    lines.append(f'{indent}    Err(error) => {self.propagate_error("error")},')
+                if self.always_returns([node]):
+                    lines.append(f'{indent}    _ => unreachable!(),')
+                else:
+                    lines.append(f'{indent}    _ => {{}}')
+                lines.append(f'{indent}}}')
+            elif escapes:
+                lines.append(f'{indent}if let Err(error) = outcome {{')
+                lines.append(f'{indent}    {self.propagate_error("error")};')
+                lines.append(f'{indent}}}')
+        return '\n'.join(lines)
+
+    def generate_handler_arm(self, handler):
+        variants = self.exceptions.handler_types(handler, self.error_variants)
+        reraises = any(isinstance(n, RaiseStatement) and n.exception is None
+                       for n in walk(Program(handler.body)))
+        prelude = None
+        if variants is None:
+            error = handler.exc_name or 'error'
+            pattern = f'Err({error})'
+        elif not variants:
+            # Ни один из типов обработчика не выбрасывается в программе
+            return None
+        elif reraises:
+            # Повторный raise передаёт дальше ту же ошибку целиком
+            error = 'error'
+            alternatives = ' | '.join(f'PyError::{variant}(_)' for variant in variants)
+            pattern = f'Err(error @ ({alternatives}))'
+            if handler.exc_name:
+                prelude = f'let {handler.exc_name} = &error;'
+        else:
+            error = None
+            binding = handler.exc_name or '_'
+            pattern = 'Err(' + ' | '.join(f'PyError::{variant}({binding})' for variant in variants) + ')'
+        self.handler_errors.append(error)
+        arm = self.generate_match_arm(pattern, handler.body, prelude)
+        self.handler_errors.pop()
+        return arm
+
+    def generate_match_arm(self, pattern, statements, prelude=None):
+        lines = [f'{self.indent()}{pattern} => {{']
+        self.indent_level += 1
+        if prelude:
+            lines.append(f'{self.indent()}{prelude}')
+        lines.extend(self.generate_statements(statements))
         self.indent_level -= 1
-        self.code.append(f'{self.indent()}}}')
-        if node.finally_body:
-            self.code.append(f'{self.indent()}// Finally block')
-            for statement in node.finally_body:
-                self.code.append(self.generate(statement))
-        return ''
+        lines.append(f'{self.indent()}}}')
+        return '\n'.join(lines)
+
+    def generate_RaiseStatement(self, node):
+        if node.exception is None:
+            error = self.handler_errors[-1] if self.handler_errors else None
+            if error is None:
+                error = 'PyError::RuntimeError(Cow::Borrowed("No active exception to reraise"))'
+        else:
+            error = self.generate_error_value(node.exception)
+        return f'{self.indent()}{self.propagate_error(error)};'
+
+    def generate_error_value(self, exception):
+        name = self.exceptions.exception_name(exception)
+        args = exception.args if isinstance(exception, FunctionCall) else []
+        if not args:
+            message = 'Cow::Borrowed("")'
+        elif isinstance(args[0], String):
+            message = f'Cow::Borrowed("{args[0].value}")'
+        else:
+            message = f'Cow::Owned({self.generate(args[0])}.to_string())'
+        return f'PyError::{name}({message})'
 
     def generate_ImportStatement(self, node):
+        if node.module in ('functools', 'typing') or node.module in MODULE_REGISTRY:
+            # Декораторы functools понижаются при генерации функций, функции
+            # модулей из реестра - в местах вызова, а типы typing - в аннотациях
+            return ''
         if node.alias:
-            return f'{self.indent()}use {node.module_name} as {node.alias};'
+            return f'{self.indent()}use {node.module} as {node.alias};'
         else:
-            return f'{self.indent()}use {node.module_name};'
+            return f'{self.indent()}use {node.module};'
 
     def generate_ClassDef(self, node):
-        base_class = f': {node.base_class}' if node.base_class else ''
-        self.code.append(f'{self.indent()}struct {node.name}{base_class} {{')
-        self.indent_level += 1
-        
-        # Генерируем поля структуры
-        for statement in node.body:
-            if isinstance(statement, Assignment):
-                field_name = self.generate(statement.left)
-                field_type = self.type_inference.infer_type(statement.right)
-                self.code.append(f'{self.indent()}{field_name}: {field_type},')
-        
-        self.indent_level -= 1
-        self.code.append(f'{self.indent()}}}')
-        
-        # Генерируем реализацию методов
-        self.code.append(f'{self.indent()}impl {node.name} {{')
+        # Класс -> структура с полями и impl: __init__ становится конструктором new,
+        # остальные методы принимают &self или &mut self. Базовый класс не поддерживается.
+        plan = self.class_plans[node.name]
+        indent = self.indent()
+        derives = ['Debug', 'Clone'] + (['Copy'] if plan['copy'] else [])
+        lines = [f'{indent}#[derive({", ".join(derives)})]', f'{indent}struct {node.name} {{']
+        lines.extend(f'{indent}    {field}: {self.render_type(field_type)},' for field, field_type in plan['fields'].items())
+        lines.append(f'{indent}}}')
+        lines.append('')
+        lines.append(f'{indent}impl {node.name} {{')
+
+        outer_state = (self.current_class, self.buffered_output)
+        self.current_class = node.name
+        # Методы печатают через println!: буфер вывода в структуру не передаётся
+        self.buffered_output = False
         self.indent_level += 1
-        
+        methods = []
+        init = next((s for s in node.body if isinstance(s, FunctionDef) and s.name == '__init__'), None)
+        methods.append(self.generate_constructor(node, init))
         for statement in node.body:
-            if isinstance(statement, FunctionDef):
-                self.code.append(self.generate(statement))
-        
+            if isinstance(statement, FunctionDef) and statement is not init:
+                methods.append(self.generate(statement))
         self.indent_level -= 1
-        self.code.append(f'{self.indent()}}}')
-        
-        # Генерируем реазацю трейтов
-        if node.traits:
-            for trait in node.traits:
-                self.code.append(f'{self.indent()}impl {trait} for {node.name} {{')
-                self.indent_level += 1
-                
-                for method in [m for m in node.body if isinstance(m, FunctionDef) and m.name in trait.methods]:
-                    self.code.append(self.generate(method))
-                
-                self.indent_level -= 1
-                self.code.append(f'{self.indent()}}}')
-        
-        return ''
+        self.current_class, self.buffered_output = outer_state
+
+        lines.append('\n\n'.join(methods))
+        lines.append(f'{indent}}}')
+        return '\n'.join(lines)
+
+    def generate_constructor(self, node, init):
+        plan = self.class_plans[node.name]
+        indent = self.indent()
+        self.type_inference.enter_scope()
+        params = []
+        for param, param_type in plan['params']:
+            self.type_inference.update_type(param, param_type)
+            params.append(f'{param}: {self.render_type(param_type)}')
+        body = init.body if init else []
+        values = {}
+        if all(isinstance(s, Assignment) and self.is_self_attribute(s.left)
+               and not any(isinstance(n, Identifier) and n.name == 'self' for n in walk(s.right)) for s in body):
+            # Простой __init__ из присваиваний полей -> литерал структуры
+            for statement in body:
+                values[statement.left.attr_name] = self.generate_element(statement.right)
+        inits = []
+        for field in plan['fields']:
+            value = values.get(field, 'Default::default()')
+            inits.append(field if value == field else f'{field}: {value}')
+        lines = [f'{indent}fn new({", ".join(params)}) -> Self {{']
+        if values or not body:
+            lines.append(f'{indent}    {node.name} {{ {", ".join(inits)} }}')
+        else:
+            # Произвольный __init__ заполняет поля созданного по умолчанию объекта
+            outer_alias = self.self_alias
+            self.self_alias = self.fresh_name('this', init)
+            lines.append(f'{indent}    let mut {self.self_alias} = {node.name} {{ {", ".join(inits)} }};')
+            self.type_inference.update_type('self', node.name)
+            self.indent_level += 1
+            lines.extend(self.generate_statements(body))
+            lines.append(f'{self.indent()}{self.self_alias}')
+            self.indent_level -= 1
+            self.self_alias = outer_alias
+        lines.append(f'{indent}}}')
+        self.type_inference.exit_scope()
+        return '\n'.join(lines)
 
     def generate_MethodDef(self, node):
         params = []
@@ -377,19 +3028,86 @@ class CodeGenerator:
         return method_code
 
     def generate_MethodCall(self, node):
-        obj = self.generate(node.obj)
+        member = self.type_inference.module_member(node)
+        if member:
+            return self.generate_module_call(node, *member)
+        if isinstance(node.obj, Identifier) and node.obj.name in self.file_plans:
+            return self.generate_file_method(node, self.file_plans[node.obj.name])
+        if isinstance(node.obj, FunctionCall) and node.method_name in ('read', 'readlines') and not node.args \
+                and 'open' not in self.function_signatures:
+            mode = self.file_access.open_mode(node.obj)
+            if mode is not None and mode[0] == 'read':
+                # open(p).read() - чтение файла целиком
+                return self.read_whole_file(self.path_code(node.obj.args[0]), mode[1], node.method_name)
+        if isinstance(node.obj, Subscript) and node.method_name in MUTATING_METHODS and self.default_map(node.obj.obj):
+            # d[k].append(x) для defaultdict: отсутствующее значение создаётся фабрикой
+            obj = self.generate_default_entry(node.obj)
+        else:
+            obj = self.generate(node.obj)
         method = node.method_name
-        args = ', '.join(self.generate(arg) for arg in node.args)
+        if method == 'append' and isinstance(node.obj, Identifier) and node.obj.name in self.untyped_lists:
+            # Тип элементов списка, созданного пустым, уточняем по первому добавлению
+            elem_type = self.type_inference.infer_type(node.args[0]) if node.args else 'unknown'
+            if elem_type != 'unknown':
+                self.type_inference.update_type(node.obj.name, f'Vec<{elem_type}>')
+                self.untyped_lists.discard(node.obj.name)
+        self.type_inference.refine_container_type(node)
+        obj_type = self.type_inference.infer_type(node.obj)
+        if obj_type in self.class_plans:
+            # Метод пользовательского класса: имена не отображаются на методы Rust
+            signature = self.function_signatures.get(f'{obj_type}.{method}', [])
+            args = [self.optional_argument(arg, self.generate_argument(arg, signature[index][2]), signature[index][1])
+                    if index < len(signature) else self.generate_argument(arg, 'owned')
+                    for index, arg in enumerate(node.args)]
+            return f'{obj}.{method}({", ".join(args)})'
+        args = ', '.join(self.moved_value(arg, self.generate_element(arg)) if method in MUTATING_METHODS else self.generate(arg)
+                         for arg in node.args)
+        if method in type_methods(obj_type):
+            lowering = type_methods(obj_type)[method][0]
+            if lowering.startswith('lower_'):
+                code = getattr(self, lowering)(method, node)
+                if code is not None:
+                    return code
+                self.diagnostics.append(f'{obj}.{method}: нет отображения в Rust для такого вызова')
+                return f'{obj}.{method}({args})'
+            return lowering.format(*[self.moved_value(arg, self.generate_element(arg)) for arg in node.args], obj=obj)
+        if method == 'update' and self.default_map(node.obj) and isinstance(self.default_maps[node.obj.name], Num):
+            return self.generate_counter_update(obj, node.args[0])
+        if method == 'get' and node.args and obj_type.startswith('HashMap<'):
+            lookup = f'{obj}.get({self.generate_key(node.args[0])}).cloned()'
+            if len(node.args) > 1:
+                return f'{lookup}.unwrap_or({self.generate_element(node.args[1])})'
+            return lookup
+        if method == 'join' and len(node.args) == 1 and obj_type in ('String', '&str'):
+            joined = self.generate_join(node, obj if isinstance(node.obj, String) else f'&*{obj}')
+            if joined is not None:
+                return joined
         if method in METHOD_MAPPING:
             rust_method = METHOD_MAPPING[method]
-            return f'{self.indent()}{obj}.{rust_method}({args});'
+            return f'{obj}.{rust_method}({args})'
         else:
-            return f'{self.indent()}{obj}.{method}({args});'
+            self.unsupported_array_member(node.obj, method)
+            return f'{obj}.{method}({args})'
 
     def generate_Attribute(self, node):
+        member = self.type_inference.module_member(node)
+        if member:
+            return self.module_constant(*member)
+        if isinstance(node.obj, Identifier) and (node.obj.name, node.attr_name) in self.attribute_aliases:
+            return self.attribute_aliases[(node.obj.name, node.attr_name)]
+        if isinstance(node.obj, Subscript) and self.type_inference.infer_type(node.obj.obj) in self.type_inference.soa_types:
+            # points[i].x -> points.x[i]
+            return self.generate(Subscript(Attribute(node.obj.obj, node.attr_name), node.obj.index))
         obj = self.generate(node.obj)
+        self.unsupported_array_member(node.obj, node.attr_name)
         return f"{obj}.{node.attr_name}"
 
+    def unsupported_array_member(self, obj, name):
+        # a.shape, a.reshape(...) и прочее вне одномерного подмножества NumPy
+        if self.type_inference.uses_numpy() and self.type_inference.infer_type(obj) in (ARRAY_TYPE, MASK_TYPE):
+            self.diagnostics.append(f'{self.generate(obj)}.{name}: нет отображения в Rust для массива NumPy '
+                                    f'(поддерживаются одномерные массивы f64)')
+
     def generate_AsyncFunctionDef(self, node):
         params = []
         for param in node.params:
@@ -426,11 +3144,776 @@ class CodeGenerator:
             return f'{self.indent()}#[{node.name}({args})]'
 
     def generate_DecoratedDef(self, node):
-        for decorator in node.decorators:
-            self.code.append(self.generate(decorator))
-        return self.generate(node.definition)
+        memoization = [d for d in node.decorators if self.memoization_decorator(d)]
+        if memoization and isinstance(node.definition, FunctionDef):
+            memoized = self.generate_memoized_function(node.definition, memoization[0])
+            if memoized:
+                return memoized
+        lines = [self.generate(decorator) for decorator in node.decorators if decorator not in memoization]
+        lines.append(self.generate(node.definition))
+        return '\n'.join(lines)
+
+    def memoization_decorator(self, decorator):
+        return decorator.name.split('.')[-1] in MEMOIZATION_DECORATORS
+
+    def memoization_maxsize(self, decorator):
+        # maxsize из @lru_cache(N) или @lru_cache(maxsize=N); None - без ограничения
+        maxsize = MEMOIZATION_DECORATORS[decorator.name.split('.')[-1]]
+        for arg in decorator.args:
+            value = arg.value if isinstance(arg, KeywordArgument) else arg
+            if isinstance(arg, KeywordArgument) and arg.name != 'maxsize':
+                continue
+            if isinstance(value, Num):
+                maxsize = max(int(value.value), 0)
+            elif isinstance(value, Constant) and value.value is None:
+                maxsize = None
+        return maxsize
+
+    def generate_memoized_function(self, node, decorator):
+        # @cache / @lru_cache: исходное тело становится функцией {name}_uncached,
+        # а под исходным именем генерируется обёртка с кэшем в HashMap.
+        # Рекурсивные вызовы идут через обёртку и тоже попадают в кэш.
+        signature = self.function_signatures.get(node.name) or self.plan_function_signature(node)
+        if 'self' in node.params or any(param_type not in HASHABLE_TYPES for _, param_type, _ in signature):
+            self.diagnostics.append(f'{node.name}: мемоизация не применена, параметры нехэшируемые')
+            return None
+        maxsize = self.memoization_maxsize(decorator)
+
+        uncached_name = f'{node.name}_uncached'
+        self.function_signatures[uncached_name] = signature
+        if node.name in self.raising_functions:
+            # Обёртка кэширует Result целиком и возвращает его как есть
+            self.raising_functions.add(uncached_name)
+        if node.name in self.printing_functions:
+            self.printing_functions.add(uncached_name)
+        uncached_code = self.generate(FunctionDef(uncached_name, node.params, node.body))
+        return_type = self.function_return_types[uncached_name]
+        self.function_return_types[node.name] = return_type
+
+        params = ', '.join(self.output_param(node.name)
+                           + [f'{param}: {self.render_type(self.ownership.borrowed_type(param_type, mode))}'
+                              for param, param_type, mode in signature])
+        key_parts = []
+        for param, param_type, mode in signature:
+            if mode != 'owned':
+                key_parts.append(f'{param}.to_owned()')
+            elif param_type in ('String',):
+                key_parts.append(f'{param}.clone()')
+            else:
+                key_parts.append(param)
+        key_type = self.tuple_code([param_type for _, param_type, _ in signature])
+        key = self.tuple_code(key_parts)
+        args = ', '.join([self.output_name] * (node.name in self.printing_functions)
+                         + [param for param, _, _ in signature])
+
+        self.uses.update({'std::cell::RefCell', 'std::collections::HashMap'})
+        if maxsize is None:
+            cache_type = self.render_type(f'HashMap<{key_type}, {return_type}>')
+            cache_init = self.new_collection('HashMap')
+            lookup = 'cache.borrow().get(&key).cloned()'
+        else:
+            self.uses.update({'std::collections::BTreeMap', 'std::hash::Hash'})
+            self.support_items['LruCache'] = LRU_CACHE_ITEM
+            cache_type = f'LruCache<{key_type}, {return_type}>'
+            cache_init = f'LruCache::new({maxsize})'
+            lookup = 'cache.borrow_mut().get(&key)'
+        cache_name = f'{node.name.upper()}_CACHE'
+
+        indent = self.indent()
+        lines = [
+            uncached_code,
+            '',
+            f'{indent}fn {node.name}({params}) -> {self.render_type(return_type)} {{',
+            f'{indent}    thread_local! {{',
+            f'{indent}        static {cache_name}: RefCell<{cache_type}> = RefCell::new({cache_init});',
+            f'{indent}    }}',
+            f'{indent}    let key = {key};',
+            f'{indent}    if let Some(value) = {cache_name}.with(|cache| {lookup}) {{',
+            f'{indent}        return value;',
+            f'{indent}    }}',
+            f'{indent}    let value = {uncached_name}({args});',
+            f'{indent}    {cache_name}.with(|cache| cache.borrow_mut().insert(key, value.clone()));',
+            f'{indent}    value',
+            f'{indent}}}',
+        ]
+        self.diagnostics.append(f'{node.name}: мемоизация через HashMap'
+                                + ('' if maxsize is None else f' с вытеснением LRU (maxsize={maxsize})'))
+        return '\n'.join(lines)
+
+    def plan_module_objects(self, program, function_defs):
+        # Списки, которые передаются в heapq, и словари из Counter / defaultdict.
+        # Параметры функций сюда не попадают: их тип приходит из мест вызова
+        params = {param for function_def in function_defs for param in function_def.params}
+        for node in walk(program):
+            member = self.type_inference.module_member(node) if isinstance(node, (FunctionCall, MethodCall)) else None
+            if member and member[0] == 'heapq' and member[1] in MODULE_REGISTRY['heapq']['mutating'] \
+                    and node.args and isinstance(node.args[0], Identifier) and node.args[0].name not in params:
+                self.heap_names.add(node.args[0].name)
+            if isinstance(node, Assignment) and isinstance(node.left, Identifier) and node.left.name not in params \
+                    and isinstance(node.right, (FunctionCall, MethodCall)):
+                member = self.type_inference.module_member(node.right)
+                if member == ('collections', 'Counter'):
+                    self.default_maps[node.left.name] = Num(0)
+                elif member == ('collections', 'defaultdict') and node.right.args:
+                    self.default_maps[node.left.name] = node.right.args[0]
+
+    def report_module_shared_objects(self, program, function_defs):
+        # Очередь, блокировка или поток уровня модуля в Rust - локальная
+        # переменная main: функции, которые к ним обращаются, их не видят
+        shared = {}
+        for statement in program.statements:
+            if isinstance(statement, Assignment) and isinstance(statement.left, Identifier):
+                value_type = self.type_inference.assigned_type(statement)
+                if value_type.startswith(SHARED_TYPES):
+                    shared[statement.left.name] = value_type
+        for function_def in function_defs:
+            local = set(function_def.params) | {n.left.name for n in scope_nodes(function_def)
+                                                if isinstance(n, Assignment) and isinstance(n.left, Identifier)}
+            used = {n.name for n in scope_nodes(function_def) if isinstance(n, Identifier)}
+            for name in sorted((used & set(shared)) - local):
+                self.diagnostics.append(f'{function_def.name}: {name} ({shared[name]}) создаётся на уровне модуля '
+                                        f'и в Rust недоступен функциям; передайте его параметром')
+
+    def generate_module_call(self, node, module, name):
+        # Вызов функции модуля из реестра: шаблон кода или метод lower_...
+        entry = module_function(module, name)
+        code = None
+        if entry is not None:
+            self.uses.update(MODULE_REGISTRY[module]['uses'])
+            lowering = entry[0]
+            if lowering.startswith('lower_'):
+                code = getattr(self, lowering)(name, node)
+            elif self.is_elementwise(node):
+                code = self.array_expression(node)
+            else:
+                code = self.module_template(lowering, module, name, node.args)
+        if code is None:
+            note = ' (поддерживаются одномерные массивы f64)' if module == 'numpy' else ''
+            self.diagnostics.append(f'{module}.{name}: нет отображения в Rust для такого вызова{note}')
+            args = ', '.join(self.generate(arg) for arg in node.args)
+            return f'{module}::{name}({args})'
+        return code
+
+    def module_template(self, template, module, name, args):
+        # Число аргументов должно совпадать с шаблоном, иначе, например,
+        # bisect_left(a, x, lo) молча потерял бы lo
+        if not self.template_accepts(template, args):
+            return None
+        mutating = name in MODULE_REGISTRY[module]['mutating']
+        codes = [self.moved_value(arg, self.generate_element(arg)) if mutating and index > 0 else self.generate(arg)
+                 for index, arg in enumerate(args)]
+        floats = {f'f{index}': self.float_operand(arg, code) for index, (arg, code) in enumerate(zip(args, codes))}
+        return template.format(*codes, **floats)
+
+    def template_accepts(self, template, args):
+        indexes = {int(index) for index in re.findall(r'\{f?(\d+)\}', template)}
+        return not any(isinstance(arg, KeywordArgument) for arg in args) and len(indexes) == len(args)
+
+    def float_operand(self, node, code):
+        # Аргумент функции math: у литерала явный тип f64, целое приводится
+        if isinstance(node, Num):
+            return f'{float(node.value)}_f64'
+        if self.type_inference.infer_type(node) == 'f64':
+            return code
+        return f'({code} as f64)'
+
+    def usize_code(self, node):
+        if isinstance(node, Num):
+            return str(node.value)
+        return f'({self.generate(node)} as usize)'
+
+    def module_constant(self, module, name):
+        constant = MODULE_REGISTRY[module]['constants'].get(name)
+        if constant is None:
+            self.diagnostics.append(f'{module}.{name}: нет отображения в Rust')
+            return name
+        return constant[0]
+
+    def lower_gcd(self, name, node):
+        if len(node.args) != 2:
+            return None
+        self.support_items['py_gcd'] = GCD_ITEM
+        return f'py_gcd({self.generate(node.args[0])}, {self.generate(node.args[1])})'
+
+    def lower_heap(self, name, node):
+        if name in ('nsmallest', 'nlargest'):
+            return self.generate_heap_select(name, node)
+        heap_node = node.args[0] if node.args else None
+        heap_type = self.type_inference.infer_type(heap_node) if heap_node is not None else 'unknown'
+        if not heap_type.startswith('BinaryHeap<'):
+            return None
+        heap = self.generate(heap_node)
+        if name == 'heapify':
+            # Переменная уже объявлена как BinaryHeap
+            return ''
+        if name == 'heappop' and len(node.args) == 1:
+            return f'{heap}.pop().unwrap().0'
+        if len(node.args) != 2:
+            return None
+        item = node.args[1]
+        if self.type_inference.is_placeholder(heap_type) and isinstance(heap_node, Identifier):
+            # Тип элементов кучи, созданной пустой, уточняем по первому добавлению
+            item_type = self.type_inference.infer_type(item)
+            if 'unknown' not in item_type:
+                self.type_inference.update_type(heap_node.name, f'BinaryHeap<Reverse<{item_type}>>')
+        if 'f64' in self.type_inference.infer_type(item):
+            self.diagnostics.append(f'{heap}: f64 не реализует Ord, элементы кучи должны быть целыми или строками')
+        value = self.moved_value(item, self.generate_element(item))
+        if name == 'heappush':
+            return f'{heap}.push(Reverse({value}))'
+        if name == 'heappushpop':
+            return f'{{ {heap}.push(Reverse({value})); {heap}.pop().unwrap().0 }}'
+        if name == 'heapreplace':
+            return f'{{ let top = {heap}.pop().unwrap().0; {heap}.push(Reverse({value})); top }}'
+        return None
+
+    def generate_heap_select(self, name, node):
+        # nsmallest(k, xs): частичный выбор select_nth_unstable за O(n) и сортировка
+        # только k выбранных элементов вместо сортировки всего списка
+        if len(node.args) != 2:
+            return None
+        source = self.iterator_chain(node.args[1])
+        if source is None:
+            return None
+        code, item_type, mode = source
+        items = self.fresh_name('items', node)
+        count = self.fresh_name('count', node)
+        order = '|a, b| b.cmp(a)' if name == 'nlargest' else '|a, b| a.cmp(b)'
+        lines = [f'let mut {items}: Vec<_> = {self.owned_chain(code, item_type, mode)}.collect();',
+                 f'let {count} = {self.usize_code(node.args[0])}.min({items}.len());']
+        if self.is_stable_free(item_type):
+            # Равные элементы неотличимы, поэтому порядок среди них не важен
+            lines.append(f'if {count} > 0 && {count} < {items}.len() {{ {items}.select_nth_unstable_by({count} - 1, {order}); }}')
+            lines.append(f'{items}.truncate({count});')
+            lines.append(f'{items}.sort_unstable_by({order});')
+        else:
+            lines.append(f'{items}.sort_by({order});')
+            lines.append(f'{items}.truncate({count});')
+        lines.append(items)
+        return f'{{ {" ".join(lines)} }}'
+
+    def generate_heap_declaration(self, node):
+        # h = [] или h = [...] для списка, с которым работает heapq
+        name = node.left.name
+        if isinstance(node.right, ListNode) and not isinstance(node.right, ListComprehension) and not node.right.elements:
+            value, item_type = 'BinaryHeap::new()', '_'
+        else:
+            source = self.iterator_chain(node.right)
+            if source is None:
+                return None
+            code, item_type, mode = source
+            value = f'{self.owned_chain(code, item_type, mode)}.map(Reverse).collect::<BinaryHeap<_>>()'
+        self.uses.update(MODULE_REGISTRY['heapq']['uses'])
+        self.type_inference.update_type(name, f'BinaryHeap<Reverse<{item_type}>>')
+        if self.bindings.get(id(node)) == 'assign':
+            return f'{self.indent()}{name} = {value};'
+        return f'{self.indent()}{self.let_keyword(node)} {name} = {value};'
+
+    def lower_deque(self, name, node):
+        self.uses.add('std::collections::VecDeque')
+        if not node.args:
+            return 'VecDeque::new()'
+        if len(node.args) != 1 or isinstance(node.args[0], KeywordArgument):
+            # deque(maxlen=n) вытесняет элементы, у VecDeque такого режима нет
+            return None
+        source = self.iterator_chain(node.args[0])
+        if source is None:
+            return None
+        return f'{self.owned_chain(*source)}.collect::<VecDeque<_>>()'
+
+    def lower_counter(self, name, node):
+        if not node.args:
+            return self.new_collection('HashMap')
+        if len(node.args) != 1:
+            return None
+        counts = self.fresh_name('counts', node)
+        update = self.generate_counter_update(counts, node.args[0])
+        if update is None:
+            return None
+        return f'{{ let mut {counts} = {self.new_collection("HashMap")}; {update}; {counts} }}'
+
+    def generate_counter_update(self, counts, iterable):
+        # Подсчёт элементов за один проход: одно хэширование на элемент через entry
+        source = self.iterator_chain(iterable)
+        if source is None:
+            return None
+        item = self.fresh_name('item', iterable)
+        return f'for {item} in {self.owned_chain(*source)} {{ *{counts}.entry({item}).or_insert(0) += 1; }}'
+
+    def lower_defaultdict(self, name, node):
+        return self.new_collection('HashMap')
+
+    def lower_most_common(self, name, node):
+        # Частоты по убыванию; равные - по ключу, чтобы порядок не зависел от хэширования.
+        # most_common(k) сначала выбирает k элементов за O(n)
+        obj = self.generate(node.obj)
+        items = self.fresh_name('items', node)
+        order = '|a, b| b.1.cmp(&a.1).then_with(|| a.0.cmp(&b.0))'
+        lines = [f'let mut {items}: Vec<_> = {obj}.iter().map(|(key, count)| (key.clone(), *count)).collect();']
+        if node.args:
+            count = self.fresh_name('count', node)
+            lines.append(f'let {count} = {self.usize_code(node.args[0])}.min({items}.len());')
+            lines.append(f'if {count} > 0 && {count} < {items}.len() {{ {items}.select_nth_unstable_by({count} - 1, {order}); }}')
+            lines.append(f'{items}.truncate({count});')
+        lines.append(f'{items}.sort_unstable_by({order});')
+        lines.append(items)
+        return f'{{ {" ".join(lines)} }}'
+
+    def default_map(self, node):
+        # Переменная - Counter или defaultdict с известной фабрикой значений
+        return isinstance(node, Identifier) and node.name in self.default_maps \
+            and self.type_inference.infer_type(node).startswith('HashMap<') and self.default_value(node) is not None
+
+    def default_value(self, node):
+        factory = self.default_maps[node.name]
+        if isinstance(factory, Num):
+            return str(factory.value)
+        if isinstance(factory, LambdaExpression):
+            return self.generate_element(factory.body)
+        if isinstance(factory, Identifier):
+            defaults = {'int': '0', 'float': '0.0', 'bool': 'false', 'str': 'String::new()', 'list': 'Vec::new()'}
+            if factory.name in ('set', 'dict'):
+                return self.new_collection('HashSet' if factory.name == 'set' else 'HashMap')
+            return defaults.get(factory.name)
+        return None
+
+    def generate_default_entry(self, subscript):
+        # Место значения по ключу с созданием отсутствующего: d.entry(k).or_insert(v)
+        key = self.generate_element(subscript.index)
+        if isinstance(subscript.index, Identifier) and not self.is_copy(self.type_inference.infer_type(subscript.index)):
+            key = self.moved_value(subscript.index, key) if id(subscript.index) in self.tracked_uses else f'{key}.clone()'
+        default = self.default_value(subscript.obj)
+        insert = f'or_insert({default})' if default in ('0', '0.0', 'false') else f'or_insert_with(|| {default})'
+        return f'{self.generate(subscript.obj)}.entry({key}).{insert}'
+
+    def refine_map_type(self, obj, key, value):
+        # Тип ключей словаря, созданного пустым, уточняем по первой записи
+        obj_type = self.type_inference.infer_type(obj)
+        if not self.type_inference.is_placeholder(obj_type):
+            return
+        key_type = self.type_inference.infer_type(key)
+        value_type = self.type_inference.element_type(obj_type)
+        if value_type == 'unknown':
+            value_type = self.type_inference.infer_type(value)
+        if 'unknown' not in (key_type, value_type) and '_' not in value_type:
+            self.type_inference.update_type(obj.name, f'HashMap<{key_type}, {value_type}>')
+
+    def lower_itertools(self, name, node):
+        chain = self.itertools_chain(name, node)
+        return chain[0] if chain is not None else None
+
+    def itertools_chain(self, name, node):
+        # Функции itertools -> адаптеры итераторов: (код, тип элемента, режим) или None
+        args = [arg for arg in node.args if not isinstance(arg, KeywordArgument)]
+        keywords = {arg.name: arg.value for arg in node.args if isinstance(arg, KeywordArgument)}
+        if name == 'count' and len(args) <= 2 and not keywords:
+            code = f'({self.generate(args[0]) if args else 0}..)'
+            if len(args) == 2:
+                code += f'.step_by({self.usize_code(args[1])})'
+            return code, 'i32', 'value'
+        if name == 'repeat' and 1 <= len(args) <= 2 and not keywords:
+            code = f'std::iter::repeat({self.generate_element(args[0])})'
+            if len(args) == 2:
+                code += f'.take({self.usize_code(args[1])})'
+            return code, self.type_inference.infer_type(args[0]), 'value'
+        if name in ('combinations', 'permutations'):
+            return self.index_pairs_chain(name, node, args, keywords)
+        if name == 'pairwise' and len(args) == 1:
+            # Соседние пары Vec - окна длины 2 без копирования среза
+            item_type = self.type_inference.iteration_item_type(args[0])
+            if not self.type_inference.infer_type(args[0]).startswith('Vec<') or 'unknown' in item_type:
+                return None
+            if self.is_copy(item_type):
+                return f'{self.generate(args[0])}.windows(2).map(|pair| (pair[0], pair[1]))', f'({item_type}, {item_type})', 'value'
+            return f'{self.generate(args[0])}.windows(2).map(|pair| (&pair[0], &pair[1]))', f'({item_type}, {item_type})', 'refs'
+        if name in ('takewhile', 'dropwhile') and len(args) == 2:
+            source = self.iterator_chain(args[1])
+            closure = self.item_closure(args[0], *source[1:]) if source else None
+            if closure is None:
+                return None
+            code, item_type, mode = source
+            param, body, _ = closure
+            adapter = 'take_while' if name == 'takewhile' else 'skip_while'
+            return f'{code}.{adapter}(|{self.filter_pattern(param, item_type, mode)}| {body})', item_type, mode
+        # Итерируемые аргументы: у islice, cycle и accumulate - только первый
+        iterables = args if name in ('chain', 'product') else args[:1]
+        sources = [self.iterator_chain(arg) for arg in iterables]
+        if not sources or None in sources:
+            return None
+        code, item_type, mode = sources[0]
+        if name == 'chain' and not keywords:
+            if len({source[2] for source in sources}) > 1:
+                sources = [(self.owned_chain(*source), source[1], 'value') for source in sources]
+            return '.chain('.join(source[0] for source in sources) + ')' * (len(sources) - 1), item_type, sources[0][2]
+        if name == 'islice' and 2 <= len(args) <= 4 and not keywords:
+            start, stop, step = (None, args[1], None) if len(args) == 2 else (args[1], args[2], args[3] if len(args) == 4 else None)
+            if start is not None:
+                code += f'.skip({self.usize_code(start)})'
+            if step is not None:
+                code += f'.step_by({self.usize_code(step)})'
+            if not (isinstance(stop, Constant) and stop.value is None):
+                if start is None:
+                    count = self.usize_code(stop)
+                elif isinstance(start, Num) and isinstance(stop, Num):
+                    count = str(max(stop.value - start.value, 0))
+                else:
+                    count = f'({self.generate(stop)} - {self.generate(start)}).max(0) as usize'
+                if step is not None:
+                    count = f'({count} + {self.usize_code(step)} - 1) / {self.usize_code(step)}'
+                code += f'.take({count})'
+            return code, item_type, mode
+        if name == 'cycle' and len(args) == 1:
+            return f'{code}.cycle()', item_type, mode
+        if name == 'accumulate' and len(args) == 1 and not keywords and item_type in ('i32', 'i64', 'f64'):
+            zero = '0.0' if item_type == 'f64' else '0'
+            return f'{code}.scan({zero}, |total, item| {{ *total += item; Some(*total) }})', item_type, 'value'
+        if name == 'product' and set(keywords) <= {'repeat'}:
+            repeat = keywords.get('repeat')
+            if repeat is not None:
+                if not isinstance(repeat, Num) or len(args) != 1:
+                    return None
+                args, sources = args * repeat.value, sources * repeat.value
+            if len(sources) != 2 or (sources[0][2] == 'value' and not self.is_copy(item_type)):
+                return None
+            # Второй итератор создаётся заново для каждого элемента первого,
+            # поэтому он должен быть дешёвым: обход коллекции или range
+            if not isinstance(args[1], (Identifier, Attribute)) and not (isinstance(args[1], FunctionCall) and args[1].name == 'range'):
+                return None
+            other_code, other_type, other_mode = sources[1]
+            first, second = self.fresh_name('first', node), self.fresh_name('second', node)
+            code = f'{code}.flat_map(|{first}| {other_code}.map(move |{second}| ({first}, {second})))'
+            return code, f'({item_type}, {other_type})', 'value' if mode == other_mode == 'value' else 'refs'
+        return None
+
+    def index_pairs_chain(self, name, node, args, keywords):
+        # combinations(xs, 2) и permutations(xs, 2) - пары индексов без копирования xs
+        r = args[1] if len(args) == 2 else keywords.get('r')
+        if len(args) < 1 or not (isinstance(r, Num) and r.value == 2):
+            return None
+        item_type = self.type_inference.iteration_item_type(args[0])
+        if not self.type_inference.infer_type(args[0]).startswith('Vec<') or 'unknown' in item_type:
+            return None
+        items = self.fresh_name('items', node)
+        if self.is_copy(item_type):
+            pair, mode = f'({items}[i], {items}[j])', 'value'
+        else:
+            pair, mode = f'(&{items}[i], &{items}[j])', 'refs'
+        if name == 'combinations':
+            inner = f'(i + 1..{items}.len()).map(move |j| {pair})'
+        else:
+            inner = f'(0..{items}.len()).filter(move |&j| j != i).map(move |j| {pair})'
+        if isinstance(args[0], (Identifier, Attribute)):
+            code = f'{{ let {items} = &{self.generate(args[0])}; (0..{items}.len()).flat_map(move |i| {inner}) }}'
+        elif mode == 'value':
+            # Временный список живёт, пока жив итератор: владеем им через Rc
+            code = (f'{{ let {items} = std::rc::Rc::new({self.generate(args[0])}); '
+                    f'(0..{items}.len()).flat_map(move |i| {{ let {items} = {items}.clone(); {inner} }}) }}')
+        else:
+            return None
+        return code, f'({item_type}, {item_type})', mode
+
+    def lower_pool(self, name, node):
+        # ThreadPoolExecutor(max_workers=n), Pool(n): без числа потоков - по числу ядер
+        args = [arg for arg in node.args if not isinstance(arg, KeywordArgument)]
+        keywords = {arg.name: arg.value for arg in node.args if isinstance(arg, KeywordArgument)}
+        if len(args) > 1 or set(keywords) - {'max_workers', 'processes'}:
+            # initializer и прочие параметры пула не поддерживаются
+            return None
+        workers = args[0] if args else keywords.get('max_workers', keywords.get('processes'))
+        self.support_items['WorkerPool'] = WORKER_POOL_ITEM
+        self.uses.update({'std::sync::mpsc', 'std::sync::Mutex'})
+        if workers is None or (isinstance(workers, Constant) and workers.value is None):
+            return 'WorkerPool::default()'
+        return f'WorkerPool::new({self.usize_code(workers)})'
+
+    def lower_pool_map(self, name, node):
+        # pool.map(f, xs) -> pool.map(&xs, |x| f(x)): f - лямбда с одним параметром
+        # или функция программы; chunksize на результат не влияет
+        args = [arg for arg in node.args if not isinstance(arg, KeywordArgument)]
+        if len(args) != 2 or any(arg.name != 'chunksize' for arg in node.args if isinstance(arg, KeywordArgument)):
+            return None
+        function, iterable = args
+        item_type = self.type_inference.iteration_item_type(iterable)
+        items = self.pool_input(iterable)
+        if items is None or 'unknown' in item_type or item_type == '_':
+            return None
+        param = self.lambda_param(function)
+        if isinstance(param, Identifier):
+            body = function.body
+        elif isinstance(function, Identifier) and function.name in self.function_signatures \
+                and function.name not in self.raising_functions and function.name not in self.printing_functions:
+            param = Identifier(self.fresh_name('item', node))
+            body = FunctionCall(function.name, [param])
+        else:
+            return None
+        # Поток получает ссылку на элемент: Copy-элементы разыменовываем в шаблоне,
+        # остальные передаются как заимствованные параметры
+        copy = self.is_copy(item_type)
+        outer_borrowed_params = self.borrowed_params
+        self.borrowed_params = dict(outer_borrowed_params)
+        if not copy:
+            self.borrowed_params[param.name] = 'ref'
+        self.type_inference.enter_scope()
+        self.type_inference.bind_target(param, item_type)
+        closure = f'|{"&" if copy else ""}{param.name}| {self.generate(body)}'
+        self.type_inference.exit_scope()
+        self.borrowed_params = outer_borrowed_params
+        return f'{self.generate(node.obj)}.map({items}, {closure})'
+
+    def pool_input(self, node):
+        # Срез элементов для pool.map: Vec заимствуется, прочие источники собираются в Vec
+        if isinstance(node, Identifier) and self.type_inference.infer_type(node).startswith('Vec<'):
+            return node.name if node.name in self.borrowed_params else f'&{node.name}'
+        source = self.iterator_chain(node)
+        if source is None:
+            return None
+        return f'&{self.owned_chain(*source)}.collect::<Vec<_>>()'
+
+    def is_pool_map(self, node):
+        return isinstance(node, MethodCall) and node.method_name in ('map', 'imap') \
+            and self.type_inference.infer_type(node.obj) == 'WorkerPool'
+
+    def lower_lock(self, name, node):
+        if node.args:
+            return None
+        self.uses.update({'std::sync::Arc', 'std::sync::Mutex'})
+        return 'Arc::new(Mutex::new(()))'
+
+    def lower_queue(self, name, node):
+        # Queue(maxsize) ограничивает размер, а PyQueue растёт без ограничения
+        maxsize = node.args[0] if node.args else None
+        if isinstance(maxsize, KeywordArgument):
+            maxsize = maxsize.value
+        if maxsize is not None and not (isinstance(maxsize, Num) and maxsize.value <= 0):
+            return None
+        self.support_items['PyQueue'] = PY_QUEUE_ITEM
+        self.uses.update({'std::collections::VecDeque', 'std::sync::Arc', 'std::sync::Condvar', 'std::sync::Mutex'})
+        return 'PyQueue::new()'
+
+    def lower_thread(self, name, node):
+        # Thread(target=f, args=(a, b)) -> PyThread::new(move || f(a, b)): поток владеет
+        # своими аргументами. Клон очереди и Arc блокировки ссылаются на тот же объект,
+        # а клон списка или словаря - уже нет
+        keywords = {arg.name: arg.value for arg in node.args if isinstance(arg, KeywordArgument)}
+        target = keywords.get('target')
+        thread_args = keywords.get('args', TupleNode([]))
+        if len(keywords) != len(node.args) or set(keywords) - {'target', 'args', 'daemon', 'name'} \
+                or not isinstance(thread_args, (TupleNode, ListNode)) or not isinstance(target, Identifier) \
+                or target.name not in self.function_signatures or target.name in self.raising_functions \
+                or target.name in self.printing_functions:
+            return None
+        signature = self.function_signatures[target.name]
+        lines, names = [], []
+        outer_borrowed_params = self.borrowed_params
+        self.borrowed_params = dict(outer_borrowed_params)
+        self.type_inference.enter_scope()
+        for index, arg in enumerate(thread_args.elements):
+            arg_type = self.type_inference.infer_type(arg)
+            mode = signature[index][2] if index < len(signature) else 'owned'
+            name = arg.name if isinstance(arg, Identifier) else self.fresh_name(f'arg{index}', node)
+            names.append(name)
+            if isinstance(arg, Identifier) and self.is_copy(arg_type):
+                continue
+            value = f'{self.generate(arg)}.clone()' if isinstance(arg, Identifier) else self.generate_element(arg)
+            if self.type_inference.is_placeholder(arg_type) and index < len(signature) \
+                    and not signature[index][1].startswith(arg_type.split('<', 1)[0]):
+                # Тип элементов очереди выводится по put, а поток создаётся раньше
+                self.diagnostics.append(f'{target.name}: тип параметра {signature[index][0]} не выведен, '
+                                        f'нужна аннотация, например Queue[int]')
+            if mode == 'mut':
+                self.diagnostics.append(f'{target.name}: поток изменяет копию {self.generate(arg)}, '
+                                        f'вызывающий код изменений не увидит')
+            lines.append(f'let {"mut " if mode == "mut" else ""}{name} = {value};')
+            self.borrowed_params.pop(name, None)
+            self.type_inference.update_type(name, arg_type)
+        call = self.generate(FunctionCall(target.name, [Identifier(name) for name in names]))
+        self.type_inference.exit_scope()
+        self.borrowed_params = outer_borrowed_params
+        self.support_items['PyThread'] = PY_THREAD_ITEM
+        self.uses.update({'std::sync::Arc', 'std::sync::Mutex'})
+        task = f'move || {{ {call}; }}'
+        if lines:
+            return f'PyThread::new({{ {" ".join(lines)} {task} }})'
+        return f'PyThread::new({task})'
+
+    def is_elementwise(self, node):
+        # Поэлементная операция над массивом NumPy: a * b + c, -a, np.sqrt(a)
+        if not self.type_inference.uses_numpy() \
+                or self.type_inference.infer_type(node) not in (ARRAY_TYPE, MASK_TYPE):
+            return False
+        if isinstance(node, (BinaryOp, UnaryOp)):
+            return True
+        member = self.type_inference.module_member(node) if isinstance(node, (FunctionCall, MethodCall)) else None
+        if member is None or member[0] != 'numpy':
+            return False
+        lowering = module_function(*member)[0]
+        return not lowering.startswith('lower_') and self.template_accepts(lowering, node.args)
+
+    def array_expression(self, node):
+        # Цепочка поэлементных операций -> один проход без временных массивов
+        index = self.fresh_name('i', node)
+        prelude, length, element = self.fused_loop(node, index, node)
+        item = self.type_inference.element_type(self.type_inference.infer_type(node))
+        return f'{{ {prelude} (0..{length}).map(|{index}| {element}).collect::<Vec<{item}>>() }}'
+
+    def fused_loop(self, node, index, root, target=None):
+        # Подготовка общего цикла по элементам: (код до цикла, длина, код элемента).
+        # Все массивы-операнды пересрезаются до одной длины, поэтому rustc убирает
+        # проверки границ в теле цикла и может его векторизовать
+        arrays = [target] if target else []
+        values = []
+        element = self.array_element(node, index, arrays, values, root)
+        length = self.fresh_name('len', root)
+        lines = [f'let {name} = {code};' for name, code in values]
+        lines.append(f'let {length} = {arrays[0]}.len();')
+        if len(arrays) > 1:
+            same = ' && '.join(f'{name}.len() == {length}' for name in arrays[1:])
+            lines.append(f'assert!({same}, "operands could not be broadcast together");')
+        slices = [f'&{"mut " if name == target else ""}{name}[..{length}]' for name in arrays]
+        if len(arrays) == 1:
+            lines.append(f'let {arrays[0]} = {slices[0]};')
+        else:
+            lines.append(f'let ({", ".join(arrays)}) = ({", ".join(slices)});')
+        return ' '.join(lines), length, element
+
+    def array_element(self, node, index, arrays, values, root):
+        # Код одного элемента выражения. Массивы-операнды собираются в arrays,
+        # а числа, которые достаточно вычислить один раз, - в values до цикла
+        if self.is_elementwise(node):
+            if isinstance(node, UnaryOp):
+                return f'(-{self.array_element(node.expr, index, arrays, values, root)})'
+            if isinstance(node, BinaryOp):
+                left = self.array_element(node.left, index, arrays, values, root)
+                if node.op == '**' and self.type_inference.is_int_literal(node.right):
+                    return f'{left}.powi({node.right.value})'
+                right = self.array_element(node.right, index, arrays, values, root)
+                if node.op == '**':
+                    return f'{left}.powf({right})'
+                if node.op == '%':
+                    return f'{left}.rem_euclid({right})'
+                return f'({left} {node.op} {right})'
+            template = module_function(*self.type_inference.module_member(node))[0]
+            codes = [self.array_element(arg, index, arrays, values, root) for arg in node.args]
+            return template.format(*codes, **{f'f{position}': code for position, code in enumerate(codes)})
+        node_type = self.type_inference.infer_type(node)
+        if node_type in (ARRAY_TYPE, MASK_TYPE, 'Vec<i32>'):
+            if isinstance(node, Identifier):
+                name = node.name
+            else:
+                name = self.fresh_name(f'array{len(values)}', root)
+                values.append((name, f'&{self.generate(node)}'))
+            if name not in arrays:
+                arrays.append(name)
+            return f'({name}[{index}] as f64)' if node_type == 'Vec<i32>' else f'{name}[{index}]'
+        if isinstance(node, Num):
+            return repr(float(node.value))
+        code = self.generate(node)
+        if node_type != 'bool':
+            code = self.float_operand(node, code)
+        if isinstance(node, Identifier):
+            return code
+        name = self.fresh_name(f'value{len(values)}', root)
+        values.append((name, code))
+        return name
+
+    def array_reduction(self, name, args):
+        # sum, mean, dot, max и min сворачивают поэлементное выражение по ходу
+        # вычисления, не собирая его в массив
+        if name == 'dot':
+            if len(args) != 2 or any(self.type_inference.infer_type(arg) != ARRAY_TYPE for arg in args):
+                return None
+            node = BinaryOp(args[0], '*', args[1])
+        else:
+            if len(args) != 1 or self.type_inference.infer_type(args[0]) != ARRAY_TYPE:
+                return None
+            node = args[0]
+        index = self.fresh_name('i', node)
+        prelude, length, element = self.fused_loop(node, index, node)
+        if name in ('sum', 'mean', 'dot'):
+            self.support_items['fused_sum'] = FUSED_SUM_ITEM
+            result = f'fused_sum({length}, |{index}| {element})'
+            if name == 'mean':
+                result = f'{result} / {length} as f64'
+            return f'{{ {prelude} {result} }}'
+        start, fold = ('f64::NEG_INFINITY', 'f64::max') if name == 'max' else ('f64::INFINITY', 'f64::min')
+        return (f'{{ {prelude} assert!({length} > 0, "zero-size array to reduction operation {name}"); '
+                f'(0..{length}).map(|{index}| {element}).fold({start}, {fold}) }}')
+
+    def lower_numpy(self, name, node):
+        args = [arg for arg in node.args if not isinstance(arg, KeywordArgument)]
+        keywords = {arg.name: arg.value for arg in node.args if isinstance(arg, KeywordArgument)}
+        if name == 'linspace' and 'num' in keywords and len(args) == 2:
+            args.append(keywords.pop('num'))
+        if keywords:
+            # axis, dtype, endpoint и прочие параметры не поддерживаются
+            return None
+        if name in ('sum', 'mean', 'dot', 'max', 'min', 'amax', 'amin'):
+            return self.array_reduction({'amax': 'max', 'amin': 'min'}.get(name, name), args)
+        if len(args) == 1 and name in ('array', 'asarray', 'copy'):
+            return self.array_copy(args[0])
+        if len(args) == 1 and name in ('zeros', 'ones'):
+            return f'vec![{"0.0" if name == "zeros" else "1.0"}; {self.usize_code(args[0])}]'
+        if len(args) == 2 and name == 'full':
+            return f'vec![{self.float_operand(args[1], self.generate(args[1]))}; {self.usize_code(args[0])}]'
+        if len(args) == 1 and name == 'arange':
+            return f'(0..{self.usize_code(args[0])}).map(|i| i as f64).collect::<Vec<f64>>()'
+        if len(args) in (2, 3) and name == 'arange':
+            bounds = [self.float_operand(arg, self.generate(arg)) for arg in args] + ['1.0'] * (3 - len(args))
+            return ('{{ let (start, stop, step) = ({}, {}, {}); '
+                    'let count = ((stop - start) / step).ceil().max(0.0) as usize; '
+                    '(0..count).map(|i| start + i as f64 * step).collect::<Vec<f64>>() }}').format(*bounds)
+        if len(args) in (2, 3) and name == 'linspace':
+            start, stop = (self.float_operand(arg, self.generate(arg)) for arg in args[:2])
+            count = self.usize_code(args[2]) if len(args) == 3 else '50'
+            # Последняя точка - ровно stop, как в NumPy
+            return (f'{{ let (start, stop, count) = ({start}, {stop}, {count}); '
+                    f'let step = if count > 1 {{ (stop - start) / (count - 1) as f64 }} else {{ 0.0 }}; '
+                    f'(0..count).map(|i| if i + 1 == count && count > 1 {{ stop }} else {{ start + i as f64 * step }})'
+                    f'.collect::<Vec<f64>>() }}')
+        return None
+
+    def array_copy(self, node):
+        # np.array(xs): новый массив f64 из списка или другого массива
+        node_type = self.type_inference.infer_type(node)
+        if isinstance(node, ListNode):
+            if any(self.type_inference.infer_type(element) not in ('i32', 'f64') for element in node.elements):
+                return None
+            elements = [repr(float(element.value)) if isinstance(element, Num)
+                        else self.float_operand(element, self.generate(element)) for element in node.elements]
+            return f'vec![{", ".join(elements)}]' if elements else 'Vec::<f64>::new()'
+        if node_type == ARRAY_TYPE:
+            code = self.generate(node)
+            # Результат вызова уже собственный, копировать нужно только переменные и поля
+            return f'{code}.to_vec()' if isinstance(node, (Identifier, Attribute, Subscript)) else code
+        if node_type == 'Vec<i32>':
+            return f'{self.generate(node)}.iter().map(|&x| x as f64).collect::<Vec<f64>>()'
+        return None
+
+    def lower_array_method(self, method, node):
+        if method == 'copy':
+            return None if node.args else f'{self.generate(node.obj)}.to_vec()'
+        if not self.type_inference.uses_numpy() or any(isinstance(arg, KeywordArgument) for arg in node.args):
+            return None
+        return self.array_reduction(method, [node.obj] + node.args)
+
+    def tuple_code(self, parts):
+        # Кортеж Rust; одноэлементному нужна завершающая запятая
+        if len(parts) == 1:
+            return f'({parts[0]},)'
+        return f'({", ".join(parts)})'
+
+    def generate_KeywordArgument(self, node):
+        # В Rust нет именованных аргументов, передаём значение по позиции
+        return self.generate(node.value)
+
+    def generate_TupleNode(self, node):
+        # Строковые литералы в кортеже - String, как и в списках
+        return self.tuple_code([self.generate_element(element) for element in node.elements])
 
     def generate_GeneratorExpression(self, node):
+        chain = self.iterator_chain(node)
+        if chain is not None:
+            return chain[0]
         iterable = self.generate(node.iterable)
         target = self.generate(node.target)
         expression = self.generate(node.expression)
@@ -439,26 +3922,47 @@ class CodeGenerator:
     def generate_PrintStatement(self, node):
         expressions = node.expressions
 
+        if self.buffered_output:
+            # writeln! в общий буфер; ошибки записи (например, закрытый канал) не игнорируем
+            macro = f'writeln!({self.output_name}, '
+            suffix = '.unwrap()'
+        else:
+            macro = 'println!('
+            suffix = ''
+
         if not expressions:
-            return f'{self.indent()}println!();'
+            return f'{self.indent()}{macro.rstrip(", ")}){suffix};'
 
-        format_string = ""
+        parts = []
         args = []
-
-        if isinstance(expressions[0], String):
-            format_string += expressions[0].value
-            for expr in expressions[1:]:
-                format_string += " {:?}"
+        for index, expr in enumerate(expressions):
+            if isinstance(expr, FormattedString):
+                # f-строка форматируется прямо в вывод, без промежуточной String
+                template, field_args = self.format_arguments(expr.values)
+                parts.append(template)
+                args.extend(field_args)
+            elif index == 0 and isinstance(expr, String):
+                parts.append(expr.value)
+            else:
+                parts.append('{:?}')
                 args.append(self.generate(expr))
-        else:
-            format_string = " ".join(["{:?}"] * len(expressions))
-            args = [self.generate(expr) for expr in expressions]
+        format_string = ' '.join(parts)
+
+        if self.buffered_output and self.uses_output(Program(expressions)):
+            # Печатающая функция в аргументах сама пишет в буфер: аргументы
+            # вычисляются до writeln!, которому нужна своя ссылка на буфер
+            names = [self.fresh_name(f'arg{index}', node) for index in range(len(args))]
+            lines = [f'{self.indent()}{{']
+            lines.extend(f'{self.indent()}    let {name} = {arg};' for name, arg in zip(names, args))
+            lines.append(f'{self.indent()}    {macro}"{format_string}", {", ".join(names)}){suffix};')
+            lines.append(f'{self.indent()}}}')
+            return '\n'.join(lines)
 
         if args:
             args_string = ', '.join(args)
-            return f'{self.indent()}println!("{format_string}", {args_string});'
+            return f'{self.indent()}{macro}"{format_string}", {args_string}){suffix};'
         else:
-            return f'{self.indent()}println!("{format_string}");'
+            return f'{self.indent()}{macro}"{format_string}"){suffix};'
 
     def generate_MainBlock(self, node):
         code = ['fn main() {']
@@ -472,23 +3976,394 @@ class CodeGenerator:
         return '\n'.join(code)
 
     def generate_ListComprehension(self, node):
+        if self.is_parallel_input(node.iterable, node.target, [node.expression, node.condition]):
+            target = self.generate(node.target)
+            expression = self.generate(node.expression)
+            if isinstance(node.expression, Identifier) and node.expression.name == node.target.name \
+                    and not self.is_copy(self.type_inference.iteration_item_type(node.iterable)):
+                # Замыкание получает ссылку на элемент, в результат кладём копию
+                expression = f'{expression}.clone()'
+            value = f'Some({expression})'
+            if node.condition:
+                value = f'if {self.generate(node.condition)} {{ {value} }} else {{ None }}'
+            return self.generate_parallel_map(node.iterable, node.target, f'{target}| {value}')
+        chain = self.iterator_chain(node)
+        if chain is not None:
+            return f'{self.owned_chain(*chain)}.collect::<Vec<_>>()'
         iterable = self.generate(node.iterable)
         target = self.generate(node.target)
         expression = self.generate(node.expression)
+        # Элементы Copy-типов разыменовываем в шаблоне замыкания
+        pattern = '&' if self.type_inference.iteration_item_type(node.iterable) in COPY_TYPES else ''
         
         # Генерация метода filter, если есть условие
         if node.condition:
             condition = self.generate(node.condition)
-            filter_part = f'.filter(|&{target}| {condition})'
+            filter_part = f'.filter(|&{pattern}{target}| {condition})'
         else:
             filter_part = ''
         
         # Генерация метода map
-        map_expression = f'.map(|{target}| {expression})'
+        map_expression = f'.map(|{pattern}{target}| {expression})'
         
         # Сборка полного выражения и преобразование в Vec
         return f'{iterable}.iter(){filter_part}{map_expression}.collect::<Vec<_>>()'
 
+    def iterator_chain(self, node):
+        # Итерируемое выражение Python -> цепочка итераторов Rust без промежуточных Vec:
+        # (код, тип элемента, режим) или None, если источник не поддерживается.
+        # Режим: 'value' - элементы по значению, 'ref' - ссылки на элементы коллекции,
+        # 'refs' - кортежи (enumerate, zip), часть полей которых - ссылки
+        if isinstance(node, FunctionCall) and node.name == 'range' and 1 <= len(node.args) <= 3:
+            return f'({self.generate_range(node)})', 'i32', 'value'
+        member = self.type_inference.module_member(node) if isinstance(node, (FunctionCall, MethodCall)) else None
+        if member and member[0] == 'itertools':
+            return self.itertools_chain(member[1], node)
+        if isinstance(node, (ListComprehension, GeneratorExpression)):
+            return self.comprehension_chain(node)
+        if isinstance(node, FunctionCall) and node.name in ITERATOR_BUILTINS \
+                and node.name not in self.function_signatures and node.name not in self.class_plans:
+            return self.builtin_chain(node)
+        if isinstance(node, Identifier) and node.name in self.generator_fields:
+            return None
+        if self.is_pool_map(node):
+            # Результат pool.map - новый Vec, его элементы забираются без копий
+            return f'{self.generate(node)}.into_iter()', self.type_inference.iteration_item_type(node), 'value'
+        iterable_type = self.type_inference.infer_type(node)
+        if iterable_type in self.type_inference.soa_types:
+            return None
+        if iterable_type.startswith(('Vec<', 'HashSet<', 'VecDeque<')):
+            item_type = self.type_inference.iteration_item_type(node)
+            if 'unknown' in item_type or item_type == '_':
+                return None
+            if self.is_copy(item_type):
+                return f'{self.generate(node)}.iter().copied()', item_type, 'value'
+            return f'{self.generate(node)}.iter()', item_type, 'ref'
+        if iterable_type in ('String', '&str'):
+            return f'{self.generate(node)}.chars()', 'char', 'value'
+        if iterable_type.startswith('impl Iterator<Item = '):
+            return self.generate(node), self.type_inference.iteration_item_type(node), 'value'
+        return None
+
+    def comprehension_chain(self, node):
+        source = self.iterator_chain(node.iterable)
+        if source is None:
+            return None
+        code, item_type, mode = source
+        self.type_inference.enter_scope()
+        self.type_inference.bind_target(node.target, item_type)
+        target = self.generate(node.target)
+        if node.condition:
+            code += f'.filter(|{self.filter_pattern(target, item_type, mode)}| {self.generate(node.condition)})'
+        if not (isinstance(node.target, Identifier) and isinstance(node.expression, Identifier)
+                and node.expression.name == node.target.name):
+            item_type = self.type_inference.infer_type(node.expression)
+            code += f'.map(|{target}| {self.generate(node.expression)})'
+            mode = 'value'
+        self.type_inference.exit_scope()
+        return code, item_type, mode
+
+    def builtin_chain(self, node):
+        # Ленивые enumerate/zip/map/filter и sorted/list как источник цепочки
+        args = [arg for arg in node.args if not isinstance(arg, KeywordArgument)]
+        keywords = {arg.name: arg.value for arg in node.args if isinstance(arg, KeywordArgument)}
+        if ITERATOR_BUILTINS[node.name] == 'collect':
+            code = self.generate_builtin_call(node)
+            item_type = self.type_inference.builtin_item_type(node)
+            return (f'{code}.into_iter()', item_type, 'value') if code is not None else None
+        if node.name == 'enumerate' and len(args) in (1, 2):
+            source = self.iterator_chain(args[0])
+            start = args[1] if len(args) == 2 else keywords.get('start')
+            if source is None or set(keywords) - {'start'}:
+                return None
+            code, item_type, mode = source
+            start_code = self.generate(start) if start is not None else '0'
+            return f'({start_code}..).zip({code})', f'(i32, {item_type})', 'value' if mode == 'value' else 'refs'
+        if node.name == 'zip' and len(args) >= 2 and not keywords:
+            sources = [self.iterator_chain(arg) for arg in args]
+            if None in sources:
+                return None
+            code = sources[0][0]
+            for other in sources[1:]:
+                code += f'.zip({other[0]})'
+            if len(sources) > 2:
+                # zip(a, b, c) -> ((a, b), c): выравниваем в плоский кортеж
+                names = [f'item{index}' for index in range(len(sources))]
+                nested = names[0]
+                for name in names[1:]:
+                    nested = f'({nested}, {name})'
+                code += f'.map(|{nested}| ({", ".join(names)}))'
+            item_type = f'({", ".join(source[1] for source in sources)})'
+            mode = 'value' if all(source[2] == 'value' for source in sources) else 'refs'
+            return code, item_type, mode
+        if node.name in ('map', 'filter') and len(args) == 2 and not keywords:
+            if node.name == 'map':
+                parallel = self.generate_parallel_builtin_map(node)
+                if parallel is not None:
+                    return f'{parallel}.into_iter()', self.type_inference.builtin_item_type(node), 'value'
+            source = self.iterator_chain(args[1])
+            if source is None:
+                return None
+            code, item_type, mode = source
+            if node.name == 'filter' and isinstance(args[0], Constant) and args[0].value is None:
+                truthy = self.truthy_closure(item_type, by_ref=True)
+                return (f'{code}.filter({truthy})', item_type, mode) if truthy else None
+            closure = self.item_closure(args[0], item_type, mode)
+            if closure is None:
+                return None
+            param, body, result_type = closure
+            if node.name == 'map':
+                return f'{code}.map(|{param}| {body})', result_type, 'value'
+            return f'{code}.filter(|{self.filter_pattern(param, item_type, mode)}| {body})', item_type, mode
+        return None
+
+    def item_closure(self, function, item_type, mode):
+        # Лямбда с одним параметром или имя функции программы как замыкание
+        # над элементом: (параметр, тело, тип результата)
+        param = self.lambda_param(function)
+        if param is not None:
+            body = function.body
+        elif isinstance(function, Identifier) and function.name in self.function_signatures and mode == 'value':
+            param = Identifier('item')
+            body = FunctionCall(function.name, [param])
+        else:
+            return None
+        self.type_inference.enter_scope()
+        self.type_inference.bind_target(param, item_type)
+        result = self.generate(param), self.generate(body), self.type_inference.infer_type(body)
+        self.type_inference.exit_scope()
+        return result
+
+    def filter_pattern(self, target, item_type, mode):
+        # filter получает ссылку на элемент; Copy-элементы разыменовываем в шаблоне
+        return f'&{target}' if mode != 'value' or self.is_copy(item_type) else target
+
+    def owned_chain(self, code, item_type, mode):
+        # Цепочка, отдающая собственные значения, - для collect, min и max
+        if mode == 'ref':
+            return f'{code}.cloned()'
+        if mode == 'refs':
+            names = [f'item{index}' for index in range(len(self.type_inference.tuple_types(item_type)))]
+            return f'{code}.map(|({", ".join(names)})| ({", ".join(name + ".clone()" for name in names)}))'
+        return code
+
+    def truthy_closure(self, item_type, by_ref=False):
+        # Истинность элемента по правилам Python; by_ref - замыкание получает ссылку (filter)
+        pattern = '&item' if by_ref else 'item'
+        if item_type == 'bool':
+            return f'|{pattern}| item'
+        if item_type in ('i32', 'i64', 'usize', 'f64'):
+            return f'|{pattern}| item != {"0.0" if item_type == "f64" else "0"}'
+        if item_type == 'String' or item_type.startswith(('Vec<', 'HashMap<', 'HashSet<')):
+            return '|item| !item.is_empty()'
+        return None
+
+    def is_copy(self, type_):
+        if type_ in COPY_TYPES or self.class_plans.get(type_, {}).get('copy'):
+            return True
+        parts = self.type_inference.tuple_types(type_)
+        return bool(parts) and all(self.is_copy(part) for part in parts)
+
+    def is_stable_free(self, type_):
+        # Равные значения таких типов неотличимы, поэтому сортировка без
+        # сохранения порядка равных (sort_unstable) даёт тот же результат
+        if type_ in ('i32', 'i64', 'usize', 'bool', 'char', 'String', '&str'):
+            return True
+        parts = self.type_inference.tuple_types(type_)
+        return bool(parts) and all(self.is_stable_free(part) for part in parts)
+
+    def generate_builtin_call(self, node):
+        # sum/min/max/any/all/sorted/list/enumerate/zip/map/filter -> одна цепочка
+        # итераторов. None - вызов генерируется прежним способом
+        args = [arg for arg in node.args if not isinstance(arg, KeywordArgument)]
+        keywords = {arg.name: arg.value for arg in node.args if isinstance(arg, KeywordArgument)}
+        kind = ITERATOR_BUILTINS[node.name]
+        if kind == 'adapter':
+            chain = self.builtin_chain(node)
+            return chain[0] if chain is not None else None
+        if node.name in ('min', 'max') and len(args) > 1 and not keywords:
+            return self.generate_min_max_args(node.name, args)
+        if node.name == 'list' and not node.args:
+            return 'Vec::new()'
+        if not args:
+            return None
+        if node.name in ('any', 'all') and len(args) == 1 and not keywords:
+            return self.generate_any_all(node.name, args[0])
+        source = self.iterator_chain(args[0])
+        if source is None:
+            return None
+        code, item_type, mode = source
+        if node.name == 'sum' and len(args) <= 2 and not keywords:
+            sum_type = 'i32' if item_type == 'unknown' else item_type
+            if sum_type not in ('i32', 'i64', 'usize', 'f64'):
+                return None
+            total = f'{code}.sum::<{sum_type}>()'
+            return f'({self.generate(args[1])} + {total})' if len(args) == 2 else total
+        if node.name in ('min', 'max') and len(args) == 1 and set(keywords) <= {'key'}:
+            if 'key' in keywords:
+                return self.generate_min_max_key(node, keywords['key'], code, item_type, mode)
+            if item_type == 'f64':
+                start = 'f64::INFINITY' if node.name == 'min' else 'f64::NEG_INFINITY'
+                return f'{code}.fold({start}, f64::{node.name})'
+            result = f'{self.owned_chain(code, item_type, mode if mode == "refs" else "value")}.{node.name}().unwrap()'
+            return f'{result}.clone()' if mode == 'ref' else result
+        if node.name == 'list' and len(args) == 1:
+            return f'{self.owned_chain(code, item_type, mode)}.collect::<Vec<_>>()'
+        if node.name == 'sorted' and len(args) == 1 and set(keywords) <= {'key', 'reverse'}:
+            return self.generate_sorted(node, keywords, self.owned_chain(code, item_type, mode), item_type)
+        return None
+
+    def generate_min_max_args(self, name, args):
+        # min(a, b, c): f64 сравниваются через f64::min, остальные через std::cmp
+        types = {self.type_inference.infer_type(arg) for arg in args}
+        if types == {'f64'}:
+            function = f'f64::{name}'
+        elif 'f64' in types or 'unknown' in types:
+            return None
+        else:
+            function = f'std::cmp::{name}'
+        code = self.generate(args[0])
+        for arg in args[1:]:
+            code = f'{function}({code}, {self.generate(arg)})'
+        return code
+
+    def generate_any_all(self, name, arg):
+        if isinstance(arg, GeneratorExpression):
+            # any(x > 0 for x in xs) -> xs.iter().any(|x| x > 0) без промежуточных значений
+            source = self.iterator_chain(arg.iterable)
+            if source is None:
+                return None
+            code, item_type, mode = source
+            self.type_inference.enter_scope()
+            self.type_inference.bind_target(arg.target, item_type)
+            target = self.generate(arg.target)
+            if arg.condition:
+                code += f'.filter(|{self.filter_pattern(target, item_type, mode)}| {self.generate(arg.condition)})'
+            code += f'.{name}(|{target}| {self.generate(arg.expression)})'
+            self.type_inference.exit_scope()
+            return code
+        source = self.iterator_chain(arg)
+        if source is None:
+            return None
+        code, item_type, mode = source
+        truthy = self.truthy_closure(item_type)
+        return f'{code}.{name}({truthy})' if truthy else None
+
+    def key_closure(self, key, item_type, names):
+        # key=lambda p: ... -> замыкание над ссылкой на элемент и тип ключа;
+        # key=len или key=f - то же замыкание с вызовом функции
+        if isinstance(key, Identifier) and (key.name in KEY_BUILTINS or key.name in self.function_signatures):
+            item = 'item'
+            while item in names:
+                item += '_'
+            key = LambdaExpression([item], FunctionCall(key.name, [Identifier(item)]))
+        param = self.lambda_param(key)
+        if param is None or 'unknown' in item_type:
+            self.diagnostics.append('key=: поддерживаются лямбда-выражения, встроенные функции и функции программы '
+                                    'над элементами известного типа')
+            return None
+        self.type_inference.enter_scope()
+        self.type_inference.bind_target(param, item_type)
+        body = self.generate(key.body)
+        key_type = self.type_inference.infer_type(key.body)
+        self.type_inference.exit_scope()
+        pattern = f'&{self.generate(param)}' if self.is_copy(item_type) else self.generate(param)
+        name = 'key'
+        while name in names:
+            name += '_'
+        return f'let {name} = |{pattern}: &{item_type}| {body};', name, key_type
+
+    def generate_min_max_key(self, node, key, code, item_type, mode):
+        # Python возвращает первый из равных по ключу элементов, поэтому
+        # заменяем накопленный элемент только при строгом неравенстве
+        names = {n.name for n in walk(node) if isinstance(n, Identifier)}
+        closure = self.key_closure(key, item_type, names)
+        if closure is None:
+            return None
+        definition, name, _ = closure
+        op = '<' if node.name == 'min' else '>'
+        chain = self.owned_chain(code, item_type, mode)
+        return (f'{{ {definition} {chain}.reduce(|best, item| if {name}(&item) {op} {name}(&best) '
+                f'{{ item }} else {{ best }}).unwrap() }}')
+
+    def generate_sorted(self, node, keywords, chain, item_type):
+        reverse = keywords.get('reverse')
+        if reverse is not None and not isinstance(reverse, Constant):
+            return None
+        reverse = reverse is not None and reverse.value is True
+        names = {n.name for n in walk(node) if isinstance(n, Identifier)}
+        items = 'items'
+        while items in names:
+            items += '_'
+        element = item_type if 'unknown' not in item_type else '_'
+        lines = [f'let mut {items}: Vec<{element}> = {chain}.collect();']
+        first, second = ('b', 'a') if reverse else ('a', 'b')
+        if 'key' in keywords:
+            # Сортировка по ключу должна сохранять порядок равных, как sorted в Python
+            closure = self.key_closure(keywords['key'], item_type, names | {items})
+            if closure is None:
+                return None
+            definition, name, key_type = closure
+            lines.append(definition)
+            if 'f64' in key_type:
+                lines.append(f'{items}.sort_by(|a, b| {name}({first}).partial_cmp(&{name}({second})).unwrap());')
+            elif reverse:
+                lines.append(f'{items}.sort_by(|a, b| {name}({first}).cmp(&{name}({second})));')
+            else:
+                lines.append(f'{items}.sort_by_key({name});')
+        elif 'f64' in item_type:
+            lines.append(f'{items}.sort_by(|a, b| {first}.partial_cmp({second}).unwrap());')
+        elif self.is_stable_free(item_type):
+            lines.append(f'{items}.sort_unstable_by(|a, b| b.cmp(a));' if reverse else f'{items}.sort_unstable();')
+        else:
+            lines.append(f'{items}.sort_by(|a, b| b.cmp(a));' if reverse else f'{items}.sort();')
+        lines.append(items)
+        return f'{{ {" ".join(lines)} }}'
+
+    def generate_parallel_builtin_map(self, node):
+        # map(lambda x: ..., xs) по большому Vec в режиме параллельного отображения
+        function = node.args[0] if len(node.args) == 2 else None
+        param = self.lambda_param(function)
+        if param is None or not self.is_parallel_input(node.args[1], param, [function.body]):
+            return None
+        return self.generate_parallel_map(node.args[1], param, f'{self.generate(param)}| Some({self.generate(function.body)})')
+
+    def lambda_param(self, function):
+        # Единственный параметр лямбды как Identifier или None
+        if not isinstance(function, LambdaExpression):
+            return None
+        params = function.params if isinstance(function.params, list) else [function.params]
+        if len(params) != 1:
+            return None
+        return Identifier(params[0]) if isinstance(params[0], str) else params[0]
+
+    def is_parallel_input(self, iterable, target, expressions):
+        # Параллельно обрабатывается Vec, если тело не имеет эффектов:
+        # не печатает, не изменяет захваченные переменные и не вызывает нечистых функций
+        if not self.parallel_map or self.generator_function or not isinstance(target, Identifier):
+            return False
+        if not self.type_inference.infer_type(iterable).startswith('Vec<'):
+            return False
+        expressions = [e for e in expressions if e is not None]
+        local_names = {target.name} | {n.name for e in expressions for n in walk(e)
+                                        if isinstance(n, Identifier) and self.type_inference.infer_type(n) != 'unknown'}
+        for expression in expressions:
+            if not self.purity.is_pure_expression(expression, local_names):
+                return False
+            if any(isinstance(n, LambdaExpression) or (isinstance(n, MethodCall)
+                                                       and self.type_inference.infer_type(n.obj) in self.class_plans)
+                   for n in walk(expression)):
+                return False
+        return True
+
+    def generate_parallel_map(self, iterable, target, closure):
+        # closure - параметр и тело замыкания без открывающей черты
+        self.support_items['par_filter_map'] = PAR_FILTER_MAP_ITEM
+        self.diagnostics.append(f'{self.generate(iterable)}: параллельное отображение от {self.parallel_threshold} элементов')
+        item_type = self.type_inference.iteration_item_type(iterable)
+        pattern = '&' if item_type in COPY_TYPES else ''
+        return f'par_filter_map(&{self.generate(iterable)}, {self.parallel_threshold}, |{pattern}{closure})'
+
     def generate_LambdaExpression(self, node):
         # Для лямбда-выражений в Python параметр приходят как строки
         params = node.params if isinstance(node.params, list) else [node.params]
@@ -496,8 +4371,9 @@ class CodeGenerator:
         body = self.generate(node.body)
         return f'|{params_str}| {body}'
 
-def generate_code(ast):
+def generate_code(ast, buffered_output=False, fast_maps=False, soa_layout=False, parallel_map=False,
+                  parallel_threshold=PARALLEL_THRESHOLD):
     # Создает экземпляр генератора кода и запускает генерацию
-    generator = CodeGenerator()
+    generator = CodeGenerator(buffered_output, fast_maps, soa_layout, parallel_map, parallel_threshold)
     return generator.generate(ast)
 
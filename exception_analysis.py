@@ -0,0 +1,123 @@
+from ast_nodes import (
+    FunctionDef, FunctionCall, Identifier, RaiseStatement, TryExcept, iter_child_nodes, walk
+)
+
+from generator_lowering import is_generator
+
+# Группы исключений Python: имя -> перехватываемые типы (None - любые)
+EXCEPTION_GROUPS = {
+    'BaseException': None,
+    'Exception': None,
+    'LookupError': {'IndexError', 'KeyError'},
+    'ArithmeticError': {'OverflowError', 'ZeroDivisionError'},
+}
+
+class ExceptionAnalysis:
+    """
+    Определяет, какие типы исключений могут выйти из каждой функции.
+    Учитываются явные raise и вызовы других функций программы; исключения,
+    перехваченные в try/except той же функции, наружу не выходят.
+    """
+
+    def __init__(self):
+        self.escapes = {}  # имя функции -> типы исключений, выходящие из неё
+
+    def analyze_program(self, function_defs):
+        # Как и в анализе владения, повторяем до неподвижной точки,
+        # чтобы учесть рекурсивные и взаимные вызовы
+        for function_def in function_defs:
+            self.escapes[function_def.name] = set()
+        changed = True
+        while changed:
+            changed = False
+            for function_def in function_defs:
+                if is_generator(function_def):
+                    # Генератор выполняется лениво: вызов только создаёт итератор
+                    continue
+                escapes = self.block_escapes(function_def.body)
+                if escapes != self.escapes[function_def.name]:
+                    self.escapes[function_def.name] = escapes
+                    changed = True
+        return self.escapes
+
+    def exception_types(self, program):
+        # Конкретные типы исключений, упоминаемые в raise и except
+        names = set()
+        for node in walk(program):
+            if isinstance(node, RaiseStatement) and node.exception is not None:
+                names.add(self.exception_name(node.exception))
+            elif isinstance(node, TryExcept):
+                for handler in node.except_handlers:
+                    name = self.handler_name(handler)
+                    if name and name not in EXCEPTION_GROUPS:
+                        names.add(name)
+        return names
+
+    def block_escapes(self, statements, reraised=frozenset()):
+        escapes = set()
+        for statement in statements or []:
+            escapes |= self.node_escapes(statement, reraised)
+        return escapes
+
+    def node_escapes(self, node, reraised):
+        # reraised - типы, которые выбрасывает повторный raise в текущем обработчике
+        if isinstance(node, FunctionDef):
+            return set()
+        if isinstance(node, RaiseStatement):
+            if node.exception is None:
+                return set(reraised)
+            return {self.exception_name(node.exception)} | self.children_escapes(node.exception, reraised)
+        if isinstance(node, TryExcept):
+            remaining = self.block_escapes(node.try_body, reraised)
+            escapes = set()
+            for handler in node.except_handlers:
+                caught = self.handler_catches(handler, remaining)
+                remaining -= caught
+                escapes |= self.block_escapes(handler.body, frozenset(caught))
+            escapes |= remaining
+            escapes |= self.block_escapes(node.else_body, reraised)
+            escapes |= self.block_escapes(node.finally_body, reraised)
+            return escapes
+        escapes = self.children_escapes(node, reraised)
+        if isinstance(node, FunctionCall):
+            escapes |= self.escapes.get(node.name, set())
+        return escapes
+
+    def children_escapes(self, node, reraised):
+        escapes = set()
+        for child in iter_child_nodes(node):
+            escapes |= self.node_escapes(child, reraised)
+        return escapes
+
+    def handler_catches(self, handler, raised):
+        # Какие из возможных в try типов перехватывает обработчик
+        name = self.handler_name(handler)
+        if name is None:
+            return set(raised)
+        group = EXCEPTION_GROUPS.get(name, set())
+        if group is None:
+            return set(raised)
+        return (group | {name}) & raised
+
+    def handler_types(self, handler, variants):
+        # Варианты перечисления ошибок, с которыми сопоставляется обработчик;
+        # None - обработчик перехватывает любую ошибку
+        name = self.handler_name(handler)
+        if name is None:
+            return None
+        group = EXCEPTION_GROUPS.get(name, set())
+        if group is None:
+            return None
+        return sorted((group | {name}) & variants)
+
+    def handler_name(self, handler):
+        if handler.exc_type is None:
+            return None
+        return self.exception_name(handler.exc_type)
+
+    def exception_name(self, node):
+        if isinstance(node, FunctionCall):
+            return node.name.split('.')[-1]
+        if isinstance(node, Identifier):
+            return node.name.split('.')[-1]
+        return 'Exception'
@@ -0,0 +1,126 @@
+from ast_nodes import (
+    Identifier, String, Assignment, AugAssignment, MethodCall, FunctionCall, KeywordArgument,
+    ListNode, TupleNode, DictNode, Subscript, ReturnStatement, Yield, ForStatement, WhileStatement,
+    iter_child_nodes, walk
+)
+
+# Типы файловых объектов в сгенерированном коде
+READER_TYPE = 'BufReader<File>'
+WRITER_TYPE = 'BufWriter<File>'
+
+# Типы результатов методов файловых объектов
+FILE_METHOD_TYPES = {
+    (READER_TYPE, 'read'): 'String',
+    (READER_TYPE, 'readline'): 'String',
+    (READER_TYPE, 'readlines'): 'Vec<String>',
+    (WRITER_TYPE, 'write'): '()',
+    (WRITER_TYPE, 'writelines'): '()',
+    (WRITER_TYPE, 'flush'): '()',
+}
+
+# Методы строки, результат которых не зависит от завершающего '\n'
+NEWLINE_INSENSITIVE_METHODS = {'strip', 'rstrip'}
+
+# Встроенные функции, которые только читают аргумент
+READING_BUILTINS = {'len', 'print', 'str', 'int', 'float'}
+
+class FileAccessAnalysis:
+    """
+    Выбор способа работы с файлом, открытым через open(), по тому, как
+    тело with его использует:
+    - единственный f.read() или f.readlines() - чтение файла целиком одним
+      вызовом std::fs::read_to_string (или std::fs::read в режиме 'rb');
+    - остальное чтение - через BufReader;
+    - запись - через BufWriter, который сбрасывается в конце блока.
+
+    Для цикла по строкам файла line_strategy выбирает:
+    - 'buffer' - строка не покидает итерацию: read_line в один буфер,
+      который очищается перед каждой строкой (без выделения памяти на строку);
+    - 'lines' - строка сохраняется, но используется только так, что
+      завершающий '\n' не важен: BufReader::lines();
+    - 'read_line' - строка сохраняется вместе с '\n': read_line в новую String.
+    """
+
+    def open_mode(self, call):
+        # open(path[, mode]) -> (чтение, запись или дозапись, двоичный ли режим) или None
+        if not (isinstance(call, FunctionCall) and call.name == 'open' and call.args):
+            return None
+        args = [arg for arg in call.args if not isinstance(arg, KeywordArgument)]
+        keywords = {arg.name: arg.value for arg in call.args if isinstance(arg, KeywordArgument)}
+        mode = args[1] if len(args) > 1 else keywords.get('mode')
+        if mode is not None and not isinstance(mode, String):
+            return None
+        text = mode.value if mode is not None else 'r'
+        binary = 'b' in text
+        kind = {'r': 'read', 'w': 'write', 'a': 'append', 'x': 'create'}.get(text.replace('b', '').replace('t', ''))
+        if kind is None:
+            return None  # r+, w+ и прочие режимы чтения и записи одновременно
+        return kind, binary
+
+    def plan_with(self, node):
+        # План для with open(...) as f или None
+        mode = self.open_mode(node.context_expr)
+        if mode is None or not isinstance(node.optional_vars, Identifier):
+            return None
+        name = node.optional_vars.name
+        kind, binary = mode
+        plan = {'name': name, 'path': node.context_expr.args[0], 'kind': kind, 'binary': binary}
+        if kind != 'read':
+            plan['access'] = 'writer'
+            return plan
+        uses = [n for statement in node.body for n in walk(statement) if isinstance(n, Identifier) and n.name == name]
+        parents = self.parent_map(node.body)
+        whole = (len(uses) == 1 and isinstance(parents.get(id(uses[0])), MethodCall)
+                 and parents[id(uses[0])].obj is uses[0]
+                 and parents[id(uses[0])].method_name in ('read', 'readlines')
+                 and not parents[id(uses[0])].args
+                 and not self.inside_loop(uses[0], parents))
+        plan['access'] = 'whole' if whole else 'reader'
+        return plan
+
+    def line_strategy(self, body, name):
+        parents = self.parent_map(body)
+        uses = [n for statement in body for n in walk(statement) if isinstance(n, Identifier) and n.name == name]
+        if not any(self.escapes(use, parents) for use in uses):
+            return 'buffer'
+        if all(self.newline_insensitive(use, parents) for use in uses):
+            return 'lines'
+        return 'read_line'
+
+    def escapes(self, node, parents):
+        # Значение строки переживает итерацию: сохраняется, возвращается или передаётся
+        parent = parents.get(id(node))
+        if isinstance(parent, MethodCall):
+            if parent.obj is node:
+                return False
+            return parent.method_name in ('append', 'insert', 'add', 'extend', 'appendleft', 'setdefault')
+        if isinstance(parent, (Assignment, AugAssignment, ListNode, TupleNode, DictNode, ReturnStatement, Yield)):
+            return True
+        if isinstance(parent, Subscript):
+            return parent.index is node
+        if isinstance(parent, FunctionCall):
+            return parent.name not in READING_BUILTINS
+        return False
+
+    def newline_insensitive(self, node, parents):
+        parent = parents.get(id(node))
+        if not (isinstance(parent, MethodCall) and parent.obj is node):
+            return False
+        return parent.method_name in NEWLINE_INSENSITIVE_METHODS or (parent.method_name == 'split' and not parent.args)
+
+    def parent_map(self, statements):
+        parents = {}
+        stack = list(statements)
+        while stack:
+            node = stack.pop()
+            for child in iter_child_nodes(node):
+                parents[id(child)] = node
+                stack.append(child)
+        return parents
+
+    def inside_loop(self, node, parents):
+        while id(node) in parents:
+            node = parents[id(node)]
+            if isinstance(node, (ForStatement, WhileStatement)):
+                return True
+        return False
@@ -0,0 +1,55 @@
+from ast_nodes import (
+    Identifier, Assignment, AugAssignment, ForStatement, Yield, YieldFrom,
+    scope_nodes
+)
+
+def is_generator(function_def):
+    return any(isinstance(n, (Yield, YieldFrom)) for n in scope_nodes(function_def))
+
+class GeneratorLowering:
+    """
+    Анализ функций-генераторов перед их понижением в конечный автомат.
+    Состояние генератора хранится в структуре: параметры и локальные
+    переменные становятся её полями. Операторы, содержащие yield, и циклы,
+    переменная которых нужна после цикла, разбиваются на состояния; остальной
+    код генерируется обычным образом.
+    """
+
+    def struct_name(self, name):
+        return ''.join(part[:1].upper() + part[1:] for part in name.split('_') if part) + 'Generator'
+
+    def needs_states(self, statement, function_def):
+        for node in scope_nodes(statement):
+            if isinstance(node, (Yield, YieldFrom)):
+                return True
+            if isinstance(node, ForStatement) and self.target_escapes(node, function_def):
+                return True
+        return False
+
+    def target_escapes(self, loop, function_def):
+        # Переменная цикла используется вне его: в Python она остаётся
+        # доступной после цикла, поэтому хранится в поле
+        if not isinstance(loop.target, Identifier):
+            return False
+        name = loop.target.name
+        return self.count_name(function_def, name) != self.count_name(loop, name)
+
+    def local_names(self, function_def):
+        # Поля для локальных переменных в порядке первого присваивания
+        names = []
+        for node in scope_nodes(function_def):
+            if isinstance(node, Assignment) and isinstance(node.left, Identifier):
+                name = node.left.name
+            elif isinstance(node, AugAssignment) and isinstance(node.target, Identifier):
+                name = node.target.name
+            elif (isinstance(node, ForStatement) and isinstance(node.target, Identifier)
+                    and self.needs_states(node, function_def)):
+                name = node.target.name
+            else:
+                continue
+            if name not in names and name not in function_def.params:
+                names.append(name)
+        return names
+
+    def count_name(self, node, name):
+        return sum(1 for n in scope_nodes(node) if isinstance(n, Identifier) and n.name == name)
@@ -0,0 +1,230 @@
+# Окно транслятора на PyQt6. Модуль импортируется только при запуске окна,
+# поэтому программное использование translator не требует Qt
+import difflib
+import time
+import traceback
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPlainTextEdit,
+                             QPushButton, QCheckBox, QSpinBox)
+from PyQt6.QtGui import QFont, QTextCursor
+
+from translator import translate
+
+# Пауза после последнего изменения текста до трансляции при вводе, мс
+DEFAULT_DEBOUNCE_MS = 300
+
+# Сколько строк журнала хранит консоль отладки; старые строки отбрасываются
+MAX_CONSOLE_LINES = 10000
+
+def update_changed_lines(editor, new_text):
+    # Заменяет в документе только изменившиеся строки, одним блоком правки.
+    # setPlainText перестраивает весь QTextDocument и сбрасывает прокрутку,
+    # а при повторной трансляции обычно меняется лишь несколько строк
+    old_text = editor.toPlainText()
+    if not old_text:
+        editor.setPlainText(new_text)
+        return
+    old_lines = old_text.split('\n')
+    new_lines = new_text.split('\n')
+    changes = [opcode for opcode in difflib.SequenceMatcher(None, old_lines, new_lines).get_opcodes()
+               if opcode[0] != 'equal']
+    if not changes:
+        return
+    document = editor.document()
+    scroll_bar = editor.verticalScrollBar()
+    scroll_position = scroll_bar.value()
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+    # С конца документа: правка не сдвигает строки, которые ещё предстоит править.
+    # Позиции берутся из блоков документа: Qt считает их в UTF-16, а не в символах Python
+    for _, old_start, old_end, new_start, new_end in reversed(changes):
+        lines = new_lines[new_start:new_end]
+        document_end = document.characterCount() - 1
+        start = document.findBlockByNumber(old_start).position() if old_start < len(old_lines) else document_end
+        if old_end < len(old_lines):
+            end = document.findBlockByNumber(old_end).position()
+            text = ''.join(line + '\n' for line in lines)
+        else:
+            # Правка до конца документа: после последней строки нет '\n'
+            end = document_end
+            text = '\n'.join(lines)
+            if lines and old_start == len(old_lines):
+                text = '\n' + text
+            elif not lines and old_start > 0:
+                start -= 1
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(text)
+    cursor.endEditBlock()
+    scroll_bar.setValue(scroll_position)
+
+class TranslationSignals(QObject):
+    # QRunnable не QObject, поэтому сигналы задания - в отдельном объекте; время - в секундах
+    finished = pyqtSignal(int, str, list, float)  # номер, код Rust, замечания, время
+    failed = pyqtSignal(int, str, float)  # номер, сообщение об ошибке, время
+    skipped = pyqtSignal(int)  # номер отменённого задания, которое пул всё же запустил
+
+class TranslationJob(QRunnable):
+    """
+    Трансляция в потоке пула, чтобы окно не замирало на больших входах.
+    Результат возвращается сигналами, которые Qt доставляет в поток окна.
+    Отменённое задание, ещё не начатое пулом, ничего не делает; уже идущую
+    трансляцию прервать нельзя, её результат окно просто отбрасывает.
+    """
+
+    def __init__(self, job_id, python_code):
+        super().__init__()
+        self.job_id = job_id
+        self.python_code = python_code
+        self.cancelled = False
+        self.signals = TranslationSignals()
+        # Заданием владеет окно, а не пул: иначе пул удалял бы его после run,
+        # и tryTake для уже удалённого задания обращался бы к освобождённой памяти
+        self.setAutoDelete(False)
+
+    def run(self):
+        if self.cancelled:
+            self.signals.skipped.emit(self.job_id)
+            return
+        start = time.perf_counter()
+        try:
+            rust_code, diagnostics = translate(self.python_code)
+        except Exception as e:
+            error_message = f"Ошибка при трансляции: {str(e)}\n"
+            error_message += f"Тип ошибки: {type(e).__name__}\n"
+            error_message += f"Трассировка стека:\n{traceback.format_exc()}"
+            self.signals.failed.emit(self.job_id, error_message, time.perf_counter() - start)
+            return
+        self.signals.finished.emit(self.job_id, rust_code, diagnostics, time.perf_counter() - start)
+
+class TranslatorWindow(QMainWindow):
+    def __init__(self, debounce_ms=DEFAULT_DEBOUNCE_MS):
+        super().__init__()
+        self.setWindowTitle("Python to Rust Translator")
+        self.setGeometry(100, 100, 1200, 800)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        layout = QVBoxLayout()
+        central_widget.setLayout(layout)
+
+        editor_layout = QHBoxLayout()
+        layout.addLayout(editor_layout)
+
+        self.python_editor = QTextEdit()
+        self.python_editor.setFont(QFont("Courier", 12))
+        self.python_editor.setPlaceholderText("Enter Python code here")
+        editor_layout.addWidget(self.python_editor)
+
+        self.rust_editor = QTextEdit()
+        self.rust_editor.setFont(QFont("Courier", 12))
+        self.rust_editor.setPlaceholderText("Translated Rust code will appear here")
+        self.rust_editor.setReadOnly(True)
+        editor_layout.addWidget(self.rust_editor)
+
+        controls_layout = QHBoxLayout()
+        layout.addLayout(controls_layout)
+
+        translate_button = QPushButton("Translate")
+        translate_button.clicked.connect(self.translate_code)
+        controls_layout.addWidget(translate_button)
+
+        # Трансляция при вводе: после паузы в debounce_ms, а не на каждый символ
+        self.live_checkbox = QCheckBox("Translate as you type")
+        self.live_checkbox.toggled.connect(self.schedule_translation)
+        controls_layout.addWidget(self.live_checkbox)
+
+        self.debounce_spinbox = QSpinBox()
+        self.debounce_spinbox.setRange(0, 5000)
+        self.debounce_spinbox.setSingleStep(50)
+        self.debounce_spinbox.setSuffix(" ms")
+        self.debounce_spinbox.setValue(debounce_ms)
+        self.debounce_spinbox.valueChanged.connect(self.set_debounce)
+        controls_layout.addWidget(self.debounce_spinbox)
+        controls_layout.addStretch()
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(debounce_ms)
+        self.debounce_timer.timeout.connect(self.translate_code)
+        self.python_editor.textChanged.connect(self.schedule_translation)
+
+        # Один поток: новое задание ждёт текущее, а устаревшие снимаются с очереди
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.job_id = 0
+        self.pending_job = None
+        # Задания, которые пул ещё может выполнить: номер -> задание. Ссылка
+        # держится до результата, иначе Python удалил бы задание во время run
+        self.jobs = {}
+
+        # Журнал дописывается в конец, а не заменяется целиком
+        self.debug_console = QPlainTextEdit()
+        self.debug_console.setMaximumBlockCount(MAX_CONSOLE_LINES)
+        self.debug_console.setFont(QFont("Courier", 10))
+        self.debug_console.setPlaceholderText("Debug information will appear here")
+        self.debug_console.setReadOnly(True)
+        layout.addWidget(self.debug_console)
+
+    def set_debounce(self, debounce_ms):
+        self.debounce_timer.setInterval(debounce_ms)
+
+    def schedule_translation(self):
+        # Каждое изменение текста откладывает трансляцию на debounce_ms
+        if self.live_checkbox.isChecked():
+            self.debounce_timer.start()
+
+    def translate_code(self):
+        self.debounce_timer.stop()
+        self.cancel_pending_job()
+        self.job_id += 1
+        job = TranslationJob(self.job_id, self.python_editor.toPlainText())
+        job.signals.finished.connect(self.show_translation)
+        job.signals.failed.connect(self.show_error)
+        job.signals.skipped.connect(self.forget_job)
+        self.pending_job = job
+        self.jobs[job.job_id] = job
+        self.pool.start(job)
+
+    def cancel_pending_job(self):
+        # Задание, которое пул ещё не начал, снимается с очереди
+        if self.pending_job is not None:
+            self.pending_job.cancelled = True
+            if self.pool.tryTake(self.pending_job):
+                self.forget_job(self.pending_job.job_id)
+            self.pending_job = None
+
+    def forget_job(self, job_id):
+        self.jobs.pop(job_id, None)
+
+    def show_translation(self, job_id, rust_code, diagnostics, elapsed):
+        self.forget_job(job_id)
+        if job_id != self.job_id:
+            return  # результат устаревшего задания
+        self.pending_job = None
+        update_changed_lines(self.rust_editor, rust_code)
+        message = f"Трансляция успешно завершена за {elapsed * 1000:.1f} мс!"
+        if diagnostics:
+            message += "\n" + "\n".join(diagnostics)
+        self.debug_console.appendPlainText(message)
+
+    def show_error(self, job_id, error_message, elapsed):
+        self.forget_job(job_id)
+        if job_id != self.job_id:
+            return
+        self.pending_job = None
+        self.debug_console.appendPlainText(f"{error_message}Время: {elapsed * 1000:.1f} мс")
+
+    def closeEvent(self, event):
+        # Сигналы заданий не должны приходить в закрытое окно
+        self.debounce_timer.stop()
+        self.cancel_pending_job()
+        self.pool.waitForDone()
+        super().closeEvent(event)
+
+def run_gui(argv):
+    app = QApplication(argv)
+    window = TranslatorWindow()
+    window.show()
+    return app.exec()
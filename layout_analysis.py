@@ -0,0 +1,166 @@
+from ast_nodes import (
+    ClassDef, FunctionDef, Identifier, Assignment, AugAssignment, Attribute, FunctionCall,
+    MethodCall, ForStatement, ListNode, ListComprehension, Subscript, iter_child_nodes, scope_nodes, walk
+)
+
+# Типы полей, которые можно хранить в отдельных Vec
+PRIMITIVE_FIELD_TYPES = ('i32', 'i64', 'f64', 'bool')
+
+class LayoutAnalysis:
+    """
+    Раскладка "структура массивов" (SoA) для списков простых записей.
+
+    Класс-запись: только __init__, который присваивает поля self.f = ...,
+    все поля примитивных типов, и поля нигде не изменяются после создания.
+    Список таких записей хранится по полям (по Vec на поле), если в своей
+    области видимости он только создаётся, пополняется через append(C(...)),
+    обходится циклом for, который читает поля элемента, передаётся в len()
+    и читается как xs[i].f.
+    """
+
+    def record_classes(self, program, class_fields):
+        records = {}
+        # Атрибуты, которые записываются где-либо кроме __init__
+        stored = set()
+        for root in [program] + [n for n in walk(program) if isinstance(n, FunctionDef) and n.name != '__init__']:
+            for n in scope_nodes(root):
+                if isinstance(n, Assignment) and isinstance(n.left, Attribute):
+                    stored.add(n.left.attr_name)
+                elif isinstance(n, AugAssignment) and isinstance(n.target, Attribute):
+                    stored.add(n.target.attr_name)
+        for node in program.statements:
+            if not isinstance(node, ClassDef) or node.name not in class_fields:
+                continue
+            methods = [s for s in node.body if isinstance(s, FunctionDef)]
+            if [m.name for m in methods] != ['__init__'] or len(methods) != len(node.body):
+                continue
+            fields = class_fields[node.name]
+            if not fields or any(t not in PRIMITIVE_FIELD_TYPES for t in fields.values()):
+                continue
+            # Поля записываются только в __init__
+            if any(field in stored for field in fields):
+                continue
+            records[node.name] = list(fields)
+        return records
+
+    def find_soa_lists(self, program, records):
+        # Возвращает (id(присваивания) -> класс, id(for) -> (класс, читаемые поля))
+        declarations = {}
+        loops = {}
+        if not records:
+            return declarations, loops
+        for root in [program] + [n for n in walk(program) if isinstance(n, FunctionDef)]:
+            self.analyze_scope(root, records, declarations, loops)
+        return declarations, loops
+
+    def analyze_scope(self, root, records, declarations, loops):
+        parents = {}
+        nodes = list(scope_nodes(root))
+        for node in nodes:
+            for child in iter_child_nodes(node):
+                parents[id(child)] = node
+
+        assignments = {}
+        for node in nodes:
+            if isinstance(node, Assignment) and isinstance(node.left, Identifier):
+                assignments.setdefault(node.left.name, []).append(node)
+
+        for name, nodes_for_name in assignments.items():
+            if isinstance(root, FunctionDef) and name in root.params:
+                continue
+            classes = {self.created_class(n.right, records) for n in nodes_for_name}
+            if None in classes:
+                continue
+            classes.discard('')
+            appended = set()
+            scope_loops = {}
+            uses_ok = True
+            for node in walk(root):
+                if not (isinstance(node, Identifier) and node.name == name):
+                    continue
+                parent = parents.get(id(node))
+                if parent is None:
+                    # Упоминание во вложенной функции
+                    uses_ok = False
+                    break
+                if isinstance(parent, Assignment) and parent.left is node:
+                    continue
+                if isinstance(parent, MethodCall) and parent.obj is node and parent.method_name == 'append':
+                    appended.add(self.created_class(parent.args[0], records) if len(parent.args) == 1 else None)
+                    continue
+                if (isinstance(parent, FunctionCall) and parent.name == 'len'
+                        and len(parent.args) == 1 and parent.args[0] is node):
+                    continue
+                if isinstance(parent, Subscript) and parent.obj is node:
+                    attribute = parents.get(id(parent))
+                    if isinstance(attribute, Attribute) and attribute.obj is parent and not self.is_store(attribute, parents):
+                        continue
+                if isinstance(parent, ForStatement) and parent.iterable is node:
+                    fields = self.loop_fields(parent, root)
+                    if fields is not None:
+                        scope_loops[id(parent)] = fields
+                        continue
+                uses_ok = False
+                break
+            classes |= appended
+            classes.discard('')
+            if not uses_ok or len(classes) != 1 or None in classes:
+                continue
+            class_name = classes.pop()
+            for assignment in nodes_for_name:
+                declarations[id(assignment)] = class_name
+            for loop_id, fields in scope_loops.items():
+                if any(field not in records[class_name] for field in fields):
+                    break
+                loops[loop_id] = (class_name, fields)
+            else:
+                continue
+            # Цикл читает несуществующее поле - оставляем обычную раскладку
+            for assignment in nodes_for_name:
+                del declarations[id(assignment)]
+
+    def created_class(self, node, records):
+        # Класс записей, которые создаёт выражение; '' - пустой список, None - не подходит
+        if isinstance(node, ListComprehension):
+            return self.created_class(node.expression, records) if node.expression else None
+        if isinstance(node, ListNode):
+            if not node.elements:
+                return ''
+            classes = {self.created_class(e, records) for e in node.elements if not isinstance(e, ListNode)}
+            if len(classes) == 1 and len(node.elements) == sum(isinstance(e, FunctionCall) for e in node.elements):
+                return classes.pop()
+            return None
+        if isinstance(node, FunctionCall) and node.name in records:
+            return node.name
+        return None
+
+    def loop_fields(self, loop, root):
+        # Поля элемента, которые читает тело цикла; None, если элемент
+        # используется иначе (передаётся, переприсваивается или нужен после цикла)
+        if not isinstance(loop.target, Identifier):
+            return None
+        target = loop.target.name
+        fields = []
+        occurrences = 0
+        for statement in loop.body:
+            for node in walk(statement):
+                if isinstance(node, Attribute) and isinstance(node.obj, Identifier) and node.obj.name == target:
+                    if node.attr_name not in fields:
+                        fields.append(node.attr_name)
+                    occurrences += 1
+        # Все упоминания переменной цикла, кроме самой цели, - чтения полей
+        if sum(1 for n in walk(loop) if isinstance(n, Identifier) and n.name == target) != occurrences + 1:
+            return None
+        # После цикла переменная не читается (в Python она хранит последний элемент)
+        inside = {id(n) for other in walk(root)
+                  if isinstance(other, ForStatement) and isinstance(other.target, Identifier)
+                  and other.target.name == target
+                  for n in walk(other)}
+        if any(isinstance(n, Identifier) and n.name == target and id(n) not in inside for n in walk(root)):
+            return None
+        return fields
+
+    def is_store(self, node, parents):
+        parent = parents.get(id(node))
+        return ((isinstance(parent, Assignment) and parent.left is node)
+                or (isinstance(parent, AugAssignment) and parent.target is node))
@@ -24,6 +24,7 @@ class Lexer:
             '!=': 'NOT_EQUALS',
             '<=': 'LESS_THAN_OR_EQUAL_TO',
             '>=': 'GREATER_THAN_OR_EQUAL_TO',
+            '->': 'ARROW',
             '=': 'EQUALS',
             '<': 'LESS_THAN',
             '>': 'GREATER_THAN',
@@ -201,10 +202,14 @@ class Lexer:
         keywords = [
             'def', 'if', 'else', 'return', 'for', 'while', 'print', 'input',
             'True', 'False', 'None', 'and', 'or', 'not', 'in', 'import',
-            'class', 'try', 'except', 'finally', 'async', 'await', 'lambda'
+            'class', 'try', 'except', 'finally', 'async', 'await', 'lambda',
+            'from', 'as', 'raise', 'yield', 'with'
         ]
         if result in keywords:
             token_type = result.upper()
+        elif result in ('f', 'F') and self.current_char in ('"', "'"):
+            # f-строка: подстановки разбирает парсер
+            return Token('FORMATTED_STRING', self.string().value, self.line, column)
         
         return Token(token_type, result, self.line, column)
 
@@ -348,6 +353,11 @@ class Lexer:
                 self.advance()
                 continue
             
+            if self.current_char in ['+', '-', '*', '/', '%', '&', '|', '^', '<', '>']:
+                # Составные операторы: +=, -=, //, ** и т.д.
+                tokens.append(self.compound_token())
+                continue
+            
             if self.current_char in self.single_char_tokens:
                 tokens.append(Token(self.single_char_tokens[self.current_char], self.current_char, self.line, self.column))
                 self.advance()
@@ -0,0 +1,337 @@
+from ast_nodes import (
+    FunctionDef, ClassDef, Identifier, Assignment, AugAssignment, Attribute, Subscript,
+    FunctionCall, MethodCall, ForStatement, WhileStatement, IfStatement, BinaryOp,
+    ExceptHandler, TupleNode, iter_child_nodes
+)
+
+from ownership_analysis import MUTATING_METHODS, mutates_loop_target
+from standard_library_mapping import STANDARD_LIBRARY_MAPPING
+
+# Атрибуты узлов, содержащие списки операторов
+BLOCK_FIELDS = ('statements', 'body', 'true_body', 'false_body', 'try_body', 'else_body', 'finally_body')
+
+# Методы коллекций, которые только читают объект и не оставляют ссылок на него
+READ_ONLY_METHODS = {'get', 'count', 'index'}
+
+class LivenessAnalysis:
+    """
+    Анализ определений и использований переменных внутри одной функции
+    (или верхнего уровня программы, который становится fn main):
+    - где объявлять переменную (let или let mut) и какие присваивания -
+      обычные переприсваивания;
+    - объявления, которые нужно поднять из вложенного блока, потому что
+      переменная используется вне его (в Rust блок ограничивает область видимости);
+    - последние использования, на которых значение можно переместить без копии;
+    - места для drop больших коллекций, которые после последнего использования
+      ещё долго остаются в области видимости.
+
+    call_mode(call, index) сообщает, как пользовательская функция или метод
+    принимает аргумент (owned, ref или mut), method_mutates(call) - изменяет
+    ли вызов метода пользовательского класса объект.
+    """
+
+    def __init__(self, call_mode, method_mutates):
+        self.call_mode = call_mode
+        self.method_mutates = method_mutates
+
+    def analyze_scope(self, statements, params=(), excluded=()):
+        # params - параметры, принимаемые во владение; excluded - имена,
+        # которые генерируются по-старому (заимствованные параметры, self)
+        self.parents = {}
+        self.block_of = {}  # id(оператор) -> (блок, индекс, владелец блока)
+        self.statement_of = {}  # id(узел) -> оператор, которому он принадлежит
+        self.occurrences = []  # упоминания имён в порядке вычисления
+        self.visit_block(statements, None)
+
+        plan = {
+            'bindings': {},  # id(присваивания) -> let / let mut / assign
+            'hoisted': {},  # id(оператора) -> [(имя, mut, инициализация по умолчанию)]
+            'mutable_params': set(),
+            'tracked_uses': set(),  # id(чтений) анализируемых переменных
+            'last_uses': set(),  # id(чтений), после которых значение больше не нужно
+            'drops': {},  # id(оператора) -> имена, освобождаемые после него
+            # id(чтений) в b = a, после которых a или b изменяются на месте: в Python
+            # это один объект, и копия при присваивании дала бы другой результат
+            'shared_aliases': set(),
+        }
+        by_name = {}
+        for node in self.occurrences:
+            by_name.setdefault(node.name, []).append(node)
+        loop_targets = {n.target.name for n in self.parents.values()
+                        if isinstance(n, ForStatement) and isinstance(n.target, Identifier)}
+        handler_names = {n.exc_name for n in self.parents.values() if isinstance(n, ExceptHandler)}
+
+        positions = {id(node): index for index, node in enumerate(self.occurrences)}
+        for node in self.occurrences:
+            parent = self.parents.get(id(node))
+            if isinstance(parent, Assignment) and parent.right is node and isinstance(parent.left, Identifier):
+                later = [n for n in by_name[node.name] + by_name.get(parent.left.name, [])
+                         if positions[id(n)] > positions[id(node)]]
+                if any(self.is_mutation(n) for n in later):
+                    plan['shared_aliases'].add(id(node))
+
+        for name, nodes in by_name.items():
+            stores = [n for n in nodes if self.is_store(n)]
+            if name in loop_targets or name in handler_names or name in excluded:
+                # Переменная цикла Rust неизменяема и видна только в цикле
+                continue
+            if name in params:
+                self.plan_param(name, nodes, stores, plan)
+            elif stores:
+                self.plan_local(name, nodes, stores, statements, plan)
+        return plan
+
+    # --- обход ---
+
+    def visit_block(self, block, owner):
+        for index, statement in enumerate(block):
+            self.block_of[id(statement)] = (block, index, owner)
+            if isinstance(statement, (FunctionDef, ClassDef)):
+                continue
+            self.visit_node(statement, statement)
+
+    def visit_node(self, node, statement):
+        # Обход в порядке вычисления: значение присваивания раньше цели
+        self.statement_of[id(node)] = statement
+        if isinstance(node, Identifier):
+            self.occurrences.append(node)
+            return
+        if isinstance(node, Assignment):
+            children = [node.right, node.left]
+        elif isinstance(node, AugAssignment):
+            children = [node.value, node.target]
+        elif isinstance(node, ForStatement):
+            children = [node.iterable, node.target] + node.body
+        else:
+            children = list(iter_child_nodes(node))
+        blocks = [getattr(node, field) for field in BLOCK_FIELDS if isinstance(getattr(node, field, None), list)]
+        block_items = {id(item) for block in blocks for item in block}
+        for child in children:
+            if isinstance(child, (FunctionDef, ClassDef)):
+                continue
+            self.parents[id(child)] = node
+            if id(child) in block_items:
+                continue
+            self.visit_node(child, statement)
+        for block in blocks:
+            self.visit_block(block, node)
+            for item in block:
+                self.parents[id(item)] = node
+
+    # --- переменные ---
+
+    def plan_param(self, name, nodes, stores, plan):
+        for store in stores:
+            if self.is_assignment_store(store):
+                plan['bindings'][self.binding_key(store)] = 'assign'
+        if stores or any(self.is_mutation(n) for n in nodes):
+            plan['mutable_params'].add(name)
+        # Параметр объявлен на уровне тела функции
+        self.plan_last_uses(nodes, None, plan)
+
+    def plan_local(self, name, nodes, stores, statements, plan):
+        assignments = [self.binding_key(n) for n in stores if self.is_assignment_store(n)]
+        chains = [self.chain(self.statement_of[id(n)]) for n in nodes]
+        # Самый глубокий блок, содержащий все упоминания
+        depth = 0
+        while all(len(chain) > depth for chain in chains) and len({id(chain[depth][0]) for chain in chains}) == 1:
+            depth += 1
+        block = chains[0][depth - 1][0]
+        first_chain = chains[0]
+        first_statement = first_chain[depth - 1][1]
+        mutable = len(stores) > 1 or any(self.is_mutation(n) for n in nodes)
+        first_is_store = self.is_store(nodes[0]) and self.is_assignment_store(nodes[0])
+
+        if first_is_store and len(first_chain) == depth:
+            # Первое присваивание находится прямо в общем блоке - объявление на месте
+            for assignment in assignments:
+                plan['bindings'][assignment] = 'assign'
+            plan['bindings'][self.binding_key(nodes[0])] = 'let mut' if mutable else 'let'
+            self.plan_last_uses(nodes, block, plan)
+            self.plan_drop(name, nodes, block, plan)
+            return
+
+        for assignment in assignments:
+            plan['bindings'][assignment] = 'assign'
+        if first_is_store and self.definitely_assigns(first_statement, name):
+            # Объявление без значения перед блоком, который точно присваивает
+            in_loop = any(isinstance(owner, (ForStatement, WhileStatement))
+                          for _, _, owner in first_chain[depth:])
+            # let x; допускает по одному присваиванию на каждом пути
+            assigned_once = (len(stores) == self.count_stores(first_statement, name)
+                             and self.assigns_once(first_statement, name))
+            mutable = not assigned_once or in_loop or any(self.is_mutation(n) for n in nodes)
+            plan['hoisted'].setdefault(id(first_statement), []).append((name, mutable, False))
+            self.plan_last_uses(nodes, block, plan)
+            return
+        # Значение читается до присваивания (например, с прошлой итерации цикла)
+        # или присваивается не на всех путях: объявляем со значением по умолчанию
+        # перед самым внешним циклом, в котором оно используется
+        anchor = first_statement
+        for ancestor_block, statement, owner in first_chain[:depth]:
+            if isinstance(statement, (ForStatement, WhileStatement)):
+                anchor, block = statement, ancestor_block
+                break
+        plan['hoisted'].setdefault(id(anchor), []).append((name, True, True))
+        self.plan_last_uses(nodes, block, plan)
+
+    def plan_last_uses(self, nodes, block, plan):
+        # Последнее чтение, если после него переменная не упоминается и оно
+        # не повторяется в цикле, вложенном в блок объявления
+        loads = [n for n in nodes if not self.is_store(n) or self.is_aug_target(n)]
+        plan['tracked_uses'].update(id(n) for n in loads)
+        if not loads or nodes[-1] is not loads[-1]:
+            return
+        last = loads[-1]
+        for statement_block, statement, owner in reversed(self.chain(self.statement_of[id(last)])):
+            if statement_block is block:
+                # Тело цикла повторяется; однократно вычисляется только итерируемое выражение for
+                if isinstance(statement, WhileStatement):
+                    return
+                if isinstance(statement, ForStatement) and statement is not self.statement_of[id(last)]:
+                    return
+                break
+            if isinstance(statement, (ForStatement, WhileStatement)) and statement is not self.statement_of[id(last)]:
+                return
+            if isinstance(statement, WhileStatement):
+                return
+        plan['last_uses'].add(id(last))
+
+    def plan_drop(self, name, nodes, block, plan):
+        # drop после оператора с последним использованием, если дальше в блоке
+        # ещё есть циклы или вызовы, а само использование только заимствует значение
+        last = nodes[-1]
+        chain = self.chain(self.statement_of[id(last)])
+        top = next((statement for statement_block, statement, _ in chain if statement_block is block), None)
+        if top is None or self.is_store(last):
+            return
+        index = next(i for i, statement in enumerate(block) if statement is top)
+        rest = block[index + 1:]
+        if not any(self.is_heavy(statement) for statement in rest):
+            return
+        top_nodes = [n for n in nodes if self.contains(top, n)]
+        if all(self.is_borrow(n) for n in top_nodes):
+            plan['drops'].setdefault(id(top), []).append(name)
+
+    # --- вспомогательные функции ---
+
+    def chain(self, statement):
+        # Путь от корня: [(блок, оператор этого блока на пути, владелец блока)]
+        chain = []
+        while id(statement) in self.block_of:
+            block, _, owner = self.block_of[id(statement)]
+            chain.append((block, statement, owner))
+            if owner is None:
+                break
+            statement = owner if id(owner) in self.block_of else self.parents.get(id(owner))
+            if statement is None:
+                break
+        chain.reverse()
+        return chain
+
+    def contains(self, statement, node):
+        parent = node
+        while parent is not None:
+            if parent is statement:
+                return True
+            parent = self.parents.get(id(parent))
+        return False
+
+    def is_store(self, node):
+        parent = self.parents.get(id(node))
+        return ((isinstance(parent, Assignment) and parent.left is node)
+                or (isinstance(parent, AugAssignment) and parent.target is node)
+                or self.is_tuple_store(node))
+
+    def is_tuple_store(self, node):
+        # Элемент цели распаковки: a, b = ...
+        parent = self.parents.get(id(node))
+        assignment = self.parents.get(id(parent))
+        return isinstance(parent, TupleNode) and isinstance(assignment, Assignment) and assignment.left is parent
+
+    def is_assignment_store(self, node):
+        return isinstance(self.parents[id(node)], Assignment) or self.is_tuple_store(node)
+
+    def binding_key(self, store):
+        # Способ объявления хранится для присваивания, а при распаковке - для каждого элемента цели
+        return id(store) if self.is_tuple_store(store) else id(self.parents[id(store)])
+
+    def is_aug_target(self, node):
+        parent = self.parents.get(id(node))
+        return isinstance(parent, AugAssignment) and parent.target is node
+
+    def is_mutation(self, node):
+        parent = self.parents.get(id(node))
+        if self.is_aug_target(node):
+            return True
+        # Запись в элемент или поле: xs[i] = v, p.x += 1
+        child = node
+        while isinstance(parent, (Subscript, Attribute)) and parent.obj is child:
+            child, parent = parent, self.parents.get(id(parent))
+        if child is not node and ((isinstance(parent, Assignment) and parent.left is child)
+                                  or (isinstance(parent, AugAssignment) and parent.target is child)):
+            return True
+        if child is not node and isinstance(parent, MethodCall) and parent.obj is child:
+            return parent.method_name in MUTATING_METHODS
+        if isinstance(parent, MethodCall) and parent.obj is node:
+            return parent.method_name in MUTATING_METHODS or self.method_mutates(parent)
+        if isinstance(parent, FunctionCall) and parent.name == 'next':
+            return True
+        if isinstance(parent, ForStatement) and parent.iterable is node:
+            return mutates_loop_target(parent)
+        if isinstance(parent, (FunctionCall, MethodCall)) and node in parent.args:
+            return self.call_mode(parent, parent.args.index(node)) == 'mut'
+        return False
+
+    def is_borrow(self, node):
+        # Упоминание, не забирающее значение
+        parent = self.parents.get(id(node))
+        if isinstance(parent, Subscript) and parent.obj is node:
+            return True
+        if isinstance(parent, MethodCall) and parent.obj is node:
+            return parent.method_name in READ_ONLY_METHODS
+        if isinstance(parent, FunctionCall) and node in parent.args:
+            if parent.name == 'len':
+                return True
+            return self.call_mode(parent, parent.args.index(node)) in ('ref', 'mut')
+        if isinstance(parent, BinaryOp) and parent.op in ('in', 'not in') and parent.right is node:
+            return True
+        return False
+
+    def is_heavy(self, statement):
+        # Оператор, выполнение которого может занять заметное время
+        stack = [statement]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (ForStatement, WhileStatement)):
+                return True
+            if isinstance(node, FunctionCall) and node.name not in STANDARD_LIBRARY_MAPPING:
+                return True
+            stack.extend(child for child in iter_child_nodes(node) if not isinstance(child, (FunctionDef, ClassDef)))
+        return False
+
+    def count_stores(self, statement, name):
+        return sum(1 for n in self.occurrences
+                   if n.name == name and self.is_store(n) and self.contains(statement, n))
+
+    def assigns_once(self, statement, name):
+        # Каждая ветвь присваивает переменной ровно один раз и больше её не изменяет
+        if isinstance(statement, Assignment):
+            return True
+        if isinstance(statement, IfStatement) and statement.false_body:
+            for body in (statement.true_body, statement.false_body):
+                assigning = [s for s in body if self.count_stores(s, name)]
+                if len(assigning) != 1 or self.count_stores(assigning[0], name) != 1 \
+                        or not self.definitely_assigns(assigning[0], name):
+                    return False
+            return True
+        return False
+
+    def definitely_assigns(self, statement, name):
+        if isinstance(statement, Assignment):
+            targets = statement.left.elements if isinstance(statement.left, TupleNode) else [statement.left]
+            return any(isinstance(target, Identifier) and target.name == name for target in targets)
+        if isinstance(statement, IfStatement) and statement.false_body:
+            return (any(self.definitely_assigns(s, name) for s in statement.true_body)
+                    and any(self.definitely_assigns(s, name) for s in statement.false_body))
+        return False
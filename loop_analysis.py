@@ -0,0 +1,127 @@
+from ast_nodes import (
+    ASTNode, Identifier, Assignment, AugAssignment, MethodCall, FunctionCall,
+    ForStatement, ListNode, DictNode, Subscript, String, Num, walk
+)
+
+class LoopAnalysis:
+    """
+    Находит накопители (списки, строки, словари и множества), которые заполняются в циклах
+    с заранее известным числом итераций, чтобы выделить память один раз.
+
+    Число итераций описывается множителями:
+        ('range', start, end, step) - цикл по range(...)
+        ('len', expr)               - цикл по коллекции, длина которой известна
+        ('const', n)                - константа
+        ('bytes', expr)             - длина добавляемого к строке фрагмента
+    Ёмкость - сумма слагаемых, каждое слагаемое - произведение множителей.
+    """
+
+    def find_preallocations(self, program):
+        # id(узел присваивания) -> (вид накопителя, список слагаемых)
+        result = {}
+        for node in walk(program):
+            for value in vars(node).values():
+                if isinstance(value, list) and value and all(isinstance(s, ASTNode) for s in value):
+                    self.analyze_block(value, result)
+        return result
+
+    def analyze_block(self, statements, result):
+        for index, statement in enumerate(statements):
+            kind = self.accumulator_kind(statement)
+            if kind is None:
+                continue
+            name = statement.left.name
+            assigned_between = set()
+            for later in statements[index + 1:]:
+                if not self.mentions(later, name):
+                    assigned_between |= self.assigned_names(later)
+                    continue
+                # Первое использование накопителя должно быть циклом, который его заполняет
+                if isinstance(later, ForStatement) and not self.mentions(later.iterable, name):
+                    terms = self.loop_fill_terms(later, name, kind, set())
+                    # Длина цикла вычисляется в точке объявления накопителя,
+                    # поэтому входящие в неё имена не должны меняться по пути
+                    if terms and not any(self.factor_names(f) & assigned_between for t in terms for f in t):
+                        result[id(statement)] = (kind, terms)
+                break
+
+    def accumulator_kind(self, statement):
+        if not isinstance(statement, Assignment) or not isinstance(statement.left, Identifier):
+            return None
+        if isinstance(statement.right, ListNode) and not statement.right.elements:
+            return 'list'
+        if isinstance(statement.right, String) and statement.right.value == '':
+            return 'string'
+        if isinstance(statement.right, DictNode) and not statement.right.pairs:
+            return 'dict'
+        if (isinstance(statement.right, FunctionCall) and statement.right.name in ('dict', 'set')
+                and not statement.right.args):
+            return statement.right.name
+        return None
+
+    def loop_fill_terms(self, loop, name, kind, bound_names):
+        # Слагаемые ёмкости для одного полного выполнения цикла
+        trip = self.trip_count(loop)
+        if trip is None or self.factor_names(trip) & bound_names:
+            return []
+        inner_bound = bound_names | self.assigned_names(loop)
+        return [[trip] + term for term in self.block_fill_terms(loop.body, name, kind, inner_bound)]
+
+    def block_fill_terms(self, statements, name, kind, bound_names):
+        # Учитываем только безусловные добавления: ветки if могут не выполниться
+        terms = []
+        for statement in statements:
+            if (kind == 'list' and isinstance(statement, MethodCall) and statement.method_name == 'append'
+                    and isinstance(statement.obj, Identifier) and statement.obj.name == name):
+                terms.append([])
+            elif (kind == 'string' and isinstance(statement, AugAssignment) and statement.op == '+'
+                    and isinstance(statement.target, Identifier) and statement.target.name == name):
+                terms.append([('bytes', statement.value)])
+            elif (kind == 'dict' and isinstance(statement, Assignment) and isinstance(statement.left, Subscript)
+                    and isinstance(statement.left.obj, Identifier) and statement.left.obj.name == name):
+                # Повторяющиеся ключи дают лишь запас ёмкости
+                terms.append([])
+            elif (kind == 'set' and isinstance(statement, MethodCall) and statement.method_name == 'add'
+                    and isinstance(statement.obj, Identifier) and statement.obj.name == name):
+                terms.append([])
+            elif isinstance(statement, ForStatement):
+                terms.extend(self.loop_fill_terms(statement, name, kind, bound_names))
+        return terms
+
+    def trip_count(self, loop):
+        iterable = loop.iterable
+        if isinstance(iterable, FunctionCall) and iterable.name == 'range':
+            args = iterable.args
+            if len(args) == 1:
+                return ('range', None, args[0], None)
+            if len(args) == 2:
+                return ('range', args[0], args[1], None)
+            if len(args) == 3 and isinstance(args[2], Num) and args[2].value > 0:
+                return ('range', args[0], args[1], args[2].value)
+            return None
+        if isinstance(iterable, ListNode):
+            return ('const', len(iterable.elements))
+        if isinstance(iterable, Identifier):
+            return ('len', iterable)
+        return None
+
+    def factor_names(self, factor):
+        names = set()
+        for part in factor[1:]:
+            if isinstance(part, ASTNode):
+                names |= {n.name for n in walk(part) if isinstance(n, Identifier)}
+        return names
+
+    def mentions(self, node, name):
+        return any(isinstance(n, Identifier) and n.name == name for n in walk(node))
+
+    def assigned_names(self, node):
+        names = set()
+        for n in walk(node):
+            if isinstance(n, (Assignment, AugAssignment)):
+                target = n.left if isinstance(n, Assignment) else n.target
+                if isinstance(target, Identifier):
+                    names.add(target.name)
+            elif isinstance(n, ForStatement) and isinstance(n.target, Identifier):
+                names.add(n.target.name)
+        return names
@@ -0,0 +1,267 @@
+from ast_nodes import (
+    ASTNode, Program, FunctionDef, Identifier, Num, BinaryOp, UnaryOp,
+    Assignment, AugAssignment, FunctionCall, MethodCall, ForStatement,
+    WhileStatement, IfStatement, ReturnStatement, RaiseStatement, TryExcept,
+    WithStatement, Subscript, iter_child_nodes, scope_nodes, walk
+)
+
+from ownership_analysis import MUTATING_METHODS
+
+class LoopLowering:
+    """
+    Понижение циклов перед генерацией кода:
+    - счётные while (i = a; while i < n: ...; i += 1) переписываются в for по range;
+    - для циклов for i in range(len(xs)), где индекс используется только для
+      обращения к элементам, строится план обхода итератором без проверок границ.
+    """
+
+    def lower_program(self, program):
+        # Переписывает AST на месте; возвращает id(ForStatement) -> план обхода
+        for root in [program] + [n for n in walk(program) if isinstance(n, FunctionDef)]:
+            self.lower_counter_loops(root)
+        plans = {}
+        for node in walk(program):
+            if isinstance(node, ForStatement):
+                plan = self.plan_index_loop(node)
+                if plan:
+                    plans[id(node)] = plan
+        return plans
+
+    # --- while со счётчиком -> for по range ---
+
+    def lower_counter_loops(self, root):
+        blocks = self.scope_blocks(root)
+        candidates = {}  # переменная -> [(блок, инициализация, цикл, новый for)]
+        for block in blocks:
+            for position, loop in enumerate(block):
+                if not isinstance(loop, WhileStatement):
+                    continue
+                init = self.counter_init(block, position, loop)
+                if init is None:
+                    continue
+                lowered = self.lower_counter_loop(init, loop)
+                if lowered:
+                    candidates.setdefault(init.left.name, []).append((block, init, loop, lowered))
+
+        for name, pairs in candidates.items():
+            # Переменная-счётчик не должна встречаться вне пар "инициализация + цикл",
+            # иначе её значение после цикла может быть нужно
+            total = self.count_name(root, name)
+            in_pairs = sum(self.count_name(init, name) + self.count_name(loop, name)
+                           for _, init, loop, _ in pairs)
+            if total != in_pairs:
+                continue
+            for block, init, loop, lowered in pairs:
+                block[next(i for i, s in enumerate(block) if s is loop)] = lowered
+                del block[next(i for i, s in enumerate(block) if s is init)]
+
+    def counter_init(self, block, position, loop):
+        # Присваивание счётчику перед циклом. Операторы между ними не должны
+        # упоминать счётчик и менять переменные его начального значения,
+        # которое после понижения вычисляется уже в заголовке for
+        condition = loop.condition
+        if not (isinstance(condition, BinaryOp) and isinstance(condition.left, Identifier)):
+            return None
+        name = condition.left.name
+        between = []
+        for statement in reversed(block[:position]):
+            if isinstance(statement, Assignment) and isinstance(statement.left, Identifier) \
+                    and statement.left.name == name:
+                if between and (not self.is_invariant_expression(statement.right) or self.names(statement.right)
+                                & (self.assigned_names(between) | self.mutated_names(between))):
+                    return None
+                return statement
+            if name in self.names(statement):
+                return None
+            between.append(statement)
+        return None
+
+    def lower_counter_loop(self, init, loop):
+        name = init.left.name
+        condition = loop.condition
+        if not (isinstance(condition, BinaryOp) and condition.op in ('<', '<=', '>', '>=')
+                and isinstance(condition.left, Identifier) and condition.left.name == name):
+            return None
+        if not loop.body:
+            return None
+        step = self.counter_step(loop.body[-1], name)
+        if not step or (step > 0) != (condition.op in ('<', '<=')):
+            return None
+
+        rest = loop.body[:-1]
+        bound = condition.right
+        bound_names = self.names(bound)
+        changed = self.assigned_names(rest) | self.mutated_names(rest)
+        if name in changed or name in bound_names or bound_names & changed:
+            return None
+        if not self.is_integer_expression(init.right) or not self.is_invariant_expression(bound):
+            return None
+
+        # range не включает границу, поэтому сдвигаем её для <= и >=
+        shift = {'<=': 1, '>=': -1}.get(condition.op, 0)
+        if shift and isinstance(bound, Num):
+            bound = Num(bound.value + shift)
+        elif shift:
+            bound = BinaryOp(bound, '+' if shift > 0 else '-', Num(1))
+        args = [init.right, bound]
+        if step != 1:
+            args.append(Num(step))
+        return ForStatement(Identifier(name), FunctionCall('range', args), rest)
+
+    def counter_step(self, statement, name):
+        # Шаг счётчика в последнем операторе тела: i += c, i -= c или i = i +/- c
+        if isinstance(statement, AugAssignment):
+            target, op, value = statement.target, statement.op, statement.value
+        elif isinstance(statement, Assignment) and isinstance(statement.right, BinaryOp):
+            target, op, value = statement.left, statement.right.op, statement.right.right
+            left = statement.right.left
+            if not (isinstance(left, Identifier) and left.name == name):
+                return None
+        else:
+            return None
+        if not (isinstance(target, Identifier) and target.name == name):
+            return None
+        if not (isinstance(value, Num) and isinstance(value.value, int) and value.value > 0):
+            return None
+        if op == '+':
+            return value.value
+        if op == '-':
+            return -value.value
+        return None
+
+    def is_integer_expression(self, node):
+        return not any(isinstance(n, Num) and isinstance(n.value, float) for n in walk(node))
+
+    def is_invariant_expression(self, node):
+        # Граница цикла вычисляется один раз, поэтому допускаем только
+        # переменные, числа, арифметику и len()
+        for n in walk(node):
+            if isinstance(n, FunctionCall):
+                if n.name != 'len':
+                    return False
+            elif not isinstance(n, (Identifier, Num, BinaryOp, UnaryOp)):
+                return False
+        return self.is_integer_expression(node)
+
+    # --- for i in range(len(xs)) -> обход итератором ---
+
+    def plan_index_loop(self, loop):
+        if not (isinstance(loop.iterable, FunctionCall) and loop.iterable.name == 'range'
+                and isinstance(loop.target, Identifier)):
+            return None
+        args = loop.iterable.args
+        if len(args) == 2 and isinstance(args[0], Num) and args[0].value == 0:
+            end = args[1]
+        elif len(args) == 1:
+            end = args[0]
+        else:
+            return None
+        if not (isinstance(end, FunctionCall) and end.name == 'len' and len(end.args) == 1
+                and isinstance(end.args[0], Identifier)):
+            return None
+
+        primary = end.args[0].name
+        index = loop.target.name
+        body = Program(loop.body)
+        if index in self.assigned_names(loop.body):
+            return None
+
+        subscripts = [n for n in walk(body) if isinstance(n, Subscript) and isinstance(n.obj, Identifier)
+                      and isinstance(n.index, Identifier) and n.index.name == index]
+        stored = {id(n.left) for n in walk(body) if isinstance(n, Assignment)}
+        stored |= {id(n.target) for n in walk(body) if isinstance(n, AugAssignment)}
+
+        arrays = [primary]
+        for subscript in subscripts:
+            if subscript.obj.name not in arrays:
+                arrays.append(subscript.obj.name)
+
+        # Остальные массивы срезаются по длине первого до начала цикла: если цикл
+        # может выйти досрочно или ys[i] читается не на каждой итерации, срез
+        # паниковал бы там, где Python до обращения не доходит
+        sliceable = not self.exits_early(loop.body)
+        unconditional = self.unconditional_nodes(loop.body)
+
+        eligible = []
+        for array in arrays:
+            accesses = [s for s in subscripts if s.obj.name == array]
+            # Массив должен использоваться только через xs[i]
+            if not accesses or len(accesses) != self.count_name(body, array):
+                if array == primary:
+                    return None
+                continue
+            if array != primary and not (sliceable and all(id(s) in unconditional for s in accesses)):
+                continue
+            mode = 'iter_mut' if any(id(s) in stored for s in accesses) else 'iter'
+            eligible.append((array, mode))
+
+        covered = sum(1 for s in subscripts if s.obj.name in dict(eligible))
+        return {
+            'index': index,
+            'arrays': eligible,
+            'enumerate': self.count_name(body, index) > covered,
+        }
+
+    def exits_early(self, statements):
+        # return и raise в теле или break и continue, относящиеся к самому циклу
+        nodes = list(scope_nodes(Program(statements)))
+        if any(isinstance(n, (ReturnStatement, RaiseStatement)) for n in nodes):
+            return True
+        nested = {id(n) for loop in nodes if isinstance(loop, (ForStatement, WhileStatement))
+                  for n in walk(Program(loop.body))}
+        return any(isinstance(n, Identifier) and n.name in ('break', 'continue') and id(n) not in nested
+                   for n in nodes)
+
+    def unconditional_nodes(self, statements):
+        # Узлы, вычисляемые на каждой итерации: простые операторы верхнего
+        # уровня тела и условия if, кроме правых частей and/or
+        roots = []
+        for statement in statements:
+            if isinstance(statement, IfStatement):
+                roots.append(statement.condition)
+            elif not isinstance(statement, (WhileStatement, ForStatement, TryExcept, WithStatement)):
+                roots.append(statement)
+        nodes = set()
+        for root in roots:
+            skipped = {id(n) for op in walk(root) if isinstance(op, BinaryOp) and op.op in ('and', 'or')
+                       for n in walk(op.right)}
+            nodes.update(id(n) for n in walk(root) if id(n) not in skipped)
+        return nodes
+
+    # --- вспомогательные функции ---
+
+    def scope_blocks(self, root):
+        # Все списки операторов в области видимости, без вложенных функций
+        blocks = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for value in vars(node).values():
+                if isinstance(value, list) and value and all(isinstance(s, ASTNode) for s in value):
+                    blocks.append(value)
+            for child in iter_child_nodes(node):
+                if not isinstance(child, FunctionDef):
+                    stack.append(child)
+        return blocks
+
+    def count_name(self, node, name):
+        return sum(1 for n in scope_nodes(node) if isinstance(n, Identifier) and n.name == name)
+
+    def names(self, node):
+        return {n.name for n in walk(node) if isinstance(n, Identifier)}
+
+    def assigned_names(self, statements):
+        names = set()
+        for n in walk(Program(statements)):
+            if isinstance(n, Assignment) and isinstance(n.left, Identifier):
+                names.add(n.left.name)
+            elif isinstance(n, AugAssignment) and isinstance(n.target, Identifier):
+                names.add(n.target.name)
+            elif isinstance(n, ForStatement) and isinstance(n.target, Identifier):
+                names.add(n.target.name)
+        return names
+
+    def mutated_names(self, statements):
+        return {n.obj.name for n in walk(Program(statements))
+                if isinstance(n, MethodCall) and isinstance(n.obj, Identifier)
+                and n.method_name in MUTATING_METHODS}
@@ -0,0 +1,71 @@
+from ast_nodes import (
+    FunctionDef, Identifier, Num, Assignment, AugAssignment, FunctionCall,
+    DictNode, ListNode, Subscript, scope_nodes, walk
+)
+
+class MapLowering:
+    """
+    Понижение словарей в режиме быстрых отображений: словарь-литерал с ключами
+    0, 1, ..., n - 1, который после создания только читается по индексу,
+    заменяется списком значений, упорядоченных по ключу. Обращение d[k]
+    становится индексированием Vec без хэширования.
+    """
+
+    def lower_program(self, program):
+        # Переписывает AST на месте; возвращает описания выполненных замен
+        lowered = []
+        for root in [program] + [n for n in walk(program) if isinstance(n, FunctionDef)]:
+            lowered.extend(self.lower_dense_dicts(root))
+        return lowered
+
+    def lower_dense_dicts(self, root):
+        assignments = {}  # имя -> присваивания в области видимости
+        for node in scope_nodes(root):
+            if isinstance(node, Assignment) and isinstance(node.left, Identifier):
+                assignments.setdefault(node.left.name, []).append(node)
+
+        lowered = []
+        for name, nodes in assignments.items():
+            if len(nodes) != 1 or (isinstance(root, FunctionDef) and name in root.params):
+                continue
+            values = self.dense_values(nodes[0].right)
+            if values is None or not self.only_indexed_reads(root, name, nodes[0]):
+                continue
+            nodes[0].right = ListNode(values)
+            lowered.append(f'{name}: словарь с ключами 0..{len(values)} заменён на Vec')
+        return lowered
+
+    def dense_values(self, node):
+        # Значения словаря по порядку ключей, если ключи - ровно 0..n-1
+        if not isinstance(node, DictNode) or not node.pairs:
+            return None
+        by_key = {}
+        for key, value in node.pairs:
+            if not (isinstance(key, Num) and isinstance(key.value, int)):
+                return None
+            by_key[key.value] = value
+        if sorted(by_key) != list(range(len(node.pairs))):
+            return None
+        return [by_key[key] for key in range(len(node.pairs))]
+
+    def only_indexed_reads(self, root, name, assignment):
+        # Допустимы только чтения d[k] и len(d): запись по новому ключу,
+        # обход ключей или передача словаря дальше потребовали бы HashMap
+        allowed = {id(assignment.left)}
+        stored = set()
+        for node in scope_nodes(root):
+            if isinstance(node, Assignment) and isinstance(node.left, Subscript):
+                stored.add(id(node.left))
+            elif isinstance(node, AugAssignment) and isinstance(node.target, Subscript):
+                stored.add(id(node.target))
+        for node in scope_nodes(root):
+            if isinstance(node, Subscript) and isinstance(node.obj, Identifier) and node.obj.name == name:
+                if id(node) in stored:
+                    return False
+                allowed.add(id(node.obj))
+            elif (isinstance(node, FunctionCall) and node.name == 'len' and len(node.args) == 1
+                    and isinstance(node.args[0], Identifier) and node.args[0].name == name):
+                allowed.add(id(node.args[0]))
+        # Вложенные функции тоже не должны видеть словарь
+        return all(id(n) in allowed for n in walk(root)
+                   if isinstance(n, Identifier) and n.name == name)
@@ -0,0 +1,240 @@
+# Реестр модулей стандартной библиотеки Python, у которых есть эффективные
+# аналоги в Rust. Модуль подключается вызовом register_module; импорты
+# зарегистрированных модулей в код Rust не попадают, а обращения к их
+# функциям понижаются по реестру.
+#
+# Функция модуля -> (понижение, тип результата). Понижение - шаблон кода, где
+# {0}, {1}, ... - аргументы вызова, а {f0}, {f1}, ... - аргументы, приведённые
+# к f64; либо имя метода генератора кода 'lower_...', который получает имя
+# функции и узел вызова. В типе результата {t0} - тип аргумента, {i0} - тип
+# его элементов при обходе, {e0} - тип элемента коллекции, {d0} - тип значения
+# фабрики defaultdict, {a} - массив NumPy, если хотя бы один аргумент - массив,
+# иначе f64; если аргумента нет, подстановка заменяется на '_'.
+#
+# methods описывает методы типов Rust, в которые превращаются объекты модуля:
+# тип -> {метод Python: (понижение, тип результата)}; в шаблоне {obj} - объект,
+# в типе {e} - тип его элементов, {k} - тип ключей словаря, {r} - тип результата
+# функции из первого аргумента на элементах второго (pool.map(f, xs)).
+
+MODULE_REGISTRY = {}
+
+# Методы типов Rust из зарегистрированных модулей: тип -> {метод: (понижение, тип)}
+TYPE_METHODS = {}
+
+def register_module(name, functions, constants=None, uses=(), mutating=(), methods=None):
+    MODULE_REGISTRY[name] = {
+        'functions': functions,
+        'constants': constants or {},  # имя -> (код, тип)
+        'uses': tuple(uses),
+        'mutating': set(mutating),  # функции, изменяющие свой первый аргумент
+    }
+    for type_name, type_methods in (methods or {}).items():
+        TYPE_METHODS.setdefault(type_name, {}).update(type_methods)
+
+def module_function(module, name):
+    # Понижение и тип результата функции модуля или None
+    return MODULE_REGISTRY.get(module, {}).get('functions', {}).get(name)
+
+def type_methods(type_):
+    # Методы, зарегистрированные для типа Rust вида 'VecDeque<i32>'
+    return TYPE_METHODS.get(type_.split('<', 1)[0], {})
+
+register_module('math', {
+    'sqrt': ('{f0}.sqrt()', 'f64'),
+    'exp': ('{f0}.exp()', 'f64'),
+    'log': ('{f0}.ln()', 'f64'),
+    'log2': ('{f0}.log2()', 'f64'),
+    'log10': ('{f0}.log10()', 'f64'),
+    'sin': ('{f0}.sin()', 'f64'),
+    'cos': ('{f0}.cos()', 'f64'),
+    'tan': ('{f0}.tan()', 'f64'),
+    'asin': ('{f0}.asin()', 'f64'),
+    'acos': ('{f0}.acos()', 'f64'),
+    'atan': ('{f0}.atan()', 'f64'),
+    'atan2': ('{f0}.atan2({f1})', 'f64'),
+    'hypot': ('{f0}.hypot({f1})', 'f64'),
+    'pow': ('{f0}.powf({f1})', 'f64'),
+    'fabs': ('{f0}.abs()', 'f64'),
+    'degrees': ('{f0}.to_degrees()', 'f64'),
+    'radians': ('{f0}.to_radians()', 'f64'),
+    # floor, ceil и trunc в Python возвращают int
+    'floor': ('({f0}.floor() as i32)', 'i32'),
+    'ceil': ('({f0}.ceil() as i32)', 'i32'),
+    'trunc': ('({f0}.trunc() as i32)', 'i32'),
+    'isqrt': ('{0}.isqrt()', 'i32'),
+    'gcd': ('lower_gcd', 'i32'),
+    'isclose': ('(({f0}) - ({f1})).abs() <= 1e-9 * ({f0}).abs().max(({f1}).abs())', 'bool'),
+}, constants={
+    'pi': ('std::f64::consts::PI', 'f64'),
+    'e': ('std::f64::consts::E', 'f64'),
+    'tau': ('std::f64::consts::TAU', 'f64'),
+    'inf': ('f64::INFINITY', 'f64'),
+    'nan': ('f64::NAN', 'f64'),
+})
+
+# Двоичный поиск по отсортированной последовательности: partition_point
+# не выделяет память и работает за O(log n), как и bisect
+register_module('bisect', {
+    'bisect_left': ('{{ let value = {1}; ({0}.partition_point(|item| *item < value) as i32) }}', 'i32'),
+    'bisect_right': ('{{ let value = {1}; ({0}.partition_point(|item| *item <= value) as i32) }}', 'i32'),
+    'bisect': ('{{ let value = {1}; ({0}.partition_point(|item| *item <= value) as i32) }}', 'i32'),
+    'insort_left': ('{{ let value = {1}; let index = {0}.partition_point(|item| *item < value); '
+                    '{0}.insert(index, value); }}', '()'),
+    'insort_right': ('{{ let value = {1}; let index = {0}.partition_point(|item| *item <= value); '
+                     '{0}.insert(index, value); }}', '()'),
+    'insort': ('{{ let value = {1}; let index = {0}.partition_point(|item| *item <= value); '
+               '{0}.insert(index, value); }}', '()'),
+}, mutating={'insort_left', 'insort_right', 'insort'})
+
+# Куча на списке с минимумом наверху -> BinaryHeap с элементами в Reverse
+register_module('heapq', {
+    'heappush': ('lower_heap', '()'),
+    'heappop': ('lower_heap', '{e0}'),
+    'heapify': ('lower_heap', '()'),
+    'heappushpop': ('lower_heap', '{e0}'),
+    'heapreplace': ('lower_heap', '{e0}'),
+    'nsmallest': ('lower_heap', 'Vec<{i1}>'),
+    'nlargest': ('lower_heap', 'Vec<{i1}>'),
+}, uses=('std::collections::BinaryHeap', 'std::cmp::Reverse'),
+   mutating={'heappush', 'heappop', 'heapify', 'heappushpop', 'heapreplace'},
+   methods={'BinaryHeap': {'append': ('{obj}.push(Reverse({0}))', '()')}})
+
+register_module('collections', {
+    'deque': ('lower_deque', 'VecDeque<{i0}>'),
+    'Counter': ('lower_counter', 'HashMap<{i0}, i32>'),
+    'defaultdict': ('lower_defaultdict', 'HashMap<_, {d0}>'),
+}, methods={
+    'VecDeque': {
+        'append': ('{obj}.push_back({0})', '()'),
+        'appendleft': ('{obj}.push_front({0})', '()'),
+        'pop': ('{obj}.pop_back().unwrap()', '{e}'),
+        'popleft': ('{obj}.pop_front().unwrap()', '{e}'),
+        'extend': ('{obj}.extend({0})', '()'),
+        'clear': ('{obj}.clear()', '()'),
+        'rotate': ('{{ let len = {obj}.len() as i32; if len > 0 {{ {obj}.rotate_right(({0}).rem_euclid(len) as usize); }} }}',
+                   '()'),
+    },
+    'HashMap': {
+        'most_common': ('lower_most_common', 'Vec<({k}, i32)>'),
+    },
+})
+
+# Функции itertools -> адаптеры итераторов, без промежуточных списков
+register_module('itertools', {
+    'chain': ('lower_itertools', 'impl Iterator<Item = {i0}>'),
+    'islice': ('lower_itertools', 'impl Iterator<Item = {i0}>'),
+    'count': ('lower_itertools', 'impl Iterator<Item = i32>'),
+    'repeat': ('lower_itertools', 'impl Iterator<Item = {t0}>'),
+    'cycle': ('lower_itertools', 'impl Iterator<Item = {i0}>'),
+    'accumulate': ('lower_itertools', 'impl Iterator<Item = {i0}>'),
+    'pairwise': ('lower_itertools', 'impl Iterator<Item = ({i0}, {i0})>'),
+    'product': ('lower_itertools', 'impl Iterator<Item = ({i0}, {i1})>'),
+    'combinations': ('lower_itertools', 'impl Iterator<Item = ({i0}, {i0})>'),
+    'permutations': ('lower_itertools', 'impl Iterator<Item = ({i0}, {i0})>'),
+    'takewhile': ('lower_itertools', 'impl Iterator<Item = {i1}>'),
+    'dropwhile': ('lower_itertools', 'impl Iterator<Item = {i1}>'),
+})
+
+# Пул потоков или процессов -> WorkerPool: map раздаёт куски входа потокам
+# std::thread::scope через канал mpsc и собирает результаты по порядку входа.
+# Потоки живут только внутри map, поэтому close, join и shutdown ничего не делают
+POOL_METHODS = {
+    'map': ('lower_pool_map', 'Vec<{r}>'),
+    'imap': ('lower_pool_map', 'Vec<{r}>'),
+    'close': ('', '()'),
+    'join': ('', '()'),
+    'terminate': ('', '()'),
+    'shutdown': ('', '()'),
+}
+
+register_module('concurrent.futures', {
+    'ThreadPoolExecutor': ('lower_pool', 'WorkerPool'),
+    'ProcessPoolExecutor': ('lower_pool', 'WorkerPool'),
+}, methods={'WorkerPool': POOL_METHODS})
+
+register_module('multiprocessing', {
+    'Pool': ('lower_pool', 'WorkerPool'),
+    'Lock': ('lower_lock', 'Arc<Mutex<()>>'),
+    'Queue': ('lower_queue', 'PyQueue<_>'),
+    'cpu_count': ('(std::thread::available_parallelism().map_or(1, |n| n.get()) as i32)', 'i32'),
+})
+
+# Разделяемые объекты потоков: очередь и поток - структуры с внутренней
+# изменяемостью, клон очереди и Arc блокировки ссылаются на одно и то же
+register_module('threading', {
+    'Thread': ('lower_thread', 'PyThread'),
+    'Lock': ('lower_lock', 'Arc<Mutex<()>>'),
+}, methods={
+    'PyThread': {
+        'start': ('{obj}.start()', '()'),
+        'join': ('{obj}.join()', '()'),
+    },
+})
+
+register_module('queue', {
+    'Queue': ('lower_queue', 'PyQueue<_>'),
+    'SimpleQueue': ('lower_queue', 'PyQueue<_>'),
+}, methods={
+    'PyQueue': {
+        'put': ('{obj}.put({0})', '()'),
+        'get': ('{obj}.get()', '{e}'),
+        'empty': ('{obj}.empty()', 'bool'),
+        'qsize': ('{obj}.qsize()', 'i32'),
+        'task_done': ('{obj}.task_done()', '()'),
+        'join': ('{obj}.join()', '()'),
+    },
+})
+
+# NumPy для одномерных массивов f64 (Vec<f64>). Функции с шаблоном поэлементные:
+# над числами шаблон применяется как есть, а цепочка таких функций и
+# арифметики над массивами сливается в один цикл, где шаблон применяется к
+# элементам. Конструкторы массивов и свёртки понижает lower_numpy
+register_module('numpy', {
+    'sqrt': ('{f0}.sqrt()', '{a}'),
+    'exp': ('{f0}.exp()', '{a}'),
+    'log': ('{f0}.ln()', '{a}'),
+    'log2': ('{f0}.log2()', '{a}'),
+    'log10': ('{f0}.log10()', '{a}'),
+    'sin': ('{f0}.sin()', '{a}'),
+    'cos': ('{f0}.cos()', '{a}'),
+    'tan': ('{f0}.tan()', '{a}'),
+    'tanh': ('{f0}.tanh()', '{a}'),
+    'abs': ('{f0}.abs()', '{a}'),
+    'floor': ('{f0}.floor()', '{a}'),
+    'ceil': ('{f0}.ceil()', '{a}'),
+    'square': ('{f0}.powi(2)', '{a}'),
+    'maximum': ('{f0}.max({f1})', '{a}'),
+    'minimum': ('{f0}.min({f1})', '{a}'),
+    'clip': ('{f0}.clamp({f1}, {f2})', '{a}'),
+    'where': ('if {0} {{ {f1} }} else {{ {f2} }}', '{a}'),
+    'array': ('lower_numpy', 'Vec<f64>'),
+    'asarray': ('lower_numpy', 'Vec<f64>'),
+    'copy': ('lower_numpy', 'Vec<f64>'),
+    'zeros': ('lower_numpy', 'Vec<f64>'),
+    'ones': ('lower_numpy', 'Vec<f64>'),
+    'full': ('lower_numpy', 'Vec<f64>'),
+    'arange': ('lower_numpy', 'Vec<f64>'),
+    'linspace': ('lower_numpy', 'Vec<f64>'),
+    'sum': ('lower_numpy', 'f64'),
+    'mean': ('lower_numpy', 'f64'),
+    'dot': ('lower_numpy', 'f64'),
+    'max': ('lower_numpy', 'f64'),
+    'min': ('lower_numpy', 'f64'),
+    'amax': ('lower_numpy', 'f64'),
+    'amin': ('lower_numpy', 'f64'),
+}, constants={
+    'pi': ('std::f64::consts::PI', 'f64'),
+    'e': ('std::f64::consts::E', 'f64'),
+    'inf': ('f64::INFINITY', 'f64'),
+    'nan': ('f64::NAN', 'f64'),
+}, methods={
+    # Методы массива; у списков Python их нет, кроме copy с тем же смыслом
+    'Vec': {
+        'sum': ('lower_array_method', 'f64'),
+        'mean': ('lower_array_method', 'f64'),
+        'max': ('lower_array_method', 'f64'),
+        'min': ('lower_array_method', 'f64'),
+        'dot': ('lower_array_method', 'f64'),
+        'copy': ('lower_array_method', 'Vec<{e}>'),
+    },
+})
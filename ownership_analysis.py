@@ -0,0 +1,225 @@
+from ast_nodes import (
+    Identifier, Assignment, AugAssignment, ReturnStatement, FunctionCall, MethodCall,
+    ListNode, DictNode, FunctionDef, Subscript, Attribute, ForStatement, walk
+)
+
+from standard_library_mapping import STANDARD_LIBRARY_MAPPING
+from module_registry import MODULE_REGISTRY
+
+# Методы, изменяющие объект, у которого они вызваны
+MUTATING_METHODS = {
+    'append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort', 'reverse',
+    'update', 'add', 'discard', 'setdefault', 'popitem',
+    'appendleft', 'popleft', 'extendleft', 'rotate',
+}
+
+# Типы, которые можно передавать заимствованием вместо владения
+BORROWABLE_PREFIXES = ('Vec<', 'HashMap<', 'HashSet<', 'VecDeque<', 'BinaryHeap<')
+
+READ = 'read'
+MUTATED = 'mutated'
+CONSUMED = 'consumed'
+
+def attribute_stores(root):
+    # Атрибуты, в которые записывают: p.x = v, p.x += 1, p.items.append(v)
+    for node in walk(root):
+        if isinstance(node, Assignment) and isinstance(node.left, Attribute):
+            yield node.left
+        elif isinstance(node, AugAssignment) and isinstance(node.target, Attribute):
+            yield node.target
+        elif isinstance(node, MethodCall) and isinstance(node.obj, Attribute) and node.method_name in MUTATING_METHODS:
+            yield node.obj
+
+def mutates_loop_target(node):
+    # Цикл изменяет поля своих элементов: for p in pts: p.x = ...
+    return isinstance(node.target, Identifier) and any(
+        isinstance(attribute.obj, Identifier) and attribute.obj.name == node.target.name
+        for statement in node.body for attribute in attribute_stores(statement))
+
+class OwnershipAnalysis:
+    def __init__(self, module_member=None):
+        self.functions = {}  # имя функции -> FunctionDef
+        self.usages = {}  # имя функции -> {параметр: read / mutated / consumed}
+        # имя функции -> параметры, изменяемые на месте; учитываются отдельно от
+        # usages, где забирание значения перекрывает изменение
+        self.mutations = {}
+        # Обращение к функции модуля из реестра -> (модуль, имя) или None
+        self.module_member = module_member or (lambda node: None)
+
+    def analyze_program(self, function_defs):
+        # Классифицирует параметры всех функций программы.
+        # Начинаем с оптимистичного предположения (все параметры только читаются)
+        # и повторяем анализ, пока классификация не перестанет меняться,
+        # чтобы корректно учитывать взаимные и рекурсивные вызовы.
+        for function_def in function_defs:
+            self.functions[function_def.name] = function_def
+            self.usages[function_def.name] = {param: READ for param in function_def.params}
+            self.mutations[function_def.name] = set()
+
+        changed = True
+        while changed:
+            changed = False
+            for function_def in function_defs:
+                usage, mutated = self.analyze_function(function_def)
+                if usage != self.usages[function_def.name] or mutated != self.mutations[function_def.name]:
+                    self.usages[function_def.name] = usage
+                    self.mutations[function_def.name] = mutated
+                    changed = True
+        return self.usages
+
+    def analyze_function(self, function_def):
+        usage = {param: READ for param in function_def.params if param != 'self'}
+        mutated = set()
+        for node in walk(function_def):
+            if node is not function_def and isinstance(node, FunctionDef):
+                continue
+            for param, kind in self.classify_node(node, usage):
+                usage[param] = self.merge(usage[param], kind)
+                if kind == MUTATED:
+                    mutated.add(param)
+        return usage, mutated
+
+    def classify_node(self, node, usage):
+        # Возвращает пары (параметр, вид использования) для одного узла
+        def param_name(expr):
+            if isinstance(expr, Identifier) and expr.name in usage:
+                return expr.name
+            return None
+
+        if isinstance(node, (FunctionCall, MethodCall)) and self.module_member(node):
+            # Функции модулей не забирают аргументы, а изменяют разве что первый
+            module, function = self.module_member(node)
+            for index, arg in enumerate(node.args):
+                name = param_name(arg)
+                if name:
+                    yield name, MUTATED if index == 0 and function in MODULE_REGISTRY[module]['mutating'] else READ
+        elif isinstance(node, MethodCall):
+            name = param_name(node.obj)
+            if name and node.method_name in MUTATING_METHODS:
+                yield name, MUTATED
+            for index, arg in enumerate(node.args):
+                name = param_name(arg)
+                if name:
+                    # pool.map(f, xs) только читает элементы xs, a.dot(b) - элементы b,
+                    # d.get(k) - ключ
+                    reading = (node.method_name in ('map', 'imap') and index == 1) or node.method_name in ('dot', 'get')
+                    yield name, READ if reading else CONSUMED
+        elif isinstance(node, ReturnStatement):
+            name = param_name(node.expr)
+            if name:
+                yield name, CONSUMED
+        elif isinstance(node, Assignment) and isinstance(node.left, Subscript):
+            # Запись по индексу: xs[i] = v
+            name = param_name(node.left.obj)
+            if name:
+                yield name, MUTATED
+            name = param_name(node.right)
+            if name:
+                yield name, CONSUMED
+        elif isinstance(node, Assignment) and isinstance(node.left, Attribute):
+            # Запись в поле объекта: p.x = v
+            name = param_name(node.left.obj)
+            if name:
+                yield name, MUTATED
+            name = param_name(node.right)
+            if name:
+                yield name, CONSUMED
+        elif isinstance(node, AugAssignment):
+            if isinstance(node.target, (Subscript, Attribute)):
+                name = param_name(node.target.obj)
+                if name:
+                    yield name, MUTATED
+            else:
+                # Для строк s += ... в Python создаёт новый объект, поэтому
+                # изменение не должно быть видно вызывающему коду
+                name = param_name(node.target)
+                if name:
+                    yield name, CONSUMED
+        elif isinstance(node, Assignment):
+            name = param_name(node.left)
+            if name:
+                # Параметр перепривязывается, поэтому нужен собственный экземпляр
+                yield name, CONSUMED
+            name = param_name(node.right)
+            if name:
+                yield name, CONSUMED
+        elif isinstance(node, ForStatement) and mutates_loop_target(node):
+            name = param_name(node.iterable)
+            if name:
+                yield name, MUTATED
+        elif isinstance(node, ListNode):
+            for element in node.elements:
+                name = param_name(element)
+                if name:
+                    yield name, CONSUMED
+        elif isinstance(node, DictNode):
+            for key, value in node.pairs:
+                for expr in (key, value):
+                    name = param_name(expr)
+                    if name:
+                        yield name, CONSUMED
+        elif isinstance(node, FunctionCall):
+            for index, arg in enumerate(node.args):
+                name = param_name(arg)
+                if name:
+                    yield name, self.argument_usage(node.name, index)
+                    if self.argument_mutated(node.name, index):
+                        yield name, MUTATED
+
+    def argument_usage(self, func_name, index):
+        # Как вызываемая функция использует свой аргумент с данным индексом
+        if func_name in self.usages:
+            params = [p for p in self.functions[func_name].params if p != 'self']
+            if index < len(params):
+                return self.usages[func_name][params[index]]
+            return CONSUMED
+        if func_name in STANDARD_LIBRARY_MAPPING or func_name == 'open':
+            # open() только читает путь
+            return READ
+        # Неизвестная функция может забрать значение себе
+        return CONSUMED
+
+    def argument_mutated(self, func_name, index):
+        # Изменяет ли вызываемая функция аргумент на месте, даже если и забирает его
+        if func_name not in self.mutations:
+            return False
+        params = [p for p in self.functions[func_name].params if p != 'self']
+        return index < len(params) and params[index] in self.mutations[func_name]
+
+    def mutated_and_consumed(self, func_name, param):
+        # Параметр изменяется на месте и при этом возвращается или сохраняется
+        return param in self.mutations.get(func_name, ()) and self.usages[func_name].get(param) == CONSUMED
+
+    def merge(self, current, new):
+        order = [READ, MUTATED, CONSUMED]
+        return max(current, new, key=order.index)
+
+    def passing_mode(self, func_name, param, param_type):
+        # Определяет способ передачи параметра: owned, ref или mut
+        if not self.is_borrowable(param_type):
+            return 'owned'
+        kind = self.usages.get(func_name, {}).get(param, CONSUMED)
+        if kind == READ:
+            return 'ref'
+        if kind == MUTATED:
+            return 'mut'
+        if self.mutated_and_consumed(func_name, param):
+            # Изменения должны дойти до вызывающего кода: передаём &mut, а там,
+            # где значение забирается, берётся его копия
+            return 'mut'
+        return 'owned'
+
+    def is_borrowable(self, param_type):
+        return param_type == 'String' or param_type.startswith(BORROWABLE_PREFIXES)
+
+    def borrowed_type(self, param_type, mode):
+        # Тип параметра в сигнатуре Rust с учётом способа передачи
+        if mode == 'ref':
+            if param_type == 'String':
+                return '&str'
+            if param_type.startswith('Vec<'):
+                return f'&[{param_type[4:-1]}]'
+            return f'&{param_type}'
+        if mode == 'mut':
+            return f'&mut {param_type}'
+        return param_type
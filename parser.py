@@ -1,4 +1,5 @@
 from ast_nodes import *
+from lexer import Lexer, Token
 
 class Parser:
     def __init__(self, tokens):
@@ -14,6 +15,12 @@ class Parser:
         else:
             self.current_token = Token('EOF', None, self.tokens[-1].line, self.tokens[-1].column)
 
+    def peek_next_token(self):
+        # Следующий токен без продвижения
+        if self.token_index + 1 < len(self.tokens):
+            return self.tokens[self.token_index + 1]
+        return Token('EOF', None, self.tokens[-1].line, self.tokens[-1].column)
+
     def parse(self):
         # Начало разбора программы
         return self.program()
@@ -25,7 +32,7 @@ class Parser:
         return Program(statements)
 
     def statement(self):
-        if self.current_token.type == 'DEF':
+        if self.current_token.type in ('DEF', 'AT'):
             return self.function_definition()
         elif self.current_token.type == 'IF':
             return self.if_statement()
@@ -37,8 +44,14 @@ class Parser:
             return self.return_statement()
         elif self.current_token.type == 'TRY':
             return self.try_except_statement()
+        elif self.current_token.type == 'RAISE':
+            return self.raise_statement()
+        elif self.current_token.type == 'YIELD':
+            return self.yield_statement()
         elif self.current_token.type == 'IMPORT':
             return self.import_statement()
+        elif self.current_token.type == 'FROM':
+            return self.import_from_statement()
         elif self.current_token.type == 'CLASS':
             return self.class_definition()
         elif self.current_token.type == 'ASYNC':
@@ -58,11 +71,17 @@ class Parser:
         name = self.current_token.value
         self.eat('IDENTIFIER')
         self.eat('LPAREN')
-        params = self.parameter_list()
+        annotations = {}
+        params = self.parameter_list(annotations)
         self.eat('RPAREN')
+        return_annotation = None
+        if self.current_token.type == 'ARROW':
+            # Аннотация результата: -> int
+            self.eat('ARROW')
+            return_annotation = self.annotation()
         self.eat('COLON')
         body = self.block()
-        func_def = FunctionDef(name, params, body)
+        func_def = FunctionDef(name, params, body, annotations, return_annotation)
         if decorators:
             return DecoratedDef(decorators, func_def)
         return func_def
@@ -74,18 +93,64 @@ class Parser:
             return token.value
         self.error("Expected identifier")
 
-    def parameter_list(self):
+    def parameter_list(self, annotations=None, annotated=True):
+        # annotated=False - параметры лямбды: двоеточие после них начинает тело
         params = []
         if self.current_token.type == 'IDENTIFIER':
-            params.append(self.identifier())
+            params.append(self.parameter(annotations, annotated))
             while self.current_token.type == 'COMMA':
                 self.eat('COMMA')
                 if self.current_token.type == 'IDENTIFIER':
-                    params.append(self.identifier())
+                    params.append(self.parameter(annotations, annotated))
                 else:
                     self.error("Expected identifier after comma in parameter list")
         return params
 
+    def parameter(self, annotations, annotated=True):
+        name = self.identifier()
+        if annotated and self.current_token.type == 'COLON':
+            # Аннотация параметра: x: float
+            self.eat('COLON')
+            annotation = self.annotation()
+            if annotations is not None:
+                annotations[name] = annotation
+        return name
+
+    def annotation(self):
+        # Тип в аннотации: int, list[int], dict[str, list[float]], module.Type, int | None
+        token = self.current_token
+        if token.type == 'NONE':
+            self.eat('NONE')
+            node = TypeAnnotation('None')
+        elif token.type == 'STRING':
+            # Отложенная аннотация в кавычках: "Point"
+            self.eat('STRING')
+            node = TypeAnnotation(token.value)
+        elif token.type == 'DOT':
+            # Многоточие в tuple[int, ...]
+            for _ in range(3):
+                self.eat('DOT')
+            node = TypeAnnotation('...')
+        else:
+            name = self.identifier()
+            while self.current_token.type == 'DOT':
+                self.eat('DOT')
+                name += '.' + self.identifier()
+            args = []
+            if self.current_token.type == 'LBRACKET':
+                self.eat('LBRACKET')
+                args.append(self.annotation())
+                while self.current_token.type == 'COMMA':
+                    self.eat('COMMA')
+                    args.append(self.annotation())
+                self.eat('RBRACKET')
+            node = TypeAnnotation(name, args)
+        if self.current_token.type == 'BITWISE_OR':
+            # Объединение типов: X | None
+            self.eat('BITWISE_OR')
+            node = TypeAnnotation('Union', [node, self.annotation()])
+        return node
+
     def block(self):
         statements = []
         self.eat('INDENT')
@@ -123,6 +188,25 @@ class Parser:
         return ReturnStatement(expr)
         
 
+    def raise_statement(self):
+        # raise Exc(...), raise Exc или повторный raise без аргумента
+        line = self.current_token.line
+        self.eat('RAISE')
+        if self.current_token.type in ('DEDENT', 'EOF') or self.current_token.line != line:
+            return RaiseStatement()
+        return RaiseStatement(self.expression())
+
+    def yield_statement(self):
+        # yield значение, yield без значения или yield from итерируемое
+        line = self.current_token.line
+        self.eat('YIELD')
+        if self.current_token.type == 'FROM':
+            self.eat('FROM')
+            return YieldFrom(self.expression())
+        if self.current_token.type in ('DEDENT', 'EOF') or self.current_token.line != line:
+            return Yield()
+        return Yield(self.expression())
+
     def expression_statement(self):
         # Разбор выражения как отдльного оператора
         expr = self.expression()
@@ -131,8 +215,6 @@ class Parser:
     def expression(self):
         if self.current_token.type == 'AWAIT':
             return self.await_expression()
-        elif self.current_token.type == 'LPAREN' and self.peek_next_token().type == 'FOR':
-            return self.generator_expression()
         elif self.current_token.type == 'LAMBDA':
             return self.lambda_expression()
         return self.logical_or()  # Убрали вызов assignment()
@@ -194,7 +276,7 @@ class Parser:
     def factor(self):
         # Разбор умножения и деления
         node = self.unary()
-        while self.current_token.type in ('TIMES', 'DIVIDE'):
+        while self.current_token.type in ('TIMES', 'DIVIDE', 'MODULO'):
             token = self.current_token
             self.eat(token.type)
             node = BinaryOp(left=node, op=token.value, right=self.unary())
@@ -206,29 +288,34 @@ class Parser:
             token = self.current_token
             self.eat(token.type)
             return UnaryOp(op=token.value, expr=self.unary())
-        return self.primary()
+        return self.power()
+
+    def power(self):
+        # Возведение в степень: правоассоциативно и связывает сильнее унарного
+        # минуса слева от себя (-x ** 2 == -(x ** 2)), но не справа (2 ** -1)
+        node = self.primary()
+        if self.current_token.type == 'POWER':
+            self.eat('POWER')
+            return BinaryOp(left=node, op='**', right=self.unary())
+        return node
 
     def primary(self):
         token = self.current_token
         if token.type == 'NUMBER':
             self.eat('NUMBER')
             return Num(token.value)
-        elif token.type in ('STRING', 'RAW_STRING', 'FORMATTED_STRING'):
+        elif token.type in ('TRUE', 'FALSE', 'NONE'):
+            self.eat(token.type)
+            return Constant({'TRUE': True, 'FALSE': False, 'NONE': None}[token.type])
+        elif token.type in ('STRING', 'RAW_STRING'):
+            self.eat(token.type)
+            return self.trailers(String(token.value))
+        elif token.type == 'FORMATTED_STRING':
             self.eat(token.type)
-            return String(token.value)
+            return self.trailers(self.formatted_string(token.value))
         elif token.type == 'IDENTIFIER':
             self.eat('IDENTIFIER')
-            node = Identifier(token.value)
-            while self.current_token.type == 'DOT':
-                self.eat('DOT')
-                method_name = self.current_token.value
-                self.eat('IDENTIFIER')
-                self.eat('LPAREN')
-                args = []
-                if self.current_token.type != 'RPAREN':
-                    args = self.argument_list()
-                self.eat('RPAREN')
-                node = MethodCall(obj=node, method_name=method_name, args=args)
+            node = self.trailers(Identifier(token.value))
             # Обрабатываем вызовы функций только для простых идентификаторов
             if isinstance(node, Identifier) and self.current_token.type == 'LPAREN':
                 return self.function_call(node.name)
@@ -236,6 +323,17 @@ class Parser:
         elif token.type == 'LPAREN':
             self.eat('LPAREN')
             node = self.expression()
+            if self.current_token.type == 'FOR':
+                node = self.generator_expression(node)
+            elif self.current_token.type == 'COMMA':
+                # Кортеж: (a, b)
+                elements = [node]
+                while self.current_token.type == 'COMMA':
+                    self.eat('COMMA')
+                    if self.current_token.type == 'RPAREN':
+                        break
+                    elements.append(self.expression())
+                node = TupleNode(elements)
             self.eat('RPAREN')
             return node
         elif token.type == 'LBRACKET':
@@ -244,6 +342,100 @@ class Parser:
             return self.dict_expression()
         self.error(f"Unexpected token: {token}")
 
+    def trailers(self, node):
+        # Обращения по индексу, к атрибутам и вызовы методов после первичного выражения
+        while self.current_token.type in ('DOT', 'LBRACKET'):
+            if self.current_token.type == 'LBRACKET':
+                # Обращение по индексу: xs[i]
+                self.eat('LBRACKET')
+                index = self.expression()
+                self.eat('RBRACKET')
+                node = Subscript(node, index)
+                continue
+            self.eat('DOT')
+            method_name = self.current_token.value
+            self.eat('IDENTIFIER')
+            if self.current_token.type != 'LPAREN':
+                # Обращение к атрибуту: p.x
+                node = Attribute(node, method_name)
+                continue
+            self.eat('LPAREN')
+            args = []
+            if self.current_token.type != 'RPAREN':
+                args = self.argument_list()
+            self.eat('RPAREN')
+            node = MethodCall(obj=node, method_name=method_name, args=args)
+        return node
+
+    def formatted_string(self, text):
+        # Текст f-строки -> FormattedString из литеральных частей и подстановок
+        values, literal, index = [], '', 0
+        while index < len(text):
+            char = text[index]
+            if char in '{}' and text[index + 1:index + 2] == char:
+                literal += char
+                index += 2
+                continue
+            if char == '}':
+                self.error("Одиночная '}' в f-строке")
+            if char != '{':
+                literal += char
+                index += 1
+                continue
+            expression, conversion, format_spec, index = self.replacement_field(text, index + 1)
+            source = expression.strip()
+            if source.endswith('=') and not source.endswith(('==', '!=', '<=', '>=')):
+                # f'{x=}' печатает выражение вместе со значением
+                literal += expression
+                expression = source[:-1]
+                if conversion is None and not format_spec:
+                    conversion = 'r'
+            if literal:
+                values.append(String(literal))
+                literal = ''
+            parser = Parser(Lexer(expression.strip()).tokenize())
+            value = parser.expression()
+            if parser.current_token.type != 'EOF':
+                self.error(f'Неподдерживаемое выражение в f-строке: {expression}')
+            values.append(FormattedValue(value, conversion, format_spec))
+        if literal:
+            values.append(String(literal))
+        return FormattedString(values)
+
+    def replacement_field(self, text, start):
+        # Поле {expr!conversion:spec}, начинающееся после '{':
+        # (выражение, преобразование, формат, индекс после '}')
+        depth, quote, index = 0, None, start
+        while index < len(text):
+            char = text[index]
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in '\'"':
+                quote = char
+            elif char in '([{':
+                depth += 1
+            elif char in ')]}' and depth:
+                depth -= 1
+            elif depth == 0 and (char in ':}' or (char == '!' and text[index + 1:index + 2] != '=')):
+                break
+            index += 1
+        if index >= len(text):
+            self.error('Незакрытая подстановка в f-строке')
+        expression, conversion, format_spec = text[start:index], None, ''
+        if text[index] == '!':
+            conversion = text[index + 1:index + 2]
+            index += 2
+        if index < len(text) and text[index] == ':':
+            close = text.find('}', index)
+            format_spec = text[index + 1:close] if close != -1 else ''
+            if '{' in format_spec:
+                self.error('Вложенные подстановки в формате f-строки не поддерживаются')
+            index = close
+        if index < 0 or index >= len(text) or text[index] != '}':
+            self.error('Незакрытая подстановка в f-строке')
+        return expression, conversion, format_spec, index + 1
+
     def function_call(self, name):
         # Разбор вызова функци
         self.eat('LPAREN')
@@ -255,12 +447,23 @@ class Parser:
 
     def argument_list(self):
         # Разбор списка аргументов функции
-        args = [self.expression()]
+        args = [self.argument()]
+        if self.current_token.type == 'FOR':
+            # Единственный аргумент - генераторное выражение без скобок: sum(x for x in xs)
+            return [self.generator_expression(args[0])]
         while self.current_token.type == 'COMMA':
             self.eat('COMMA')
-            args.append(self.expression())
+            args.append(self.argument())
         return args
 
+    def argument(self):
+        # Позиционный или именованный (name=value) аргумент
+        if self.current_token.type == 'IDENTIFIER' and self.peek_next_token().type == 'EQUALS':
+            name = self.identifier()
+            self.eat('EQUALS')
+            return KeywordArgument(name, self.expression())
+        return self.expression()
+
     def error(self, message):
         # Обработка ошибок парсера
         raise Exception(f"Parser error at line {self.current_token.line}, column {self.current_token.column}: {message}")
@@ -283,13 +486,36 @@ class Parser:
     def for_statement(self):
         # Разбор цикла for
         self.eat('FOR')
-        target = self.expression()
+        target = self.target_list()
         self.eat('IN')
         iterable = self.expression()
         self.eat('COLON')
         body = self.block()
         return ForStatement(target, iterable, body)
 
+    def target_list(self):
+        # Переменная цикла или кортеж переменных: for i, x in ...
+        target = self.expression()
+        if self.current_token.type != 'COMMA':
+            return target
+        elements = [target]
+        while self.current_token.type == 'COMMA':
+            self.eat('COMMA')
+            elements.append(self.expression())
+        return TupleNode(elements)
+
+    def comprehension_clause(self):
+        # for target in iterable [if condition] в включениях и генераторных выражениях
+        self.eat('FOR')
+        target = self.target_list()
+        self.eat('IN')
+        iterable = self.expression()
+        condition = None
+        if self.current_token.type == 'IF':
+            self.eat('IF')
+            condition = self.expression()
+        return target, iterable, condition
+
     def list_expression(self):
         self.eat('LBRACKET')
         
@@ -303,16 +529,7 @@ class Parser:
         
         # Проверяем, является ли это списковым включением
         if self.current_token.type == 'FOR':
-            self.eat('FOR')
-            target = self.expression()
-            self.eat('IN')
-            iterable = self.expression()
-            
-            condition = None
-            if self.current_token.type == 'IF':
-                self.eat('IF')
-                condition = self.expression()
-            
+            target, iterable, condition = self.comprehension_clause()
             self.eat('RBRACKET')
             return ListComprehension(expression=expr, target=target, iterable=iterable, condition=condition)
         else:
@@ -387,7 +604,21 @@ class Parser:
             self.eat('AS')
             alias = self.current_token.value
             self.eat('IDENTIFIER')
-        return ImportStatement(module_name, alias)
+        return ImportStatement(module_name, alias=alias)
+
+    def import_from_statement(self):
+        # from module import name1, name2
+        self.eat('FROM')
+        module_name = self.identifier()
+        while self.current_token.type == 'DOT':
+            self.eat('DOT')
+            module_name += '.' + self.identifier()
+        self.eat('IMPORT')
+        names = [self.identifier()]
+        while self.current_token.type == 'COMMA':
+            self.eat('COMMA')
+            names.append(self.identifier())
+        return ImportStatement(module_name, names=names)
 
     def class_definition(self):
         self.eat('CLASS')
@@ -446,8 +677,10 @@ class Parser:
         decorators = []
         while self.current_token.type == 'AT':
             self.eat('AT')
-            name = self.current_token.value
-            self.eat('IDENTIFIER')
+            name = self.identifier()
+            while self.current_token.type == 'DOT':
+                self.eat('DOT')
+                name += '.' + self.identifier()
             args = []
             if self.current_token.type == 'LPAREN':
                 self.eat('LPAREN')
@@ -459,30 +692,34 @@ class Parser:
 
     def with_statement(self):
         self.eat('WITH')
-        context_expr = self.expression()
-        optional_vars = None
-        if self.current_token.type == 'AS':
-            self.eat('AS')
-            optional_vars = self.expression()
+        items = []
+        while True:
+            context_expr = self.expression()
+            optional_vars = None
+            if self.current_token.type == 'AS':
+                self.eat('AS')
+                optional_vars = self.expression()
+            items.append((context_expr, optional_vars))
+            if self.current_token.type != 'COMMA':
+                break
+            self.eat('COMMA')
         self.eat('COLON')
         body = self.block()
-        return WithStatement(context_expr, optional_vars, body)
+        # with a as x, b as y: - вложенные with, как в Python
+        for context_expr, optional_vars in reversed(items):
+            body = [WithStatement(context_expr, optional_vars, body)]
+        return body[0]
 
-    def generator_expression(self):
-        self.eat('LPAREN')
-        expression = self.expression()
-        self.eat('FOR')
-        target = self.expression()
-        self.eat('IN')
-        iterable = self.expression()
-        self.eat('RPAREN')
-        return GeneratorExpression(expression, target, iterable)
+    def generator_expression(self, expression):
+        # (expression for target in iterable if condition); скобки разбирает вызывающий
+        target, iterable, condition = self.comprehension_clause()
+        return GeneratorExpression(expression, target, iterable, condition)
 
     def lambda_expression(self):
         self.eat('LAMBDA')
         params = []
         if self.current_token.type != 'COLON':
-            params = self.parameter_list()
+            params = self.parameter_list(annotated=False)
         self.eat('COLON')
         body = self.expression()
         return LambdaExpression(params, body)
@@ -501,6 +738,17 @@ class Parser:
         self.eat('RPAREN')
         return PrintStatement(expressions)
 
+    def expression_list(self):
+        # Выражение или кортеж без скобок: a, b = b, a
+        expr = self.expression()
+        if self.current_token.type != 'COMMA':
+            return expr
+        elements = [expr]
+        while self.current_token.type == 'COMMA':
+            self.eat('COMMA')
+            elements.append(self.expression())
+        return TupleNode(elements)
+
     def assignment_statement(self):
         left = self.primary()
         if self.current_token.type == 'EQUALS':
@@ -510,11 +758,25 @@ class Parser:
         self.error(f"Expected assignment operator, got {self.current_token.type}")
 
     def assignment_or_expression(self):
-        expr = self.expression()  # Парсим выражение
+        expr = self.expression_list()  # Парсим выражение
+        if self.current_token.type == 'COLON' and isinstance(expr, (Identifier, Attribute)):
+            # Аннотация переменной: x: int = 5 или объявление x: int
+            self.eat('COLON')
+            annotation = self.annotation()
+            if self.current_token.type != 'EQUALS':
+                return VariableAnnotation(expr, annotation)
+            self.eat('EQUALS')
+            return Assignment(expr, self.expression(), annotation)
         if self.current_token.type == 'EQUALS':
             self.eat('EQUALS')
-            rhs = self.expression()
+            rhs = self.expression_list()
             return Assignment(expr, rhs)
+        elif self.current_token.type in ('PLUS_EQUALS', 'MINUS_EQUALS', 'TIMES_EQUALS', 'DIVIDE_EQUALS',
+                                         'MOD_EQUALS', 'AND_EQUALS', 'OR_EQUALS', 'XOR_EQUALS'):
+            # Составное присваивание: x += 1
+            token = self.current_token
+            self.eat(token.type)
+            return AugAssignment(expr, token.value[:-1], self.expression())
         else:
             return expr  # Возвращаем выражение без присваивания
 
@@ -0,0 +1,176 @@
+from ast_nodes import (
+    FunctionDef, ClassDef, Identifier, Num, Constant, Assignment, AugAssignment, Attribute,
+    Subscript, BinaryOp, UnaryOp, FunctionCall, MethodCall, PrintStatement, ReturnStatement,
+    IfStatement, WhileStatement, RaiseStatement, TryExcept, Yield, YieldFrom,
+    scope_nodes, walk
+)
+
+from generator_lowering import is_generator
+from ownership_analysis import MUTATED, MUTATING_METHODS
+from module_registry import type_methods
+
+# Встроенные функции без побочных эффектов
+PURE_BUILTINS = {'abs', 'min', 'max', 'len', 'int', 'float', 'bool', 'str', 'round', 'range', 'sum', 'sorted',
+                 'any', 'all', 'enumerate', 'zip', 'map', 'filter', 'list'}
+
+# Модули, функции которых чистые
+PURE_MODULES = {'math'}
+
+# Методы разделяемых объектов (очередей, потоков, пулов): действуют на объект,
+# общий с другими потоками, даже если он передан параметром
+SHARED_OBJECT_METHODS = {method for type_ in ('PyQueue', 'PyThread', 'WorkerPool') for method in type_methods(type_)}
+
+# Операции, которые Rust умеет вычислять в const fn
+CONST_OPERATORS = {'+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '!='}
+
+# Число узлов AST, до которого функция считается маленькой
+INLINE_MAX_NODES = 40
+
+class PurityAnalysis:
+    """
+    Анализ эффектов функций программы. Функция чистая, если она не печатает,
+    не изменяет аргументы и объекты по атрибутам, не выбрасывает исключений
+    и вызывает только чистые функции. Из чистых функций выбираются:
+    - маленькие листовые (без вызовов функций программы) - для #[inline];
+    - функции, тело которых состоит из арифметики, сравнений, присваиваний,
+      if, while и return над числами, - для const fn;
+    - const-функции без циклов и рекурсии - их вызовы с литеральными
+      аргументами можно вычислить при компиляции.
+    """
+
+    def __init__(self):
+        self.functions = {}  # имя функции -> FunctionDef
+        self.pure = {}  # имя функции -> чистая ли она
+        self.inline = set()
+        self.const_functions = set()
+        self.precomputable = set()
+
+    def analyze_program(self, function_defs, usages):
+        self.functions = functions = {f.name: f for f in function_defs}
+        # Как и в анализе исключений: начинаем с оптимистичного предположения
+        # и повторяем до неподвижной точки из-за рекурсивных вызовов
+        for name, function_def in functions.items():
+            self.pure[name] = not is_generator(function_def)
+        changed = True
+        while changed:
+            changed = False
+            for name, function_def in functions.items():
+                if self.pure[name] and not self.is_pure(function_def, usages.get(name, {})):
+                    self.pure[name] = False
+                    changed = True
+
+        for name, function_def in functions.items():
+            if not self.pure[name]:
+                continue
+            nodes = list(scope_nodes(function_def))
+            leaf = not any(isinstance(n, FunctionCall) and n.name in functions for n in nodes)
+            if leaf and len(nodes) <= INLINE_MAX_NODES:
+                self.inline.add(name)
+
+        self.const_functions = {name for name, f in functions.items() if self.pure[name] and self.const_evaluable(f)}
+        self.const_functions = self.closure(self.const_functions)
+        self.precomputable = {name for name in self.const_functions
+                              if not any(isinstance(n, WhileStatement) for n in walk(functions[name]))
+                              and name not in self.called_functions(functions[name])}
+        self.precomputable = self.closure(self.precomputable)
+        return self.pure
+
+    def closure(self, candidates):
+        # Оставляет функции, которые вызывают только функции из того же множества
+        changed = True
+        while changed:
+            changed = False
+            for name in list(candidates):
+                if not self.called_functions(self.functions[name]) <= candidates:
+                    candidates.discard(name)
+                    changed = True
+        return candidates
+
+    def called_functions(self, function_def):
+        return {n.name for n in scope_nodes(function_def) if isinstance(n, FunctionCall)}
+
+    def is_pure(self, function_def, usage):
+        if any(kind == MUTATED for kind in usage.values()):
+            return False
+        # Изменение параметра не всегда видно в usage: там его перекрывает
+        # забирание значения (xs.append(v); return xs)
+        params = set(function_def.params)
+        if any(self.mutates(node, params) for node in scope_nodes(function_def)):
+            return False
+        # scope_nodes не возвращает вложенные функции, а их определение - тоже эффект
+        if any(node is not function_def and isinstance(node, FunctionDef) for node in walk(function_def)):
+            return False
+        local_names = set(params)
+        for node in scope_nodes(function_def):
+            if isinstance(node, Assignment) and isinstance(node.left, Identifier):
+                local_names.add(node.left.name)
+        return all(node is function_def or self.is_pure_node(node, local_names)
+                   for node in scope_nodes(function_def))
+
+    def mutates(self, node, names):
+        # Изменяет ли узел объект, на который ссылается одно из имён:
+        # xs.append(v), q.put(v), xs[i] = v, xs[i] += v
+        if isinstance(node, MethodCall):
+            target = node.obj
+            # q.get() без аргументов - очередь, d.get(k) - чтение словаря
+            effect = (node.method_name in MUTATING_METHODS
+                      or (node.method_name in SHARED_OBJECT_METHODS and (node.method_name != 'get' or not node.args)))
+        elif isinstance(node, Assignment):
+            target, effect = node.left, isinstance(node.left, Subscript)
+        elif isinstance(node, AugAssignment):
+            target, effect = node.target, isinstance(node.target, Subscript)
+        else:
+            return False
+        while isinstance(target, (Attribute, Subscript)):
+            target = target.obj
+        return effect and isinstance(target, Identifier) and target.name in names
+
+    def is_pure_expression(self, node, local_names):
+        # Выражение без эффектов и без изменения захваченных переменных,
+        # например тело спискового включения или лямбды
+        return all(self.is_pure_node(n, local_names)
+                   and not (isinstance(n, MethodCall) and n.method_name in MUTATING_METHODS)
+                   for n in scope_nodes(node))
+
+    def is_pure_node(self, node, local_names):
+        if isinstance(node, (FunctionDef, ClassDef)):
+            return False
+        if isinstance(node, (PrintStatement, RaiseStatement, TryExcept, Yield, YieldFrom)):
+            return False
+        if isinstance(node, (Assignment, AugAssignment)):
+            target = node.left if isinstance(node, Assignment) else node.target
+            if isinstance(target, Attribute):
+                return False
+        if isinstance(node, FunctionCall):
+            if node.name in self.pure:
+                return self.pure[node.name]
+            return node.name in PURE_BUILTINS
+        if isinstance(node, MethodCall):
+            # Методы глобальных объектов (файлов, random и т.п.) имеют эффекты
+            root = node.obj
+            while isinstance(root, (Attribute, Subscript, MethodCall)):
+                root = root.obj
+            return isinstance(root, Identifier) and (root.name in local_names or root.name in PURE_MODULES)
+        return True
+
+    def const_evaluable(self, function_def):
+        for node in scope_nodes(function_def):
+            if node is function_def:
+                continue
+            if isinstance(node, (Identifier, Num, ReturnStatement, IfStatement, WhileStatement)):
+                continue
+            if isinstance(node, Constant) and isinstance(node.value, bool):
+                continue
+            if isinstance(node, Assignment) and isinstance(node.left, Identifier):
+                continue
+            if isinstance(node, AugAssignment) and isinstance(node.target, Identifier) and node.op in CONST_OPERATORS:
+                continue
+            if isinstance(node, BinaryOp) and node.op in CONST_OPERATORS:
+                continue
+            if isinstance(node, UnaryOp) and node.op == '-':
+                continue
+            if isinstance(node, FunctionCall) and node.name in self.pure:
+                continue
+            # Циклы for, коллекции, строки и методы в const fn недоступны
+            return False
+        return True
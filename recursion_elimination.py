@@ -0,0 +1,160 @@
+from ast_nodes import (
+    FunctionCall, ReturnStatement, IfStatement, BinaryOp,
+    Identifier, Num, scope_nodes
+)
+
+class RecursionElimination:
+    """
+    Находит рекурсивные функции, которые можно выполнить циклом:
+    - tail: вызовы return f(...) (хвостовая рекурсия) -> loop с переприсваиванием параметров;
+    - accumulate: return E op f(...) после охранных if с базовыми случаями -> цикл с аккумулятором;
+    - pairwise: f(n - 1) op f(n - 2) с базой n <= 1 (как fibonacci) -> итерация по паре значений.
+    """
+
+    # Операции, для которых порядок накопления чисел не влияет на результат
+    ACCUMULATING_OPS = {'+': 0, '*': 1}
+
+    def plan(self, function_def):
+        if 'self' in function_def.params or not self.contains_self_call(function_def, function_def.name):
+            return None
+        return (self.plan_pairwise(function_def)
+                or self.plan_accumulate(function_def)
+                or self.plan_tail(function_def))
+
+    def describe(self, name, plan):
+        descriptions = {
+            'tail': 'хвостовая рекурсия заменена циклом',
+            'accumulate': 'линейная рекурсия заменена циклом с аккумулятором',
+            'pairwise': 'рекуррентность f(n - 1), f(n - 2) заменена итерацией',
+        }
+        return f'{name}: {descriptions[plan["kind"]]}'
+
+    # --- хвостовая рекурсия ---
+
+    def plan_tail(self, function_def):
+        returns = [node for node in scope_nodes(function_def) if isinstance(node, ReturnStatement)]
+        # В функциях без return хвостовым считается и вызов f(...) последним оператором
+        statement_calls = [] if returns else self.tail_statement_calls(function_def.body, function_def)
+        if statement_calls or any(self.is_self_call(node.expr, function_def) for node in returns):
+            return {'kind': 'tail', 'tail_statements': {id(call) for call in statement_calls}}
+        return None
+
+    def tail_statement_calls(self, statements, function_def):
+        if not statements:
+            return []
+        last = statements[-1]
+        if self.is_self_call(last, function_def):
+            return [last]
+        if isinstance(last, IfStatement):
+            return (self.tail_statement_calls(last.true_body, function_def)
+                    + self.tail_statement_calls(last.false_body or [], function_def))
+        return []
+
+    # --- линейная рекурсия с аккумулятором ---
+
+    def plan_accumulate(self, function_def):
+        split = self.split_guards(function_def)
+        if split is None:
+            return None
+        guards, final = split
+        if not isinstance(final, BinaryOp) or final.op not in self.ACCUMULATING_OPS:
+            return None
+        if self.is_self_call(final.right, function_def) and not self.contains_self_call(final.left, function_def.name):
+            call, term = final.right, final.left
+        elif self.is_self_call(final.left, function_def) and not self.contains_self_call(final.right, function_def.name):
+            call, term = final.left, final.right
+        else:
+            return None
+        if any(self.contains_self_call(arg, function_def.name) for arg in call.args):
+            return None
+        return {
+            'kind': 'accumulate',
+            'guards': guards,
+            'op': final.op,
+            'identity': self.ACCUMULATING_OPS[final.op],
+            'term': term,
+            'args': call.args,
+        }
+
+    # --- f(n - 1) op f(n - 2) ---
+
+    def plan_pairwise(self, function_def):
+        if len(function_def.params) != 1:
+            return None
+        param = function_def.params[0]
+        split = self.split_guards(function_def)
+        if split is None:
+            return None
+        guards, final = split
+        if len(guards) != 1 or not isinstance(final, BinaryOp) or final.op not in self.ACCUMULATING_OPS:
+            return None
+        condition, negate, base = guards[0]
+        # База должна покрывать n = 0, n = 1 и все отрицательные n
+        if negate or not (isinstance(condition, BinaryOp) and isinstance(condition.left, Identifier)
+                          and condition.left.name == param and isinstance(condition.right, Num)
+                          and (condition.op, condition.right.value) in (('<=', 1), ('<', 2))):
+            return None
+        left_offset = self.self_call_offset(final.left, function_def)
+        right_offset = self.self_call_offset(final.right, function_def)
+        if {left_offset, right_offset} != {1, 2}:
+            return None
+        return {
+            'kind': 'pairwise',
+            'param': param,
+            'condition': condition,
+            'base': base,
+            'op': final.op,
+            # Порядок операндов сохраняется: f(n - 1) op f(n - 2) или наоборот
+            'order': 'current_previous' if left_offset == 1 else 'previous_current',
+        }
+
+    def self_call_offset(self, node, function_def):
+        # k для вызова f(n - k), иначе None
+        if not self.is_self_call(node, function_def):
+            return None
+        arg = node.args[0]
+        if (isinstance(arg, BinaryOp) and arg.op == '-' and isinstance(arg.left, Identifier)
+                and arg.left.name == function_def.params[0] and isinstance(arg.right, Num)):
+            return arg.right.value
+        return None
+
+    # --- вспомогательные функции ---
+
+    def split_guards(self, function_def):
+        # Разбивает тело на охранные условия [(условие, отрицание, база)]
+        # и итоговое рекурсивное выражение. Поддерживаются формы
+        #   if c: return base ... return expr
+        #   if c: return base else: return expr  (и наоборот)
+        name = function_def.name
+        body = function_def.body
+        guards = []
+        for statement in body[:-1]:
+            if not (isinstance(statement, IfStatement) and not statement.false_body
+                    and self.is_base_return(statement.true_body, name)
+                    and not self.contains_self_call(statement.condition, name)):
+                return None
+            guards.append((statement.condition, False, statement.true_body[0].expr))
+        if not body:
+            return None
+        last = body[-1]
+        if isinstance(last, ReturnStatement):
+            return guards, last.expr
+        if isinstance(last, IfStatement) and last.false_body and not self.contains_self_call(last.condition, name):
+            for base_body, recursive_body, negate in ((last.true_body, last.false_body, False),
+                                                      (last.false_body, last.true_body, True)):
+                if (self.is_base_return(base_body, name) and len(recursive_body) == 1
+                        and isinstance(recursive_body[0], ReturnStatement)):
+                    guards.append((last.condition, negate, base_body[0].expr))
+                    return guards, recursive_body[0].expr
+        return None
+
+    def is_base_return(self, statements, name):
+        return (len(statements) == 1 and isinstance(statements[0], ReturnStatement)
+                and not self.contains_self_call(statements[0].expr, name))
+
+    def is_self_call(self, node, function_def):
+        return (isinstance(node, FunctionCall) and node.name == function_def.name
+                and len(node.args) == len(function_def.params))
+
+    def contains_self_call(self, node, name):
+        return any(isinstance(n, FunctionCall) and n.name == name for n in scope_nodes(node))
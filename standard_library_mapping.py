@@ -21,6 +21,24 @@ STANDARD_LIBRARY_MAPPING = {
     'all': 'all',
 }
 
+# Встроенные функции над итерируемыми объектами, которые генерируются одной
+# цепочкой итераторов по заимствованным элементам без промежуточных Vec:
+# adapter - ленивый итератор, reduce - свёртка цепочки в значение,
+# collect - новый Vec из элементов цепочки
+ITERATOR_BUILTINS = {
+    'enumerate': 'adapter',
+    'zip': 'adapter',
+    'map': 'adapter',
+    'filter': 'adapter',
+    'sum': 'reduce',
+    'min': 'reduce',
+    'max': 'reduce',
+    'any': 'reduce',
+    'all': 'reduce',
+    'sorted': 'collect',
+    'list': 'collect',
+}
+
 METHOD_MAPPING = {
     'append': 'push',
     'extend': 'extend',
@@ -42,6 +60,7 @@ METHOD_MAPPING = {
     'startswith': 'starts_with',
     'endswith': 'ends_with',
     'replace': 'replace',
+    'add': 'insert',
     # Добавьте другие методы по необходимости
 }
 
@@ -53,6 +72,12 @@ DECORATOR_MAPPING = {
     'dataclass': 'derive(Debug, Clone, PartialEq)',
 }
 
+# Декораторы мемоизации из functools: имя -> maxsize по умолчанию (None - без ограничения)
+MEMOIZATION_DECORATORS = {
+    'cache': None,
+    'lru_cache': 128,
+}
+
 CONTEXT_MANAGER_MAPPING = {
     'open': 'File::open',
     'threading.Lock': 'std::sync::Mutex::new',
@@ -0,0 +1,21 @@
+# Ядро трансляции Python -> Rust без зависимостей от графического интерфейса:
+# импорт занимает миллисекунды и работает на серверах без Qt
+from lexer import Lexer
+from parser import Parser
+from code_generator import CodeGenerator, PARALLEL_THRESHOLD
+
+def translate(python_code, buffered_output=False, fast_maps=False, soa_layout=False,
+              parallel_map=False, parallel_threshold=PARALLEL_THRESHOLD):
+    # (код Rust, замечания генератора); ошибки разбора не перехватываются
+    tokens = Lexer(python_code).tokenize()
+    ast = Parser(tokens).parse()
+    generator = CodeGenerator(buffered_output, fast_maps, soa_layout, parallel_map, parallel_threshold)
+    return generator.generate(ast), generator.diagnostics
+
+def translate_python_to_rust(python_code, buffered_output=False, fast_maps=False, soa_layout=False,
+                             parallel_map=False, parallel_threshold=PARALLEL_THRESHOLD):
+    try:
+        rust_code, _ = translate(python_code, buffered_output, fast_maps, soa_layout, parallel_map, parallel_threshold)
+        return rust_code
+    except Exception as e:
+        raise Exception(f"Ошибка при трансляции: {str(e)}")
@@ -1,12 +1,42 @@
+import re
+
 from ast_nodes import (
-    Num, String, BinaryOp, Identifier, ListNode, 
+    Num, String, FormattedString, Constant, BinaryOp, UnaryOp, Identifier, ListNode, 
     GeneratorExpression, LambdaExpression, ReturnStatement,
     FunctionCall, DictNode, ImportStatement,
     IfStatement, ForStatement, WhileStatement,
-    ListComprehension
+    ListComprehension, Assignment, MethodCall, FunctionDef, Subscript, Attribute, ClassDef,
+    TupleNode, KeywordArgument, iter_child_nodes, walk
 )
 
-from standard_library_mapping import STANDARD_LIBRARY_MAPPING
+from standard_library_mapping import STANDARD_LIBRARY_MAPPING, ITERATOR_BUILTINS
+from module_registry import MODULE_REGISTRY, module_function, type_methods
+
+# Обобщённые типы аннотаций -> конструктор типа Rust по параметрам
+GENERIC_ANNOTATIONS = {
+    'list': lambda args: f'Vec<{args[0]}>',
+    'List': lambda args: f'Vec<{args[0]}>',
+    'Sequence': lambda args: f'Vec<{args[0]}>',
+    'dict': lambda args: f'HashMap<{args[0]}, {args[1]}>',
+    'Dict': lambda args: f'HashMap<{args[0]}, {args[1]}>',
+    'Mapping': lambda args: f'HashMap<{args[0]}, {args[1]}>',
+    'set': lambda args: f'HashSet<{args[0]}>',
+    'Set': lambda args: f'HashSet<{args[0]}>',
+    'frozenset': lambda args: f'HashSet<{args[0]}>',
+    'Optional': lambda args: f'Option<{args[0]}>',
+    'Iterator': lambda args: f'impl Iterator<Item = {args[0]}>',
+    'Iterable': lambda args: f'impl Iterator<Item = {args[0]}>',
+    'Generator': lambda args: f'impl Iterator<Item = {args[0]}>',
+    'Queue': lambda args: f'PyQueue<{args[0]}>',
+    'SimpleQueue': lambda args: f'PyQueue<{args[0]}>',
+}
+
+# Массивы NumPy: одномерные массивы чисел и маски из сравнений
+ARRAY_TYPE = 'Vec<f64>'
+MASK_TYPE = 'Vec<bool>'
+ARRAY_OPERAND_TYPES = (ARRAY_TYPE, MASK_TYPE, 'Vec<i32>', 'f64', 'i32', 'bool')
+COMPARISON_OPS = ('<', '>', '<=', '>=', '==', '!=')
+ARITHMETIC_OPS = ('+', '-', '*', '/', '%')
 
 class TypeInference:
     def __init__(self):
@@ -14,6 +44,15 @@ class TypeInference:
         self.functions = {}  # Для хранения определений функций
         self.current_scope = self.scope_stack[-1] if self.scope_stack else {}
         self.currently_analyzing = set()  # Для отслеживания функций в процессе анализа
+        self.generator_items = {}  # функция-генератор -> тип выдаваемых элементов
+        self.class_fields = {}  # класс -> {поле: тип}
+        self.soa_types = {}  # тип контейнера структура-массивов -> класс элементов
+        self.method_types = {}  # (класс, метод) -> тип результата
+        self.specializations = {}  # функция -> {типы аргументов: тип результата копии}
+        self.return_types = {}  # функция -> тип результата уже сгенерированной функции
+        # Импорты модулей из реестра: import m as a и from m import f
+        self.module_aliases = {}  # имя в программе -> модуль
+        self.imported_names = {}  # имя в программе -> (модуль, имя в модуле)
     
     def enter_scope(self):
         self.scope_stack.append({})
@@ -37,6 +76,10 @@ class TypeInference:
         return self.functions.get(func_name, None)
     
     def analyze_function_body(self, function_def):
+        # Аннотация результата - готовый ответ, тело не анализируется
+        annotated = self.annotation_type(function_def.return_annotation)
+        if annotated != 'unknown':
+            return annotated
         self.currently_analyzing.add(function_def.name)
         return_types = self.collect_return_types(function_def.body)
         if not return_types:
@@ -73,6 +116,21 @@ class TypeInference:
     
     def infer_function_return_type(self, node):
         if isinstance(node, FunctionCall):
+            if node.name in self.generator_items:
+                return f'impl Iterator<Item = {self.generator_items[node.name]}>'
+            if node.name in self.class_fields:
+                return node.name
+            if node.name in ITERATOR_BUILTINS and node.name not in self.functions:
+                return self.builtin_call_type(node)
+            if node.name == 'abs' and len(node.args) == 1 and node.name not in self.functions:
+                return self.infer_type(node.args[0])
+            if node.name in self.specializations:
+                variants = self.specializations[node.name]
+                types = tuple(self.infer_type(arg) for arg in node.args)
+                return variants.get(types, next(iter(variants.values())))
+            if self.return_types.get(node.name, 'unknown') != 'unknown':
+                # Функция уже сгенерирована: её тип выведен с типами параметров
+                return self.return_types[node.name]
             if node.name in self.functions:
                 if node.name in self.currently_analyzing:
                     # Рекурсивный вызов, предполагаем тип возвращаемого значения
@@ -86,37 +144,407 @@ class TypeInference:
     def infer_standard_library_return_type(self, func_name):
         # Здесь можно определить возвращаемые типы для стандартных функций
         standard_types = {
-            'len': 'usize',
+            'len': 'i32',
             'range': 'std::ops::Range<i32>',
             'print': '()',
             'println!': '()',
+            'str': 'String',
             # Добавьте другие стандартные функции по мере необходимости
         }
         return standard_types.get(func_name, 'unknown')
     
+    def collect_call_site_types(self, program, param_types=None):
+        # Собирает типы аргументов во всех местах вызова пользовательских функций:
+        # имя функции -> список кортежей типов аргументов.
+        # param_types (имя функции -> {параметр: тип}) позволяет учесть уже
+        # известные типы параметров при вызовах из тел других функций.
+        # Вызов класса Point(...) - вызов его конструктора
+        function_names = {node.name for node in walk(program) if isinstance(node, (FunctionDef, ClassDef))}
+        call_sites = {name: [] for name in function_names}
+        self.enter_scope()
+        self._collect_call_sites(program, function_names, call_sites, param_types or {})
+        self.exit_scope()
+        return call_sites
+
+    def _collect_call_sites(self, node, function_names, call_sites, param_types):
+        if isinstance(node, FunctionDef):
+            # Локальные переменные функции не видны снаружи
+            self.enter_scope()
+            for param, param_type in param_types.get(node.name, {}).items():
+                self.update_type(param, param_type)
+            for param, param_type in self.annotated_params(node).items():
+                self.update_type(param, param_type)
+            for statement in node.body:
+                self._collect_call_sites(statement, function_names, call_sites, param_types)
+            self.exit_scope()
+            return
+        if isinstance(node, Assignment) and isinstance(node.left, Identifier):
+            value_type = self.assigned_type(node)
+            if isinstance(node.right, ListNode) and not node.right.elements \
+                    and self.annotation_type(node.annotation) == 'unknown':
+                # Vec<String> для [] - лишь предположение; тип элементов даст первый append
+                value_type = 'Vec<_>'
+            if value_type != 'unknown':
+                self.update_type(node.left.name, value_type)
+        if isinstance(node, FunctionCall) and node.name in function_names:
+            call_sites[node.name].append(tuple(self.infer_type(arg) for arg in node.args))
+        if isinstance(node, ForStatement):
+            self.bind_target(node.target, self.iteration_item_type(node.iterable))
+        if isinstance(node, MethodCall):
+            self.refine_container_type(node)
+        if isinstance(node, (FunctionCall, MethodCall)):
+            for name, types in self.indirect_calls(node, function_names):
+                call_sites[name].append(types)
+        for child in iter_child_nodes(node):
+            self._collect_call_sites(child, function_names, call_sites, param_types)
+
+    def register_import(self, node):
+        if node.module not in MODULE_REGISTRY:
+            return
+        if node.names:
+            for name in node.names:
+                self.imported_names[name] = (node.module, name)
+        else:
+            self.module_aliases[node.alias or node.module] = node.module
+
+    def module_member(self, node):
+        # (модуль, имя) для обращения к функции или константе модуля из реестра:
+        # heappush(h, x), heapq.heappush(h, x), math.pi; иначе None
+        if isinstance(node, FunctionCall):
+            if node.name in self.imported_names and node.name not in self.functions:
+                return self.imported_names[node.name]
+            return None
+        if isinstance(node, Identifier):
+            if node.name in self.imported_names and not any(node.name in scope for scope in self.scope_stack):
+                return self.imported_names[node.name]
+            return None
+        if isinstance(node, (MethodCall, Attribute)) and isinstance(node.obj, Identifier) \
+                and node.obj.name in self.module_aliases and self.infer_type(node.obj) == 'unknown':
+            return self.module_aliases[node.obj.name], node.method_name if isinstance(node, MethodCall) else node.attr_name
+        return None
+
+    def module_call_type(self, module, name, args):
+        entry = module_function(module, name)
+        if entry is None:
+            return 'unknown'
+        values = {}
+        for index, arg in enumerate(a for a in args if not isinstance(a, KeywordArgument)):
+            values[f't{index}'] = self.infer_type(arg)
+            values[f'i{index}'] = self.iteration_item_type(arg)
+            values[f'e{index}'] = self.element_type(values[f't{index}'])
+            values[f'd{index}'] = self.factory_type(arg)
+        if values:
+            arrays = [values[key] for key in values if key[0] == 't' and values[key].startswith('Vec<')]
+            values['a'] = ARRAY_TYPE if arrays else 'f64'
+        # Подстановки для отсутствующих аргументов заменяются на '_'
+        return re.sub(r'\{\w+\}', lambda match: values.get(match.group()[1:-1], '_'), entry[1])
+
+    def factory_type(self, node):
+        # Тип значения, которое создаёт фабрика defaultdict: int, list, lambda: ...
+        if isinstance(node, LambdaExpression):
+            return self.infer_type(node.body)
+        if isinstance(node, Identifier):
+            return {'int': 'i32', 'float': 'f64', 'str': 'String', 'bool': 'bool',
+                    'list': 'Vec<_>', 'set': 'HashSet<_>', 'dict': 'HashMap<_, _>'}.get(node.name, 'unknown')
+        return 'unknown'
+
+    def annotated_params(self, function_def):
+        # Параметры с поддерживаемыми аннотациями -> тип Rust
+        types = {}
+        for param, annotation in function_def.annotations.items():
+            param_type = self.annotation_type(annotation)
+            if param_type != 'unknown':
+                types[param] = param_type
+        return types
+
+    def assigned_type(self, node):
+        # Тип переменной после присваивания: аннотация, если она есть, иначе тип значения
+        annotated = self.annotation_type(node.annotation)
+        return annotated if annotated != 'unknown' else self.infer_type(node.right)
+
+    def param_type_from_call_sites(self, call_sites, index):
+        # Тип параметра, если все места вызова согласованы
+        types = {args[index] for args in call_sites
+                 if index < len(args) and 'unknown' not in args[index] and not self.is_placeholder(args[index])}
+        if len(types) == 1:
+            return types.pop()
+        return 'unknown'
+
+    def iteration_item_type(self, iterable):
+        # Тип переменной цикла for по данному итерируемому объекту
+        if isinstance(iterable, FunctionCall) and iterable.name == 'range':
+            return 'i32'
+        if isinstance(iterable, (GeneratorExpression, ListComprehension)):
+            return self.comprehension_item_type(iterable)
+        if isinstance(iterable, FunctionCall) and iterable.name in ITERATOR_BUILTINS and iterable.name not in self.functions:
+            return self.builtin_item_type(iterable)
+        iterable_type = self.infer_type(iterable)
+        if iterable_type.startswith(('Vec<', 'HashSet<', 'VecDeque<')):
+            return iterable_type[iterable_type.index('<') + 1:-1]
+        if iterable_type.startswith('impl Iterator<Item = '):
+            return iterable_type[len('impl Iterator<Item = '):-1]
+        return 'unknown'
+
+    def builtin_item_type(self, call):
+        # Тип элементов, которые выдаёт enumerate/zip/map/filter/sorted/list
+        args = [arg for arg in call.args if not isinstance(arg, KeywordArgument)]
+        if not args:
+            return 'unknown'
+        if call.name == 'enumerate':
+            item_type = self.iteration_item_type(args[0])
+            return 'unknown' if item_type == 'unknown' else f'(i32, {item_type})'
+        if call.name == 'zip':
+            item_types = [self.iteration_item_type(arg) for arg in args]
+            return 'unknown' if 'unknown' in item_types else f'({", ".join(item_types)})'
+        if call.name == 'map' and len(args) == 2:
+            if isinstance(args[0], LambdaExpression):
+                return self.lambda_result_type(args[0], [self.iteration_item_type(args[1])])
+            return 'unknown'
+        if call.name in ('filter', 'sorted', 'list'):
+            return self.iteration_item_type(args[-1] if call.name == 'filter' else args[0])
+        return 'unknown'
+
+    def builtin_call_type(self, call):
+        args = [arg for arg in call.args if not isinstance(arg, KeywordArgument)]
+        kind = ITERATOR_BUILTINS[call.name]
+        if kind == 'adapter':
+            return f'impl Iterator<Item = {self.builtin_item_type(call)}>'
+        if kind == 'collect':
+            return f'Vec<{self.builtin_item_type(call)}>' if args else 'Vec<unknown>'
+        if call.name in ('any', 'all'):
+            return 'bool'
+        if call.name in ('min', 'max') and len(args) > 1:
+            return self.infer_type(args[0])
+        return self.iteration_item_type(args[0]) if args else 'unknown'
+
+    def mapped_type(self, args):
+        # Тип результата функции из первого аргумента на элементах второго: pool.map(f, xs)
+        args = [arg for arg in args if not isinstance(arg, KeywordArgument)]
+        if len(args) < 2:
+            return 'unknown'
+        function, item_type = args[0], self.iteration_item_type(args[1])
+        if isinstance(function, LambdaExpression):
+            return self.lambda_result_type(function, [item_type])
+        if isinstance(function, Identifier) and function.name in self.return_types:
+            return self.return_types[function.name]
+        return 'unknown'
+
+    def indirect_calls(self, node, function_names):
+        # Вызовы функций программы, переданных по имени: pool.map(f, xs) вызывает
+        # f с элементами xs, sorted(xs, key=f) - тоже, Thread(target=f, args=(a, b)) - f(a, b)
+        args = [arg for arg in node.args if not isinstance(arg, KeywordArgument)]
+        keywords = {arg.name: arg.value for arg in node.args if isinstance(arg, KeywordArgument)}
+        key = keywords.get('key')
+        if isinstance(node, FunctionCall) and node.name in ('sorted', 'min', 'max') and len(args) == 1 \
+                and isinstance(key, Identifier) and key.name in function_names:
+            return [(key.name, (self.iteration_item_type(args[0]),))]
+        if isinstance(node, MethodCall) and node.method_name in ('map', 'imap') and len(args) == 2 \
+                and isinstance(args[0], Identifier) and args[0].name in function_names:
+            return [(args[0].name, (self.iteration_item_type(args[1]),))]
+        target = keywords.get('target')
+        if self.module_member(node) == ('threading', 'Thread') and isinstance(target, Identifier) \
+                and target.name in function_names:
+            thread_args = keywords.get('args')
+            thread_args = thread_args.elements if isinstance(thread_args, (TupleNode, ListNode)) else []
+            return [(target.name, tuple(self.infer_type(arg) for arg in thread_args))]
+        return []
+
+    def refine_container_type(self, node):
+        # Тип элементов списка или очереди, созданных без аннотации, уточняем
+        # по первому append или put
+        container = {'append': 'Vec', 'put': 'PyQueue'}.get(node.method_name)
+        if not (container and node.args and isinstance(node.obj, Identifier)
+                and self.infer_type(node.obj) == f'{container}<_>'):
+            return
+        item_type = self.infer_type(node.args[0])
+        if item_type != 'unknown' and not self.is_placeholder(item_type):
+            self.update_type(node.obj.name, f'{container}<{item_type}>')
+
+    def comprehension_item_type(self, node):
+        # Тип выражения включения при известном типе его переменной
+        self.enter_scope()
+        self.bind_target(node.target, self.iteration_item_type(node.iterable))
+        item_type = self.infer_type(node.expression)
+        self.exit_scope()
+        return item_type
+
+    def lambda_result_type(self, node, param_types):
+        params = node.params if isinstance(node.params, list) else [node.params]
+        self.enter_scope()
+        for param, param_type in zip(params, param_types):
+            self.bind_target(Identifier(param) if isinstance(param, str) else param, param_type)
+        result_type = self.infer_type(node.body)
+        self.exit_scope()
+        return result_type
+
+    def bind_target(self, target, type_):
+        # Типы переменных цикла или включения, в том числе кортежа (i, x)
+        if isinstance(target, Identifier):
+            if type_ != 'unknown':
+                self.update_type(target.name, type_)
+        elif isinstance(target, TupleNode):
+            types = self.tuple_types(type_)
+            for index, element in enumerate(target.elements):
+                self.bind_target(element, types[index] if index < len(types) else 'unknown')
+
+    def tuple_types(self, type_):
+        # '(i32, Vec<(i32, f64)>)' -> ['i32', 'Vec<(i32, f64)>']
+        if not (type_.startswith('(') and type_.endswith(')')):
+            return []
+        parts, depth, current = [], 0, ''
+        for char in type_[1:-1]:
+            if char in '<(':
+                depth += 1
+            elif char in '>)':
+                depth -= 1
+            if char == ',' and depth == 0:
+                parts.append(current.strip())
+                current = ''
+            else:
+                current += char
+        if current.strip():
+            parts.append(current.strip())
+        return parts
+
+    def element_type(self, container_type):
+        # Тип элемента Vec или значения HashMap
+        if container_type in self.soa_types:
+            return self.soa_types[container_type]
+        if container_type.startswith('Vec<'):
+            element_type = container_type[4:-1]
+        elif container_type.startswith('VecDeque<'):
+            element_type = container_type[9:-1]
+        elif container_type.startswith('PyQueue<'):
+            element_type = container_type[8:-1]
+        elif container_type.startswith('BinaryHeap<Reverse<'):
+            element_type = container_type[19:-2]
+        elif container_type.startswith('HashMap<'):
+            element_type = container_type[8:-1].split(', ', 1)[-1]
+        else:
+            return 'unknown'
+        return 'unknown' if element_type == '_' else element_type
+
+    def annotation_type(self, node):
+        # Тип Rust по аннотации Python; 'unknown', если аннотация не поддерживается.
+        # Простые имена отображаются через STANDARD_LIBRARY_MAPPING (int -> i32, str -> String)
+        if node is None:
+            return 'unknown'
+        name = node.name.split('.')[-1]
+        args = [self.annotation_type(arg) for arg in node.args if arg.name != '...']
+        if 'unknown' in args:
+            return 'unknown'
+        if name == 'None':
+            return '()'
+        if name in ('tuple', 'Tuple'):
+            if len(args) != len(node.args):
+                # tuple[int, ...] - однородная последовательность произвольной длины
+                return f'Vec<{args[0]}>' if len(args) == 1 else 'unknown'
+            return f'({", ".join(args)}{"," if len(args) == 1 else ""})' if args else 'unknown'
+        if name == 'Union' and len(args) == 2 and '()' in args:
+            # X | None
+            return f'Option<{args[0] if args[1] == "()" else args[1]}>'
+        if name in GENERIC_ANNOTATIONS:
+            arity = 2 if name in ('dict', 'Dict', 'Mapping') else 1
+            return GENERIC_ANNOTATIONS[name](args) if len(args) == arity else 'unknown'
+        if args:
+            return 'unknown'
+        if name in self.class_fields:
+            return name
+        if name in ('int', 'float', 'str', 'bool'):
+            return STANDARD_LIBRARY_MAPPING[name]
+        return 'unknown'
+
+    def is_int_literal(self, node):
+        return isinstance(node, Num) and isinstance(node.value, int) and not isinstance(node.value, bool)
+
+    def uses_numpy(self):
+        return 'numpy' in self.module_aliases.values() or any(
+            module == 'numpy' for module, _ in self.imported_names.values())
+
+    def array_operation_type(self, op, left_type, right_type):
+        # Тип поэлементной операции над массивом NumPy или None, если это не она
+        if not self.uses_numpy() or ARRAY_TYPE not in (left_type, right_type) and MASK_TYPE not in (left_type, right_type):
+            return None
+        if left_type not in ARRAY_OPERAND_TYPES or right_type not in ARRAY_OPERAND_TYPES:
+            return None
+        return MASK_TYPE if op in COMPARISON_OPS else ARRAY_TYPE
+
+    def is_placeholder(self, type_):
+        # Тип с ещё не выведенными параметрами, например HashMap<_, _>
+        return '<_' in type_ or ', _' in type_
+
+    def infer_param_type_from_usage(self, function_def, param):
+        # Грубая оценка типа параметра по тому, как он используется в теле
+        string_methods = {
+            'upper', 'lower', 'strip', 'lstrip', 'rstrip', 'startswith',
+            'endswith', 'split', 'replace', 'find', 'isdigit', 'isalpha', 'join',
+        }
+        list_methods = {'append', 'extend', 'insert', 'sort', 'reverse'}
+        dict_methods = {'keys', 'values', 'items', 'get', 'update', 'setdefault'}
+        for node in walk(function_def):
+            if isinstance(node, MethodCall) and isinstance(node.obj, Identifier) and node.obj.name == param:
+                if node.method_name in string_methods:
+                    return 'String'
+                if node.method_name in list_methods:
+                    return 'Vec<i32>'
+                # get() без ключа - метод очереди, а не словаря
+                if node.method_name in dict_methods and (node.args or node.method_name != 'get'):
+                    return 'HashMap<String, i32>'
+            elif isinstance(node, ForStatement) and isinstance(node.iterable, Identifier) and node.iterable.name == param:
+                return 'Vec<i32>'
+            elif isinstance(node, Subscript) and isinstance(node.obj, Identifier) and node.obj.name == param:
+                return 'Vec<i32>'
+            elif (isinstance(node, FunctionCall) and node.name == 'len' and node.args
+                    and isinstance(node.args[0], Identifier) and node.args[0].name == param):
+                return 'Vec<i32>'
+        return 'unknown'
+
     def infer_type(self, node):
         if isinstance(node, Num):
-            return 'i32'  # Предполагаем, что все числа - целые 32-битные
+            # Целые числа - 32-битные, дробные - f64
+            return 'f64' if isinstance(node.value, float) else 'i32'
         elif isinstance(node, GeneratorExpression):
-            elem_type = self.infer_type(node.expression)
+            elem_type = self.comprehension_item_type(node)
             return f'impl Iterator<Item = {elem_type}>'
         elif isinstance(node, LambdaExpression):
             param_types = [self.infer_type(param) for param in node.params]
             return_type = self.infer_type(node.body)
             return f'impl Fn({", ".join(param_types)}) -> {return_type}'
-        elif isinstance(node, String):
+        elif isinstance(node, Constant) and isinstance(node.value, bool):
+            return 'bool'
+        elif isinstance(node, (String, FormattedString)):
             return 'String'  # В Rust строки - это String, а не &str
         elif isinstance(node, BinaryOp):
             left_type = self.infer_type(node.left)
             right_type = self.infer_type(node.right)
+            array_type = self.array_operation_type(node.op, left_type, right_type)
+            if array_type:
+                return array_type
             if left_type == right_type:
                 return left_type
-            else:
-                return 'unknown'
+            if node.op == '**' and 'f64' in (left_type, right_type) and {left_type, right_type} <= {'i32', 'f64'}:
+                return 'f64'
+            # Целый литерал рядом с f64 становится дробным
+            if {left_type, right_type} == {'i32', 'f64'} and self.is_int_literal(
+                    node.left if left_type == 'i32' else node.right):
+                return 'f64'
+            # Целое в арифметике с f64 приводится к f64, как в Python
+            if {left_type, right_type} == {'i32', 'f64'} and node.op in ARITHMETIC_OPS:
+                return 'f64'
+            # Дробный литерал в арифметике даёт float при любом числовом операнде
+            if node.op in ARITHMETIC_OPS and 'unknown' in (left_type, right_type) and any(
+                    isinstance(operand, Num) and isinstance(operand.value, float) for operand in (node.left, node.right)):
+                return 'f64'
+            return 'unknown'
+        elif isinstance(node, UnaryOp) and node.op == '-' and self.infer_type(node.expr) in (ARRAY_TYPE, 'i32', 'f64'):
+            return self.infer_type(node.expr)
         elif isinstance(node, Identifier):
             for scope in reversed(self.scope_stack):
                 if node.name in scope:
                     return scope[node.name]
+            if node.name in self.imported_names:
+                module, name = self.imported_names[node.name]
+                return MODULE_REGISTRY[module]['constants'].get(name, ('', 'unknown'))[1]
             return 'unknown'
         elif isinstance(node, ListNode):
             if node.elements:
@@ -124,11 +552,50 @@ class TypeInference:
                 return f'Vec<{elem_type}>'
             else:
                 return 'Vec<String>'  # Предполагаем тип по умолчанию
+        elif isinstance(node, DictNode):
+            if node.pairs:
+                key, value = node.pairs[0]
+                return f'HashMap<{self.infer_type(key)}, {self.infer_type(value)}>'
+            # Типы ключей и значений уточняются при первой записи d[k] = v
+            return 'HashMap<_, _>'
+        elif isinstance(node, FunctionCall) and node.name in ('dict', 'set') and not node.args:
+            return 'HashMap<_, _>' if node.name == 'dict' else 'HashSet<_>'
         elif isinstance(node, ListComprehension):
-            # Предполагаем, что тип списка соответствует типу выражения
-            elem_type = self.infer_type(node.expression)
+            # Тип списка - тип выражения при типе переменной включения из итерируемого объекта
+            elem_type = self.comprehension_item_type(node)
             return f'Vec<{elem_type}>'
+        elif isinstance(node, TupleNode):
+            return f'({", ".join(self.infer_type(e) for e in node.elements)})'
+        elif isinstance(node, FunctionCall) and self.module_member(node):
+            return self.module_call_type(*self.module_member(node), node.args)
         elif isinstance(node, FunctionCall):
             return self.infer_function_return_type(node)
+        elif isinstance(node, MethodCall) and self.module_member(node):
+            return self.module_call_type(*self.module_member(node), node.args)
+        elif isinstance(node, MethodCall) and node.method_name in type_methods(self.infer_type(node.obj)):
+            obj_type = self.infer_type(node.obj)
+            key_type = obj_type[8:].split(', ', 1)[0] if obj_type.startswith('HashMap<') else 'unknown'
+            result_type = type_methods(obj_type)[node.method_name][1]
+            if '{r}' in result_type:
+                result_type = result_type.replace('{r}', self.mapped_type(node.args))
+            return result_type.replace('{e}', self.element_type(obj_type)).replace('{k}', key_type)
+        elif isinstance(node, MethodCall) and (self.infer_type(node.obj), node.method_name) in self.method_types:
+            return self.method_types[(self.infer_type(node.obj), node.method_name)]
+        elif isinstance(node, MethodCall) and node.method_name in ('upper', 'lower', 'replace', 'join'):
+            return 'String'
+        elif isinstance(node, MethodCall) and node.method_name == 'get':
+            return self.element_type(self.infer_type(node.obj))
+        elif isinstance(node, Subscript):
+            return self.element_type(self.infer_type(node.obj))
+        elif isinstance(node, Attribute) and self.module_member(node):
+            module, name = self.module_member(node)
+            return MODULE_REGISTRY[module]['constants'].get(name, ('', 'unknown'))[1]
+        elif isinstance(node, Attribute):
+            obj_type = self.infer_type(node.obj)
+            if obj_type in self.soa_types:
+                # Поле контейнера SoA - отдельный Vec
+                field_type = self.class_fields[self.soa_types[obj_type]].get(node.attr_name, 'unknown')
+                return 'unknown' if field_type == 'unknown' else f'Vec<{field_type}>'
+            return self.class_fields.get(obj_type, {}).get(node.attr_name, 'unknown')
         else:
             return 'unknown'